@@ -0,0 +1,7 @@
+"""Module for vectorized analysis of calculation trajectories."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+__all__ = ["periodic", "columns", "geometry", "jit_functions", "rdf", "msd", "vacf", "rigid", "fragments"]
@@ -0,0 +1,153 @@
+"""Columnar store of per-step quantities."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import pandas as pd
+import logging
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["ColumnStore"]
+
+
+class ColumnStore:
+    """
+    Columnar store of equally long float columns.
+
+    Columns are kept in a few contiguous 2-D blocks of shape (slots, length), one block per group (e.g. positions,
+    velocities, energies, derived), so every column is a contiguous row of its block. Columns are addressed by name
+    through a name -> (group, slot) index. Blocks grow geometrically and slots of removed columns are reused, so adding
+    or removing a column costs O(length) regardless of the number of stored columns. Columns added together occupy
+    consecutive slots and are returned by get as one 2-D view. A pandas DataFrame is materialized only by to_frame.
+    """
+
+    def __init__(self, length: int, dtype=np.float64, capacity: int = 8):
+        """
+        Store initialization function.
+
+        Args:
+            length (int): length of every column.
+            dtype: dtype of all blocks.
+            capacity (int): initial number of slots of every new block.
+        """
+        self.length = length
+        self.dtype = np.dtype(dtype)
+        self.__capacity = capacity
+        self.__blocks = dict()
+        self.__used = dict()
+        self.__free = dict()
+        self.__index = dict()
+
+    def __contains__(self, name: str) -> bool:
+        """Checks whether the column is stored."""
+        return name in self.__index
+
+    def __len__(self) -> int:
+        """Returns number of stored columns."""
+        return len(self.__index)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Returns the column as a view of its block."""
+        group, slot = self.__index[name]
+        return self.__blocks[group][slot]
+
+    def __setitem__(self, name: str, values) -> None:
+        """Adds the column to the derived group or overwrites the stored one."""
+        self.add(name, values)
+
+    @property
+    def columns(self) -> list[str]:
+        """Returns names of stored columns in order of addition."""
+        return list(self.__index)
+
+    def add(self, names: str | Sequence[str], values, group: str = "derived") -> None:
+        """
+        Adds columns to the group or overwrites already stored ones in place.
+
+        Args:
+            names (str | Sequence[str]): column name or names.
+            values: array of shape (length,) for one column or (len(names), length) for several columns.
+            group (str): group of new columns.
+
+        Returns:
+            None
+        """
+        names = [names] if isinstance(names, str) else list(names)
+        values = np.asarray(values, dtype=self.dtype).reshape((len(names), self.length))
+        new = [num for num, name in enumerate(names) if name not in self.__index]
+        for num, name in enumerate(names):
+            if name in self.__index:
+                self[name][:] = values[num]
+        if not new:
+            return
+        slots = self.allocate(group, len(new))
+        block = self.__blocks[group]
+        if len(new) == len(names) and slots[-1] - slots[0] == len(slots) - 1:
+            block[slots[0]:slots[-1] + 1] = values
+        else:
+            block[slots] = values[new]
+        for num, slot in zip(new, slots):
+            self.__index[names[num]] = (group, slot)
+
+    def allocate(self, group: str, count: int) -> list[int]:
+        """Returns free slots of the group growing its block if needed, several slots are consecutive."""
+        if group not in self.__blocks:
+            self.__blocks[group] = np.empty((max(self.__capacity, count), self.length), dtype=self.dtype)
+            self.__used[group], self.__free[group] = 0, []
+        if count == 1 and self.__free[group]:
+            return [self.__free[group].pop()]
+        block, used = self.__blocks[group], self.__used[group]
+        if used + count > block.shape[0]:
+            new_block = np.empty((max(2 * block.shape[0], used + count), self.length), dtype=self.dtype)
+            new_block[:used] = block[:used]
+            self.__blocks[group] = new_block
+        self.__used[group] += count
+        return list(range(used, used + count))
+
+    def get(self, names: Sequence[str]) -> np.ndarray:
+        """
+        Returns columns as a 2-D array of shape (len(names), length).
+
+        Columns of one group in consecutive slots are returned as a view of the block, others are gathered into a copy.
+        """
+        places = [self.__index[name] for name in names]
+        groups = {group for group, _ in places}
+        slots = [slot for _, slot in places]
+        if len(groups) == 1 and slots and slots[-1] - slots[0] == len(slots) - 1 and slots == sorted(slots):
+            return self.__blocks[places[0][0]][slots[0]:slots[-1] + 1]
+        return np.stack([self[name] for name in names]) if names else np.empty((0, self.length), dtype=self.dtype)
+
+    def remove(self, names: str | Sequence[str]) -> None:
+        """Removes columns, missing names are ignored. Slots are reused by next added columns."""
+        names = [names] if isinstance(names, str) else names
+        for name in names:
+            if name in self.__index:
+                group, slot = self.__index.pop(name)
+                self.__free[group].append(slot)
+
+    def rename(self, old_name: str, new_name: str) -> None:
+        """Renames the column keeping its order."""
+        self.__index = {new_name if name == old_name else name: place for name, place in self.__index.items()}
+
+    def slice_rows(self, start: Optional[int] = None, stop: Optional[int] = None) -> None:
+        """Keeps only rows from start to stop of all columns."""
+        for group, block in self.__blocks.items():
+            self.__blocks[group] = np.ascontiguousarray(block[:, start:stop])
+        self.length = len(range(*slice(start, stop).indices(self.length)))
+
+    def to_frame(self, names: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Materializes columns as a pandas DataFrame for display and export.
+
+        Args:
+            names (Sequence[str], optional): names and order of columns, all columns if None.
+
+        Returns:
+            pd.DataFrame: DataFrame with a copy of the columns.
+        """
+        names = self.columns if names is None else names
+        return pd.DataFrame({name: self[name] for name in names}, columns=list(names))
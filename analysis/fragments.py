@@ -0,0 +1,218 @@
+"""Automatic detection and tracking of molecules (bonded fragments) over trajectories."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+from analysis.jit_functions import connected_components
+from visual.bonds import VerletList
+from visual.jit_functions.bonds import pairs_to_csr
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["FragmentTrajectory", "bond_cutoffs", "formula", "detect_fragments", "whole_positions", "fragment_centers"]
+
+DEFAULT_BOND_LENGTH = 1.8  # A, the same as scene_params['bond']['length']
+
+
+def bond_cutoffs(names: list[str], bond_length: float = DEFAULT_BOND_LENGTH,
+                 lengths: Optional[dict[tuple[str, str], float]] = None) -> np.ndarray:
+    """
+    Returns the matrix of maximal bond lengths between species.
+
+    Args:
+        names (list[str]): species names in order of types.
+        bond_length (float): bond length of pairs not given in lengths.
+        lengths (dict[tuple[str, str], float], optional): bond lengths of pairs of species, e.g. {('O', 'H'): 1.2}.
+
+    Returns:
+        np.ndarray: matrix of shape (species, species).
+    """
+    cutoffs = np.full((len(names), len(names)), float(bond_length))
+    for (first, second), length in (lengths or dict()).items():
+        if first in names and second in names:
+            cutoffs[names.index(first), names.index(second)] = cutoffs[names.index(second), names.index(first)] = length
+    return cutoffs
+
+
+def formula(species: np.ndarray) -> str:
+    """Returns the brutto formula of atoms in the Hill order (C, H, then alphabetically), e.g. 'CH4O' or 'H2O'."""
+    names, counts = np.unique(np.asarray(species), return_counts=True)
+    names, counts = names.tolist(), counts.tolist()
+    order = sorted(range(len(names)), key=lambda index: (names[index] != 'C', names[index] != 'H' or 'C' not in names, names[index]))
+    return ''.join(f"{names[index]}{counts[index] if counts[index] > 1 else ''}" for index in order)
+
+
+@dataclass
+class FragmentTrajectory:
+    """
+    Fragments found over the trajectory.
+
+    A fragment is a set of atoms connected by bonds, fragments with the same atoms in different frames have the same
+    id. labels holds the fragment id of every atom in every frame, fragments holds sorted atoms of every id and trees
+    holds atoms of every fragment in breadth-first order with their bonded parents (-1 for the root) used to make
+    fragments whole across periodic boundaries.
+    """
+
+    labels: np.ndarray
+    fragments: list[np.ndarray]
+    trees: list[tuple[np.ndarray, np.ndarray]]
+    names: list[str] = field(default_factory=list)
+    reused_frames: int = 0
+
+    def stable(self, min_atoms: int = 2) -> list[int]:
+        """Returns ids of fragments with at least min_atoms atoms which exist in all frames."""
+        present = np.zeros(len(self.fragments), dtype=bool)
+        present[np.unique(self.labels[0])] = True
+        for frame_labels in self.labels[1:]:
+            frame_present = np.zeros(len(self.fragments), dtype=bool)
+            frame_present[np.unique(frame_labels)] = True
+            present &= frame_present
+        return [index for index in np.flatnonzero(present).tolist() if self.fragments[index].size >= min_atoms]
+
+    def lifetimes(self) -> np.ndarray:
+        """Returns number of frames in which every fragment exists."""
+        lifetimes = np.zeros(len(self.fragments), dtype=np.int64)
+        for frame_labels in self.labels:
+            lifetimes[np.unique(frame_labels)] += 1
+        return lifetimes
+
+
+def spanning_tree(atoms: np.ndarray, offsets: np.ndarray, neighbours: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns atoms of the connected fragment in breadth-first order over bonds and the parent of every atom.
+
+    Args:
+        atoms (np.ndarray): atoms of the fragment.
+        offsets (np.ndarray): CSR offsets of the bond graph of the frame, see pairs_to_csr.
+        neighbours (np.ndarray): CSR neighbours of the bond graph of the frame.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: atoms in breadth-first order and their parents (-1 for the root).
+    """
+    order, parents, visited, queue = [], [], {int(atoms[0])}, deque([(int(atoms[0]), -1)])
+    while queue:
+        atom, parent = queue.popleft()
+        order.append(atom)
+        parents.append(parent)
+        for neighbour in neighbours[offsets[atom]:offsets[atom + 1]].tolist():
+            if neighbour not in visited:
+                visited.add(neighbour)
+                queue.append((neighbour, atom))
+    return np.array(order, dtype=np.int64), np.array(parents, dtype=np.int64)
+
+
+def detect_fragments(direct, cell: np.ndarray, species: np.ndarray, skin: float, bond_length: float = DEFAULT_BOND_LENGTH,
+                     lengths: Optional[dict[tuple[str, str], float]] = None, start: int = 0, stop: Optional[int] = None,
+                     stride: int = 1) -> FragmentTrajectory:
+    """
+    Detects fragments (molecules) in every frame and tracks their identity over the trajectory.
+
+    Bonds of every frame are found by the Verlet list over the periodic linked-cell search of bond_pairs, so the
+    search is repeated only after atoms move by half of the skin. Fragments are connected components of the bond
+    graph found by the numba union-find, bond trees of new fragments are built over the CSR adjacency made once per
+    frame. If bonds of a frame are the same as bonds of the previous one, labels of the previous frame are reused
+    without the union-find. Fragments are identified by their atoms, so a fragment which breaks and forms again keeps
+    its id.
+
+    Args:
+        direct: direct coordinates of shape (steps, atoms, 3), e.g. calculation.direct_positions, may be a
+            LazyTrajectory.
+        cell (np.ndarray): cell of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+        species (np.ndarray): species of every atom.
+        skin (float): skin distance of the Verlet list in A, settings.get_scene_params('bond', 'skin').
+        bond_length (float): maximal bond length of pairs of species not given in lengths.
+        lengths (dict[tuple[str, str], float], optional): maximal bond lengths of pairs of species.
+        start (int): first frame.
+        stop (int, optional): frame after the last one, the end of the trajectory if None.
+        stride (int): step between used frames.
+
+    Returns:
+        FragmentTrajectory: fragment ids of atoms in every used frame and atoms of every fragment.
+    """
+    species = np.asarray(species)
+    cell = np.asarray(cell, dtype=np.float64)
+    names = list(dict.fromkeys(species.tolist()))
+    types = np.array([names.index(name) for name in species.tolist()], dtype=np.int64)
+    cutoffs = bond_cutoffs(names, bond_length, lengths)
+    frames = np.arange(len(direct))[start:stop:stride]
+    atoms = species.size
+
+    labels = np.empty((frames.size, atoms), dtype=np.int64)
+    identities, fragments, trees = dict(), [], []
+    previous_keys, reused = None, 0
+    verlet = VerletList(types, cutoffs, skin)
+    for num, frame in enumerate(frames):
+        first, second, distances = verlet.bonds(direct[frame], cell if cell.ndim == 2 else cell[frame])
+        keys = np.sort(first * atoms + second)
+        if previous_keys is not None and np.array_equal(keys, previous_keys):
+            labels[num] = labels[num - 1]
+            reused += 1
+            continue
+        previous_keys = keys
+        components = connected_components(atoms, first, second)
+        order = np.argsort(components, kind='stable')
+        bounds = np.flatnonzero(np.diff(components[order])) + 1
+        adjacency = None
+        for component_atoms in np.split(order, bounds):
+            key = component_atoms.tobytes()
+            if key not in identities:
+                if adjacency is None:
+                    adjacency = pairs_to_csr(atoms, first, second, distances)[:2]
+                identities[key] = len(fragments)
+                fragments.append(component_atoms)
+                trees.append(spanning_tree(component_atoms, *adjacency))
+            labels[num, component_atoms] = identities[key]
+    logger.info(f"{len(fragments)} fragments found in {frames.size} frames, labels of {reused} frames reused, "
+                f"Verlet list built {verlet.rebuilds} times.")
+    return FragmentTrajectory(labels, fragments, trees, [formula(species[atoms_ids]) for atoms_ids in fragments], reused)
+
+
+def whole_positions(direct: np.ndarray, cell: np.ndarray, trajectory: FragmentTrajectory, ids: Optional[list[int]] = None) -> np.ndarray:
+    """
+    Returns cartesian positions with fragments made whole across periodic boundaries.
+
+    Every atom of a fragment is put to the minimum image of its parent in the bond tree, so fragments larger than
+    half of the cell stay whole while bonds are shorter than half of it. The root atom keeps its coordinates, so
+    unwrapped direct coordinates (unwrap_direct) give continuous fragment trajectories. Atoms are processed in tree
+    order, every atom for all steps at once.
+
+    Args:
+        direct (np.ndarray): direct coordinates of shape (steps, atoms, 3).
+        cell (np.ndarray): cell of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+        trajectory (FragmentTrajectory): detected fragments.
+        ids (list[int], optional): ids of fragments to make whole, all fragments if None.
+
+    Returns:
+        np.ndarray: cartesian positions of shape (steps, atoms, 3).
+    """
+    whole = np.array(direct, dtype=np.float64)
+    for index in range(len(trajectory.fragments)) if ids is None else ids:
+        order, parents = trajectory.trees[index]
+        for atom, parent in zip(order[1:].tolist(), parents[1:].tolist()):
+            difference = whole[:, atom] - whole[:, parent]
+            whole[:, atom] = whole[:, parent] + difference - np.round(difference)
+    return whole @ np.asarray(cell, dtype=np.float64)
+
+
+def fragment_centers(positions: np.ndarray, masses: np.ndarray, fragments: list[np.ndarray]) -> np.ndarray:
+    """
+    Returns centers of mass of fragments for all steps at once.
+
+    Args:
+        positions (np.ndarray): cartesian positions of shape (steps, atoms, 3) with whole fragments.
+        masses (np.ndarray): masses of atoms.
+        fragments (list[np.ndarray]): atoms of every fragment.
+
+    Returns:
+        np.ndarray: centers of shape (steps, fragments, 3).
+    """
+    atoms = np.concatenate(fragments)
+    offsets = np.concatenate(([0], np.cumsum([fragment.size for fragment in fragments])[:-1]))
+    weights = np.asarray(masses, dtype=np.float64)[atoms]
+    return np.add.reduceat(positions[:, atoms] * weights[:, np.newaxis], offsets, axis=1) / np.add.reduceat(weights, offsets)[:, np.newaxis]
@@ -0,0 +1,142 @@
+"""Batch minimum-image distances and angles over whole trajectories."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["select_pairs", "select_triples", "minimum_image_vectors", "pair_distances", "triple_angles"]
+
+CHUNK_MEMORY = 64 * 1024 ** 2  # bytes of intermediate arrays per chunk of steps
+
+
+def select_pairs(species: np.ndarray, first: str, second: str) -> np.ndarray:
+    """
+    Returns all pairs of atoms of two species, e.g. all O-H pairs.
+
+    Args:
+        species (np.ndarray): species of every atom.
+        first (str): species of the first atom of pairs.
+        second (str): species of the second atom of pairs, pairs are unique if it is equal to first.
+
+    Returns:
+        np.ndarray: int array of shape (pairs, 2).
+    """
+    species = np.asarray(species)
+    first_atoms, second_atoms = np.flatnonzero(species == first), np.flatnonzero(species == second)
+    if first == second:
+        i, j = np.triu_indices(first_atoms.size, k=1)
+        return np.stack((first_atoms[i], first_atoms[j]), axis=1)
+    return np.stack(np.meshgrid(first_atoms, second_atoms, indexing="ij"), axis=-1).reshape((-1, 2))
+
+
+def select_triples(species: np.ndarray, first: str, center: str, last: str) -> np.ndarray:
+    """
+    Returns all triples of atoms of given species with distinct atoms, e.g. all Mo-S-Mo triples.
+
+    Triples which differ only by the order of the end atoms are returned once if first and last species are equal.
+
+    Args:
+        species (np.ndarray): species of every atom.
+        first (str): species of the first end atom.
+        center (str): species of the central atom, angles are measured at it.
+        last (str): species of the last end atom.
+
+    Returns:
+        np.ndarray: int array of shape (triples, 3).
+    """
+    species = np.asarray(species)
+    first_atoms, center_atoms, last_atoms = (np.flatnonzero(species == name) for name in (first, center, last))
+    triples = np.stack(np.meshgrid(first_atoms, center_atoms, last_atoms, indexing="ij"), axis=-1).reshape((-1, 3))
+    distinct = (triples[:, 0] != triples[:, 1]) & (triples[:, 1] != triples[:, 2]) & (triples[:, 0] != triples[:, 2])
+    if first == last:
+        distinct &= triples[:, 0] < triples[:, 2]
+    return triples[distinct]
+
+
+def minimum_image_vectors(direct: np.ndarray, cell: np.ndarray, first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    """
+    Returns cartesian minimum-image vectors from first to second atoms.
+
+    Args:
+        direct (np.ndarray): direct coordinates of shape (steps, atoms, 3).
+        cell (np.ndarray): cell of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+        first (np.ndarray): indexes of the first atoms.
+        second (np.ndarray): indexes of the second atoms.
+
+    Returns:
+        np.ndarray: vectors of shape (steps, len(first), 3).
+    """
+    difference = direct[:, second] - direct[:, first]
+    difference -= np.round(difference)
+    return difference @ cell
+
+
+def chunk_steps(steps: int, columns: int, itemsize: int, chunk: Optional[int]) -> int:
+    """Returns number of steps processed at once so that intermediate arrays fit CHUNK_MEMORY."""
+    if chunk is not None:
+        return max(1, chunk)
+    return int(max(1, min(steps, CHUNK_MEMORY // max(1, columns * 3 * itemsize * 4))))
+
+
+def pair_distances(direct, cell: np.ndarray, pairs: np.ndarray, chunk: Optional[int] = None) -> np.ndarray:
+    """
+    Calculates minimum-image distances of all pairs for all steps.
+
+    Steps are processed in chunks, so the memory of intermediate arrays is bounded regardless of the trajectory
+    length. Direct coordinates may be a LazyTrajectory, then only frames of the current chunk are decoded.
+
+    Args:
+        direct: direct coordinates of shape (steps, atoms, 3), e.g. calculation.direct_positions.
+        cell (np.ndarray): cell of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+        pairs (np.ndarray): int array of shape (pairs, 2), e.g. from select_pairs.
+        chunk (int, optional): number of steps processed at once, chosen by CHUNK_MEMORY if None.
+
+    Returns:
+        np.ndarray: distances of shape (steps, pairs).
+    """
+    pairs = np.asarray(pairs, dtype=np.int64).reshape((-1, 2))
+    cell = np.asarray(cell)
+    steps, dtype = len(direct), np.result_type(direct.dtype, cell.dtype)
+    out = np.empty((steps, pairs.shape[0]), dtype=dtype)
+    step = chunk_steps(steps, pairs.shape[0], dtype.itemsize, chunk)
+    for start in range(0, steps, step):
+        stop = min(start + step, steps)
+        vectors = minimum_image_vectors(np.asarray(direct[start:stop]), cell if cell.ndim == 2 else cell[start:stop], pairs[:, 0], pairs[:, 1])
+        out[start:stop] = np.sqrt(np.einsum("spi,spi->sp", vectors, vectors))
+    return out
+
+
+def triple_angles(direct, cell: np.ndarray, triples: np.ndarray, chunk: Optional[int] = None) -> np.ndarray:
+    """
+    Calculates angles at central atoms of all triples for all steps using minimum-image bond vectors.
+
+    Args:
+        direct: direct coordinates of shape (steps, atoms, 3), e.g. calculation.direct_positions.
+        cell (np.ndarray): cell of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+        triples (np.ndarray): int array of shape (triples, 3) with the central atom in the middle, e.g. from
+            select_triples.
+        chunk (int, optional): number of steps processed at once, chosen by CHUNK_MEMORY if None.
+
+    Returns:
+        np.ndarray: angles in degrees of shape (steps, triples).
+    """
+    triples = np.asarray(triples, dtype=np.int64).reshape((-1, 3))
+    cell = np.asarray(cell)
+    steps, dtype = len(direct), np.result_type(direct.dtype, cell.dtype)
+    out = np.empty((steps, triples.shape[0]), dtype=dtype)
+    step = chunk_steps(steps, 2 * triples.shape[0], dtype.itemsize, chunk)
+    for start in range(0, steps, step):
+        stop = min(start + step, steps)
+        frames, frame_cell = np.asarray(direct[start:stop]), cell if cell.ndim == 2 else cell[start:stop]
+        first = minimum_image_vectors(frames, frame_cell, triples[:, 1], triples[:, 0])
+        last = minimum_image_vectors(frames, frame_cell, triples[:, 1], triples[:, 2])
+        cosine = np.einsum("spi,spi->sp", first, last)
+        cosine /= np.sqrt(np.einsum("spi,spi->sp", first, first) * np.einsum("spi,spi->sp", last, last))
+        out[start:stop] = np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+    return out
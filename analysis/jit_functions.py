@@ -0,0 +1,205 @@
+"""Jit functions for trajectory analysis."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+from numba import jit, prange
+import numpy as np
+import logging
+logging.getLogger('numba').setLevel(logging.INFO)
+
+__all__ = [
+    "cell_widths",
+    "accumulate_rdf_frame",
+    "rdf_histogram",
+    "connected_components"
+]
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def cell_widths(cell) -> tuple[float, np.ndarray]:
+    """
+    Returns volume of the cell and distances between its opposite faces.
+
+    Args:
+        cell: cell vectors of shape (3, 3).
+
+    Returns:
+        tuple[float, np.ndarray]: volume and widths along the cell vectors.
+    """
+    normals = np.empty((3, 3))
+    for axis in range(3):
+        first, second = cell[(axis + 1) % 3], cell[(axis + 2) % 3]
+        normals[axis, 0] = first[1] * second[2] - first[2] * second[1]
+        normals[axis, 1] = first[2] * second[0] - first[0] * second[2]
+        normals[axis, 2] = first[0] * second[1] - first[1] * second[0]
+    volume = abs(cell[0, 0] * normals[0, 0] + cell[0, 1] * normals[0, 1] + cell[0, 2] * normals[0, 2])
+    widths = np.empty(3)
+    for axis in range(3):
+        widths[axis] = volume / np.sqrt(normals[axis, 0] ** 2 + normals[axis, 1] ** 2 + normals[axis, 2] ** 2)
+    return volume, widths
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def accumulate_rdf_frame(direct, cell, types, valid, r_max, hist) -> None:
+    """
+    Adds pair distances of one frame to the histogram using a linked-cell list under periodic boundaries.
+
+    The cell is split into at least 3 bins of width not less than r_max along every vector, so all pairs closer than
+    r_max are found in 27 neighbour bins. If the cell is too small for that, all pairs are checked. Every pair is
+    counted once into hist[min(type), max(type)] with the weight equal to the frame volume, so frames of variable-cell
+    runs are normalized by their own density.
+
+    Args:
+        direct: direct coordinates of shape (atoms, 3).
+        cell: cell vectors of shape (3, 3).
+        types: int type of every atom.
+        valid: bool mask of atoms with finite coordinates.
+        r_max: maximal distance, must not exceed half of the smallest cell width.
+        hist: float array of shape (types, types, bins) to accumulate into.
+    """
+    atoms, bins = direct.shape[0], hist.shape[2]
+    volume, widths = cell_widths(cell)
+    bin_width, r_max2 = r_max / bins, r_max * r_max
+    grid = np.empty(3, dtype=np.int64)
+    for axis in range(3):
+        grid[axis] = max(1, int(widths[axis] / r_max))
+    wrapped = np.empty((atoms, 3))
+    for atom in range(atoms):
+        for axis in range(3):
+            wrapped[atom, axis] = direct[atom, axis] - np.floor(direct[atom, axis])
+    difference = np.empty(3)
+
+    if grid[0] < 3 or grid[1] < 3 or grid[2] < 3:
+        for first in range(atoms):
+            if not valid[first]:
+                continue
+            for second in range(first + 1, atoms):
+                if not valid[second]:
+                    continue
+                r2 = 0.0
+                for axis in range(3):
+                    value = wrapped[second, axis] - wrapped[first, axis]
+                    difference[axis] = value - np.floor(value + 0.5)
+                for axis in range(3):
+                    component = difference[0] * cell[0, axis] + difference[1] * cell[1, axis] + difference[2] * cell[2, axis]
+                    r2 += component * component
+                if r2 < r_max2:
+                    index = int(np.sqrt(r2) / bin_width)
+                    if index < bins:
+                        hist[min(types[first], types[second]), max(types[first], types[second]), index] += volume
+        return
+
+    head = -np.ones(grid[0] * grid[1] * grid[2], dtype=np.int64)
+    following = -np.ones(atoms, dtype=np.int64)
+    atom_bins = np.empty((atoms, 3), dtype=np.int64)
+    for atom in range(atoms):
+        if not valid[atom]:
+            continue
+        for axis in range(3):
+            atom_bins[atom, axis] = min(int(wrapped[atom, axis] * grid[axis]), grid[axis] - 1)
+        index = (atom_bins[atom, 0] * grid[1] + atom_bins[atom, 1]) * grid[2] + atom_bins[atom, 2]
+        following[atom] = head[index]
+        head[index] = atom
+
+    for first in range(atoms):
+        if not valid[first]:
+            continue
+        for shift_x in range(-1, 2):
+            bin_x = (atom_bins[first, 0] + shift_x) % grid[0]
+            for shift_y in range(-1, 2):
+                bin_y = (atom_bins[first, 1] + shift_y) % grid[1]
+                for shift_z in range(-1, 2):
+                    bin_z = (atom_bins[first, 2] + shift_z) % grid[2]
+                    second = head[(bin_x * grid[1] + bin_y) * grid[2] + bin_z]
+                    while second != -1:
+                        if second > first:
+                            r2 = 0.0
+                            for axis in range(3):
+                                value = wrapped[second, axis] - wrapped[first, axis]
+                                difference[axis] = value - np.floor(value + 0.5)
+                            for axis in range(3):
+                                component = difference[0] * cell[0, axis] + difference[1] * cell[1, axis] + difference[2] * cell[2, axis]
+                                r2 += component * component
+                            if r2 < r_max2:
+                                index = int(np.sqrt(r2) / bin_width)
+                                if index < bins:
+                                    hist[min(types[first], types[second]), max(types[first], types[second]), index] += volume
+                        second = following[second]
+
+
+@jit(fastmath=True, nopython=True, cache=True, parallel=True)
+def rdf_histogram(direct, cells, types, valid, types_number, r_max, bins, blocks) -> np.ndarray:
+    """
+    Accumulates pair distance histograms of frames in parallel.
+
+    Frames are split into blocks processed by separate threads, every block has its own histogram, so
+    accumulation needs no synchronization.
+
+    Args:
+        direct: direct coordinates of shape (frames, atoms, 3).
+        cells: cells of shape (frames, 3, 3).
+        types: int type of every atom.
+        valid: bool mask of shape (frames, atoms) of atoms with finite coordinates.
+        types_number: number of atom types.
+        r_max: maximal distance.
+        bins: number of histogram bins.
+        blocks: number of blocks of frames.
+
+    Returns:
+        np.ndarray: histograms of shape (blocks, types, types, bins).
+    """
+    frames = direct.shape[0]
+    hist = np.zeros((blocks, types_number, types_number, bins))
+    per_block = (frames + blocks - 1) // blocks
+    for block in prange(blocks):
+        for frame in range(block * per_block, min(frames, (block + 1) * per_block)):
+            accumulate_rdf_frame(direct[frame], cells[frame], types, valid[frame], r_max, hist[block])
+    return hist
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def connected_components(atoms, first, second) -> np.ndarray:
+    """
+    Finds connected components of the bond graph by union-find with path halving and union by size.
+
+    Components are labeled 0, 1, ... in order of their smallest atom, so labels of equal graphs are equal.
+
+    Args:
+        atoms: number of atoms.
+        first: first atoms of bonds.
+        second: second atoms of bonds.
+
+    Returns:
+        np.ndarray: component label of every atom.
+    """
+    parents = np.arange(atoms)
+    sizes = np.ones(atoms, dtype=np.int64)
+    for bond in range(first.shape[0]):
+        root_first, root_second = first[bond], second[bond]
+        while parents[root_first] != root_first:
+            parents[root_first] = parents[parents[root_first]]
+            root_first = parents[root_first]
+        while parents[root_second] != root_second:
+            parents[root_second] = parents[parents[root_second]]
+            root_second = parents[root_second]
+        if root_first == root_second:
+            continue
+        if sizes[root_first] < sizes[root_second]:
+            root_first, root_second = root_second, root_first
+        parents[root_second] = root_first
+        sizes[root_first] += sizes[root_second]
+
+    labels = -np.ones(atoms, dtype=np.int64)
+    root_labels = -np.ones(atoms, dtype=np.int64)
+    count = 0
+    for atom in range(atoms):
+        root = atom
+        while parents[root] != root:
+            root = parents[root]
+        if root_labels[root] == -1:
+            root_labels[root] = count
+            count += 1
+        labels[atom] = root_labels[root]
+    return labels
@@ -1,10 +1,11 @@
 from PySide6.QtOpenGLWidgets import QOpenGLWidget
 from PySide6.QtGui import QImage, QSurfaceFormat, QOpenGLContext
 from PySide6.QtCore import QTimer, Qt
-from visual.shaders.shaders import Shaders
+from visual.shaders.shaders import Shaders, ShaderError
 from visual.scene import Scene
 import logging
 import os
+import numpy as np
 import OpenGL
 from OpenGL.GL import *
 
@@ -32,10 +33,15 @@ class GLWidget(QOpenGLWidget):
         __mouse_dx: Stores the change in x-coordinate of the mouse. Initialized to 0.
         __mouse_dy: Stores the change in y-coordinate of the mouse. Initialized to 0.
         __timer: A QTimer object used to trigger updates.
+        __calculation: The calculation whose trajectory is played. Initialized to None.
+        __trajectory_steps: Number of steps of the trajectory set to the scene, None if it must be set again.
     
     Returns:
         None
     """
+    default_color = (0.5, 0.5, 0.5)  # color of species without a color in atoms params
+    default_scale = 0.3  # scale of species without a scale in atoms params
+
     def __init__(self, parent=None, settings=None, project_directory=None):
         """
         Initializes the OpenGL widget.
@@ -56,6 +62,8 @@ class GLWidget(QOpenGLWidget):
             __mouse_dx: Stores the change in x-coordinate of the mouse. Initialized to 0.
             __mouse_dy: Stores the change in y-coordinate of the mouse. Initialized to 0.
             __timer: A QTimer object used to trigger updates.
+            __calculation: The calculation whose trajectory is played. Initialized to None.
+            __trajectory_steps: Number of steps of the trajectory set to the scene, None if it must be set again.
         
         Returns:
             None
@@ -73,6 +81,7 @@ class GLWidget(QOpenGLWidget):
         self.__mouse_x_pos, self.__mouse_y_pos = 0, 0
         self.__trace_mouse = False
         self.__mouse_dx, self.__mouse_dy = 0, 0
+        self.__calculation, self.__trajectory_steps = None, None
         
         # self.__rotation_matrix = np.array([[-1.0, 0.0, 0.0, 0.0],
         #                                    [0.0, 0.0, 1.0, 0],
@@ -110,6 +119,10 @@ class GLWidget(QOpenGLWidget):
         self.__settings.set_scene_params(self.width() / self.height(), 'view', 'perspective', 'aspect')
         self.__program = Shaders(os.path.join(self.__project_directory, 'visual', 'shaders'), [r'vertex.glsl', r'fragment.glsl'], ['VERTEX', 'FRAGMENT'])
         self.__scene = Scene(self.__settings)
+        try:
+            self.__scene.set_impostor_program(Shaders(os.path.join(self.__project_directory, 'visual', 'shaders'), [r'impostor_vertex.glsl', r'impostor_fragment.glsl'], ['VERTEX', 'FRAGMENT']))
+        except ShaderError as error:
+            logger.warning(f"Impostor spheres are not available: {error}")
         self.__scene.load_texture(":/icons/logo/PROCHEM-logo.png")
         # self.__scene.set_draw_buffer({'Sphere': {((0.2, 0, 0.5), 1.0): [[0, 0, 0], [1, 1, 1], [2, 2, 2]]}})
         self.__timer.start(16)
@@ -151,6 +164,7 @@ class GLWidget(QOpenGLWidget):
         """
         if self.__program:
             glUseProgram(self.__program.program)
+            self.update_trajectory()
             self.__scene.draw(self.__program, self.__trace_mouse)
             glUseProgram(0)
 
@@ -163,7 +177,9 @@ class GLWidget(QOpenGLWidget):
          event: The key press event object.
         
         This method responds to specific key presses to rotate, scale, and move
-        the 3D scene. It also propagates the event to the parent widget.
+        the 3D scene, 'I' switches atoms between sphere meshes and ray-cast
+        impostors, 'B' measures frame time of draw paths of the scene. It
+        also propagates the event to the parent widget.
         """
         key = event.key()
         match key:
@@ -197,6 +213,12 @@ class GLWidget(QOpenGLWidget):
                 self.__scene.move_z(0.1)
             case Qt.Key_M:
                 self.__scene.move_z(-0.1)
+            case Qt.Key_I:
+                self.__scene.set_renderer('impostor' if self.__scene.get_renderer() == 'mesh' else 'mesh')
+            case Qt.Key_B:
+                self.makeCurrent()
+                self.__scene.benchmark(self.__program)
+                self.doneCurrent()
         self.parent().keyPressEvent(event)
 
     def mouseMoveEvent(self, event):
@@ -267,6 +289,58 @@ class GLWidget(QOpenGLWidget):
         """
         self.__trace_mouse = False
 
+    def set_calculation(self, calculation):
+        """
+        Sets the calculation whose trajectory is played by the scene.
+        
+        The trajectory is passed to the scene by the next paintGL, so the method may be called from any thread.
+        
+        Args:
+            calculation: The calculation to draw, None removes the trajectory.
+        
+        Returns:
+            None.
+        """
+        self.__calculation, self.__trajectory_steps = calculation, None
+
+    def update_trajectory(self):
+        """
+        Sets positions of the calculation to the scene if the calculation or the number of its steps has changed.
+        
+        Atoms are colored and scaled by their species, a followed calculation is set again when new steps are parsed.
+        
+        Args:
+            self: The instance of the class.
+        
+        Returns:
+            None.
+        """
+        positions = None if self.__calculation is None else self.__calculation.positions
+        steps = 0 if positions is None else positions.shape[0]
+        if steps == self.__trajectory_steps:
+            return
+        self.__trajectory_steps = steps
+        if not steps:
+            self.__scene.remove_trajectory()
+            return
+        colors, scales = self.__settings.get_atoms_params('colors'), self.__settings.get_atoms_params('scales')
+        species = self.__calculation.species
+        self.__scene.set_trajectory(positions, np.array([colors.get(name, self.default_color) for name in species], dtype=np.float32),
+                                    np.array([scales.get(name, self.default_scale) for name in species], dtype=np.float32))
+
+    def set_step(self, step):
+        """
+        Sets the step of trajectories played by the scene.
+        
+        Args:
+            step: The step to draw.
+        
+        Returns:
+            None.
+        """
+        if self.__scene is not None:
+            self.__scene.set_step(step)
+
     def set_program(self, program):
         """
         Sets the program to be executed.
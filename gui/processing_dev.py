@@ -6,6 +6,12 @@
 ## Created by: Qt User Interface Compiler version 6.4.3
 ##
 ## WARNING! All changes made in this file will be lost when recompiling UI file!
+##
+## NOTE: QActions ARDF, AMSD, AVDOS, AFragments, ASpeciesDistances and
+## ASpeciesAngles of ProcessingMenuOptions (after a separator following
+## AInclude_OSZICAR, the last three after one more separator) were added by
+## hand, the UI file is not in the repository.
+## Add them to the UI file before recompiling it.
 ################################################################################
 
 from PySide6.QtCore import (QCoreApplication, QDate, QDateTime, QLocale,
@@ -433,6 +439,18 @@ class Ui_VRProcessing(object):
         self.ATable = QAction(VRProcessing)
         self.ATable.setObjectName(u"ATable")
         self.ATable.setEnabled(False)
+        self.ARDF = QAction(VRProcessing)
+        self.ARDF.setObjectName(u"ARDF")
+        self.AMSD = QAction(VRProcessing)
+        self.AMSD.setObjectName(u"AMSD")
+        self.AVDOS = QAction(VRProcessing)
+        self.AVDOS.setObjectName(u"AVDOS")
+        self.AFragments = QAction(VRProcessing)
+        self.AFragments.setObjectName(u"AFragments")
+        self.ASpeciesDistances = QAction(VRProcessing)
+        self.ASpeciesDistances.setObjectName(u"ASpeciesDistances")
+        self.ASpeciesAngles = QAction(VRProcessing)
+        self.ASpeciesAngles.setObjectName(u"ASpeciesAngles")
         self.MainProcessingWidget = QWidget(VRProcessing)
         self.MainProcessingWidget.setObjectName(u"MainProcessingWidget")
         self.verticalLayout = QVBoxLayout(self.MainProcessingWidget)
@@ -833,6 +851,14 @@ class Ui_VRProcessing(object):
         self.ProcessingMenuOptions.addAction(self.AOSZICAR)
         self.ProcessingMenuOptions.addSeparator()
         self.ProcessingMenuOptions.addAction(self.AInclude_OSZICAR)
+        self.ProcessingMenuOptions.addSeparator()
+        self.ProcessingMenuOptions.addAction(self.ARDF)
+        self.ProcessingMenuOptions.addAction(self.AMSD)
+        self.ProcessingMenuOptions.addAction(self.AVDOS)
+        self.ProcessingMenuOptions.addSeparator()
+        self.ProcessingMenuOptions.addAction(self.AFragments)
+        self.ProcessingMenuOptions.addAction(self.ASpeciesDistances)
+        self.ProcessingMenuOptions.addAction(self.ASpeciesAngles)
 
         self.retranslateUi(VRProcessing)
 
@@ -867,6 +893,12 @@ class Ui_VRProcessing(object):
         self.ASelected_atoms.setText(QCoreApplication.translate("VRProcessing", u"Selected atoms", None))
         self.AOSZICAR.setText(QCoreApplication.translate("VRProcessing", u"OSZICAR", None))
         self.ATable.setText(QCoreApplication.translate("VRProcessing", u"Table", None))
+        self.ARDF.setText(QCoreApplication.translate("VRProcessing", u"Radial distribution", None))
+        self.AMSD.setText(QCoreApplication.translate("VRProcessing", u"Mean squared displacement", None))
+        self.AVDOS.setText(QCoreApplication.translate("VRProcessing", u"Vibrational DOS", None))
+        self.AFragments.setText(QCoreApplication.translate("VRProcessing", u"Detect fragments", None))
+        self.ASpeciesDistances.setText(QCoreApplication.translate("VRProcessing", u"Distances of selected species", None))
+        self.ASpeciesAngles.setText(QCoreApplication.translate("VRProcessing", u"Angles of selected species", None))
         self.DistanceRadio.setText(QCoreApplication.translate("VRProcessing", u"Distance", None))
         self.COMRadio.setText(QCoreApplication.translate("VRProcessing", u"COM", None))
         self.DCAddCol.setText(QCoreApplication.translate("VRProcessing", u"Add Column", None))
@@ -4,4 +4,4 @@
 # ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
 # See LICENSE.txt for details.
 
-__all__ = ["parser", "vasp"]
+__all__ = ["parser", "vasp", "jit_functions", "shared", "cache", "trajectory", "volumetric", "dos"]
@@ -0,0 +1,191 @@
+"""On-disk binary cache of parsed calculations."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import os
+import json
+import shutil
+import hashlib
+import traceback
+import numpy as np
+import logging
+from typing import Optional
+from parsers.parser import *
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["CalculationCache"]
+
+
+class CalculationCache:
+    """
+    On-disk binary cache of parsed calculations.
+
+    Every cached calculation is stored as a directory of raw .npy files (one per array field of the Calculation
+    dataclass) and a meta.json file with the cache key and scalar fields. By default the cache directory is placed
+    next to the source file. The key consists of the absolute path, size, modification time and a content hash of the
+    source file, so a changed file invalidates its entry automatically. Arrays are memory-mapped copy-on-write with
+    np.load(mmap_mode='c'), so reopening a calculation does not read the trajectory into memory, the arrays are writable
+    like parsed ones and writes never reach the cache files. When the cache directory exceeds max_size, the least
+    recently used entries are evicted.
+    """
+    cache_directory_name = ".prochem_cache"
+    array_fields = ("species", "masses", "cell", "positions", "direct_positions", "velocities", "forces", "streses", "energy", "charges")
+    scalar_fields = ("timestep",)
+    __hash_block = 1024 ** 2  # bytes hashed at the beginning and at the end of the source file
+    __meta_name = "meta.json"
+
+    def __init__(self, cache_directory: Optional[str] = None, max_size: int = 2 * 1024 ** 3):
+        """
+        Cache initialization function.
+
+        Args:
+            cache_directory (str, optional): directory for all cache entries. If None, the directory named
+                cache_directory_name next to every source file is used.
+            max_size (int): maximal size of the cache directory in bytes.
+        """
+        self.__cache_directory = cache_directory
+        self.__max_size = max_size
+
+    def get_cache_directory(self, file_path: str) -> str:
+        """Returns cache directory for the source file."""
+        if self.__cache_directory is not None:
+            return self.__cache_directory
+        return os.path.join(os.path.dirname(os.path.abspath(file_path)), self.cache_directory_name)
+
+    def get_entry_directory(self, file_path: str) -> str:
+        """Returns directory of the cache entry for the source file."""
+        path_hash = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+        return os.path.join(self.get_cache_directory(file_path), path_hash)
+
+    def key(self, file_path: str) -> dict:
+        """
+        Forms the cache key of the source file.
+
+        The content hash covers the size and the first and the last __hash_block bytes of the file, so checking
+        the key does not require reading multi-gigabyte trajectories.
+
+        Args:
+            file_path (str): path to the source file.
+
+        Returns:
+            dict: key with 'path', 'size', 'mtime' and 'hash' items.
+        """
+        stat = os.stat(file_path)
+        content_hash = hashlib.blake2b(str(stat.st_size).encode(), digest_size=16)
+        with open(file_path, "rb") as source:
+            content_hash.update(source.read(self.__hash_block))
+            if stat.st_size > 2 * self.__hash_block:
+                source.seek(-self.__hash_block, os.SEEK_END)
+                content_hash.update(source.read(self.__hash_block))
+        return {"path": os.path.abspath(file_path), "size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": content_hash.hexdigest()}
+
+    def load(self, file_path: str, calculation: Calculation) -> bool:
+        """
+        Fills the calculation from the cache.
+
+        Array fields are memory-mapped copy-on-write. A stale or broken entry is removed.
+
+        Args:
+            file_path (str): path to the source file.
+            calculation (Calculation): calculation to fill.
+
+        Returns:
+            bool: True if the calculation was loaded from the cache.
+        """
+        entry_directory = self.get_entry_directory(file_path)
+        meta_path = os.path.join(entry_directory, self.__meta_name)
+        if not os.path.isfile(meta_path):
+            return False
+        try:
+            with open(meta_path, "r") as meta_file:
+                meta = json.load(meta_file)
+            if meta["key"] != self.key(file_path):
+                logger.info(f"Cache entry of {file_path} is outdated")
+                self.invalidate(file_path)
+                return False
+            arrays = {name: np.load(os.path.join(entry_directory, f"{name}.npy"), mmap_mode="c") for name in meta["arrays"]}
+        except (OSError, ValueError, KeyError):
+            logger.warning(f"Cache entry of {file_path} is broken and will be removed.\n{traceback.format_exc()}")
+            self.invalidate(file_path)
+            return False
+        for name, value in arrays.items():
+            setattr(calculation, name, value)
+        for name, value in meta["scalars"].items():
+            setattr(calculation, name, value)
+        os.utime(meta_path)
+        logger.info(f"Calculation {calculation.name} loaded from cache")
+        return True
+
+    def store(self, file_path: str, calculation: Calculation) -> None:
+        """
+        Stores the calculation into the cache and evicts old entries if the cache is too large.
+
+        The entry is written into a temporary directory and moved in place, so a concurrently opened
+        calculation never sees a partially written entry.
+
+        Args:
+            file_path (str): path to the source file.
+            calculation (Calculation): parsed calculation.
+
+        Returns:
+            None
+        """
+        entry_directory = self.get_entry_directory(file_path)
+        temporary_directory = f"{entry_directory}.{os.getpid()}.tmp"
+        meta = {"key": self.key(file_path), "arrays": [], "scalars": dict()}
+        try:
+            os.makedirs(temporary_directory, exist_ok=True)
+            for name in self.array_fields:
+                value = getattr(calculation, name)
+                if isinstance(value, np.ndarray) and value.dtype != object:
+                    np.save(os.path.join(temporary_directory, f"{name}.npy"), value)
+                    meta["arrays"].append(name)
+            for name in self.scalar_fields:
+                value = getattr(calculation, name)
+                if isinstance(value, (int, float)):
+                    meta["scalars"][name] = float(value)
+            with open(os.path.join(temporary_directory, self.__meta_name), "w") as meta_file:
+                json.dump(meta, meta_file)
+            self.invalidate(file_path)
+            os.replace(temporary_directory, entry_directory)
+        except OSError:
+            logger.warning(f"Calculation {calculation.name} was not cached.\n{traceback.format_exc()}")
+            shutil.rmtree(temporary_directory, ignore_errors=True)
+            return
+        logger.info(f"Calculation {calculation.name} cached in {entry_directory}")
+        self.evict(self.get_cache_directory(file_path), keep=entry_directory)
+
+    def invalidate(self, file_path: str) -> None:
+        """Removes the cache entry of the source file."""
+        shutil.rmtree(self.get_entry_directory(file_path), ignore_errors=True)
+
+    def evict(self, cache_directory: str, keep: Optional[str] = None) -> None:
+        """
+        Removes least recently used entries until the cache directory fits into max_size.
+
+        Args:
+            cache_directory (str): cache directory to check.
+            keep (str, optional): entry directory which is never removed.
+
+        Returns:
+            None
+        """
+        entries = []
+        for entry in os.scandir(cache_directory):
+            meta_path = os.path.join(entry.path, self.__meta_name)
+            if not entry.is_dir() or not os.path.isfile(meta_path):
+                continue
+            size = sum(entry_file.stat().st_size for entry_file in os.scandir(entry.path))
+            entries.append((os.stat(meta_path).st_mtime, size, entry.path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_path in sorted(entries):
+            if total_size <= self.__max_size:
+                break
+            if entry_path == keep:
+                continue
+            shutil.rmtree(entry_path, ignore_errors=True)
+            total_size -= size
+            logger.info(f"Cache entry {entry_path} evicted")
@@ -0,0 +1,136 @@
+"""Total and projected density of states with vectorized aggregation helpers."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import logging
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["DensityOfStates", "projected_channel_names"]
+
+ORBITALS = {
+    3: ["s", "p", "d"],
+    4: ["s", "p", "d", "f"],
+    9: ["s", "py", "pz", "px", "dxy", "dyz", "dz2", "dxz", "dx2-y2"],
+    16: ["s", "py", "pz", "px", "dxy", "dyz", "dz2", "dxz", "dx2-y2", "fy3x2", "fxyz", "fyz2", "fz3", "fxz2", "fzx2", "fx3"],
+}
+
+
+def projected_channel_names(channels_number: int, spin_polarized: bool) -> list[str]:
+    """
+    Returns names of projected DOS columns of DOSCAR.
+
+    Orbitals are named by VASP order (LORBIT=10 or 11), spin-polarized columns get '_up'/'_down' suffixes,
+    noncollinear ones get '_tot', '_mx', '_my', '_mz' suffixes. Unknown layouts are named 'channel_<n>'.
+
+    Args:
+        channels_number (int): number of projected columns (without energy).
+        spin_polarized (bool): whether total DOS has separate spin up and spin down columns.
+
+    Returns:
+        list[str]: channel names.
+    """
+    if spin_polarized and channels_number // 2 in ORBITALS and channels_number % 2 == 0:
+        return [f"{orbital}_{spin}" for orbital in ORBITALS[channels_number // 2] for spin in ("up", "down")]
+    if not spin_polarized and channels_number in ORBITALS:
+        return list(ORBITALS[channels_number])
+    if not spin_polarized and channels_number % 4 == 0 and channels_number // 4 in ORBITALS:
+        return [f"{orbital}_{component}" for orbital in ORBITALS[channels_number // 4] for component in ("tot", "mx", "my", "mz")]
+    return [f"channel_{index}" for index in range(channels_number)]
+
+
+@dataclass
+class DensityOfStates:
+    """
+    Density of states data class.
+
+    Projected DOS is one contiguous (atoms, energies, channels) array, channel names are stored in channels,
+    so all aggregations are single vectorized reductions over the array.
+    """
+
+    energies: np.ndarray
+    total: np.ndarray
+    total_channels: list[str]
+    fermi_energy: float
+    projected: Optional[np.ndarray] = None
+    channels: Optional[list[str]] = None
+
+    def channel_indexes(self, channels: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Returns indexes of channels.
+
+        A name selects all channels which are equal to it or start with it followed by '_' (e.g. 's' selects
+        's_up' and 's_down') or which orbital starts with it (e.g. 'p' selects 'px', 'py' and 'pz').
+
+        Args:
+            channels (Sequence[str], optional): channel names, all channels if None.
+
+        Returns:
+            np.ndarray: indexes of the channels.
+
+        Raises:
+            KeyError: if a name does not select any channel.
+        """
+        if channels is None:
+            return np.arange(len(self.channels))
+        indexes = []
+        for name in channels:
+            selected = [index for index, channel in enumerate(self.channels) if channel == name or channel.split("_")[0].startswith(name)]
+            if not selected:
+                raise KeyError(f"There is no channel {name} in projected DOS.")
+            indexes.extend(selected)
+        return np.array(indexes)
+
+    def sum_atoms(self, atoms: Optional[Sequence[int] | np.ndarray] = None, channels: Optional[Sequence[str]] = None) -> np.ndarray:
+        """
+        Sums projected DOS over the set of atoms.
+
+        Args:
+            atoms (Sequence[int] | np.ndarray, optional): atom indexes or boolean mask, all atoms if None.
+            channels (Sequence[str], optional): channel names to keep, all channels if None.
+
+        Returns:
+            np.ndarray: array of shape (energies, channels).
+        """
+        projected = self.projected if atoms is None else self.projected[np.asarray(atoms)]
+        return projected[..., self.channel_indexes(channels)].sum(axis=0)
+
+    def sum_by_species(self, species: np.ndarray, channels: Optional[Sequence[str]] = None) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Sums projected DOS over atoms of every species with one matrix product.
+
+        Args:
+            species (np.ndarray): species of every atom, e.g. calculation.species.
+            channels (Sequence[str], optional): channel names to keep, all channels if None.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: unique species and array of shape (species, energies, channels).
+        """
+        names, inverse = np.unique(np.asarray(species), return_inverse=True)
+        groups = (inverse[np.newaxis, :] == np.arange(names.size)[:, np.newaxis]).astype(self.projected.dtype)
+        projected = self.projected[..., self.channel_indexes(channels)]
+        return names, np.tensordot(groups, projected, axes=1)
+
+    def sum_orbitals(self) -> tuple[list[str], np.ndarray]:
+        """
+        Sums lm-decomposed channels into l channels keeping spin and magnetization components.
+
+        Returns:
+            tuple[list[str], np.ndarray]: names of l channels and array of shape (atoms, energies, l channels).
+        """
+        names = []
+        for channel in self.channels:
+            orbital, *suffix = channel.split("_")
+            name = "_".join([orbital if orbital.startswith("channel") else orbital[0], *suffix])
+            if name not in names:
+                names.append(name)
+        mapping = np.zeros((len(self.channels), len(names)), dtype=self.projected.dtype)
+        for index, channel in enumerate(self.channels):
+            orbital, *suffix = channel.split("_")
+            mapping[index, names.index("_".join([orbital if orbital.startswith("channel") else orbital[0], *suffix]))] = 1
+        return names, self.projected @ mapping
@@ -0,0 +1,200 @@
+"""Jit functions for bulk decoding of calculation files."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+from numba import jit
+import numpy as np
+import logging
+logging.getLogger('numba').setLevel(logging.INFO)
+
+__all__ = [
+    "decode_floats",
+    "decode_floats_until",
+    "decode_outcar"
+]
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def decode_floats(buffer, start, end, out) -> int:
+    """
+    Decodes ASCII numbers from a byte buffer straight into a preallocated array.
+
+    Xml tags (everything between '<' and '>') and separators are skipped, so a body of
+    vasprun.xml varray block can be decoded without any preprocessing.
+
+    Args:
+        buffer: np.uint8 view of the bytes to decode.
+        start: index of the first byte to decode.
+        end: index after the last byte to decode.
+        out: contiguous array which is filled with decoded values in C order.
+
+    Returns:
+        int: number of decoded values. Decoding stops when out is full.
+    """
+    return decode_floats_until(buffer, start, end, out)[0]
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def decode_floats_until(buffer, start, end, out):
+    """
+    Decodes ASCII numbers from a byte buffer like decode_floats and reports where decoding stopped.
+
+    Args:
+        buffer: np.uint8 view of the bytes to decode.
+        start: index of the first byte to decode.
+        end: index after the last byte to decode.
+        out: contiguous array which is filled with decoded values in C order.
+
+    Returns:
+        tuple[int, int]: number of decoded values and index after the last decoded value.
+    """
+    flat = out.reshape(-1)
+    size = flat.size
+    count = 0
+    index = start
+    while index < end and count < size:
+        char = buffer[index]
+        if char == 60:  # '<'
+            while index < end and buffer[index] != 62:  # '>'
+                index += 1
+            index += 1
+            continue
+        if not (48 <= char <= 57 or char == 45 or char == 43 or char == 46):
+            index += 1
+            continue
+        sign = 1.0
+        if char == 45:  # '-'
+            sign = -1.0
+            index += 1
+        elif char == 43:  # '+'
+            index += 1
+        mantissa, exponent = 0.0, 0
+        while index < end and 48 <= buffer[index] <= 57:
+            mantissa = mantissa * 10.0 + (buffer[index] - 48)
+            index += 1
+        if index < end and buffer[index] == 46:  # '.'
+            index += 1
+            while index < end and 48 <= buffer[index] <= 57:
+                mantissa = mantissa * 10.0 + (buffer[index] - 48)
+                exponent -= 1
+                index += 1
+        if index < end and (buffer[index] == 101 or buffer[index] == 69):  # 'e' or 'E'
+            index += 1
+            exponent_sign, exponent_value = 1, 0
+            if index < end and buffer[index] == 45:
+                exponent_sign = -1
+                index += 1
+            elif index < end and buffer[index] == 43:
+                index += 1
+            while index < end and 48 <= buffer[index] <= 57:
+                exponent_value = exponent_value * 10 + (buffer[index] - 48)
+                index += 1
+            exponent += exponent_sign * exponent_value
+        if exponent < 0:
+            flat[count] = sign * mantissa / 10.0 ** (-exponent)
+        else:
+            flat[count] = sign * mantissa * 10.0 ** exponent
+        count += 1
+    return count, index
+
+
+OUTCAR_POSITION = np.frombuffer(b"POSITION", dtype=np.uint8)
+OUTCAR_LATTICE = np.frombuffer(b"direct lattice vectors", dtype=np.uint8)
+OUTCAR_TOTEN = np.frombuffer(b"free  energy   TOTEN  =", dtype=np.uint8)
+OUTCAR_STRESS = np.frombuffer(b"in kB", dtype=np.uint8)
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def starts_with(buffer, index, end, pattern) -> bool:
+    """Checks whether the bytes of buffer starting from index are equal to pattern."""
+    if index + pattern.size > end:
+        return False
+    for shift in range(pattern.size):
+        if buffer[index + shift] != pattern[shift]:
+            return False
+    return True
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def skip_lines(buffer, index, end, lines) -> int:
+    """Returns index after the given number of complete lines starting from index or -1 if data ends earlier."""
+    for _ in range(lines):
+        while index < end and buffer[index] != 10:  # '\n'
+            index += 1
+        if index == end:
+            return -1
+        index += 1
+    return index
+
+
+@jit(fastmath=True, nopython=True, cache=True)
+def decode_outcar(buffer, start, end, table, cells, energy, stress, cell, counts):
+    """
+    Decodes ionic steps of OUTCAR line by line straight into preallocated arrays.
+
+    POSITION ... TOTAL-FORCE tables are decoded into table with the current lattice vectors copied into cells,
+    'direct lattice vectors' blocks update cell, 'free  energy   TOTEN' lines fill energy and 'in kB' lines
+    fill stress (NaN if the line cannot be decoded). Only complete blocks are decoded.
+
+    Args:
+        buffer: np.uint8 view of the bytes to decode.
+        start: index of the first byte to decode.
+        end: index after the last byte to decode.
+        table: float32 array of shape (steps, atoms, 6).
+        cells: float32 array of shape (steps, 3, 3).
+        energy: float64 array of shape (steps,).
+        stress: float32 array of shape (steps, 6).
+        cell: float32 array of shape (3, 3) with the current lattice vectors, updated in place.
+        counts: int64 array with numbers of filled tables, energies and stresses, updated in place.
+
+    Returns:
+        tuple[int, int]: index to continue from and status: 0 - data ended (the rest is an incomplete block),
+        1 - one of the arrays is full, 2 - a block can not be decoded.
+    """
+    atoms_number = table.shape[1]
+    lattice = np.empty((3, 6), dtype=np.float32)
+    index = start
+    while index < end:
+        line_end = skip_lines(buffer, index, end, 1)
+        if line_end == -1:
+            return index, 0
+        first = index
+        while first < line_end and buffer[first] == 32:  # ' '
+            first += 1
+        char = buffer[first]
+        if char == 80 and starts_with(buffer, first, line_end, OUTCAR_POSITION):  # 'P'
+            body = skip_lines(buffer, line_end, end, 1)
+            body_end = skip_lines(buffer, body, end, atoms_number) if body != -1 else -1
+            if body_end == -1:
+                return index, 0
+            if counts[0] == table.shape[0]:
+                return index, 1
+            if cell[0, 0] != cell[0, 0] or decode_floats(buffer, body, body_end, table[counts[0]]) != atoms_number * 6:
+                return index, 2
+            cells[counts[0]] = cell
+            counts[0] += 1
+            line_end = body_end
+        elif char == 100 and starts_with(buffer, first, line_end, OUTCAR_LATTICE):  # 'd'
+            body_end = skip_lines(buffer, line_end, end, 3)
+            if body_end == -1:
+                return index, 0
+            if decode_floats(buffer, line_end, body_end, lattice) != 18:
+                return index, 2
+            cell[:] = lattice[:, :3]
+            line_end = body_end
+        elif char == 102 and starts_with(buffer, first, line_end, OUTCAR_TOTEN):  # 'f'
+            if counts[1] == energy.shape[0]:
+                return index, 1
+            if decode_floats(buffer, first + OUTCAR_TOTEN.size, line_end, energy[counts[1]:counts[1] + 1]) != 1:
+                return index, 2
+            counts[1] += 1
+        elif char == 105 and starts_with(buffer, first, line_end, OUTCAR_STRESS):  # 'i'
+            if counts[2] == stress.shape[0]:
+                return index, 1
+            if decode_floats(buffer, first + OUTCAR_STRESS.size, line_end, stress[counts[2]]) != 6:
+                stress[counts[2]] = np.nan
+            counts[2] += 1
+        index = line_end
+    return index, 0
@@ -0,0 +1,116 @@
+"""Transfer of parsed calculations between processes through shared memory."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import traceback
+import numpy as np
+import logging
+from dataclasses import fields
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from parsers.parser import *
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["SharedCalculation", "read_to_shared_memory"]
+
+
+class SharedCalculation:
+    """
+    Picklable description of a calculation whose arrays are stored in shared memory blocks.
+
+    The object is created in the process which parsed the calculation. Every non-empty numeric
+    array field of the calculation (positions, forces, cell, ...) is copied into its own shared
+    memory block, other fields are pickled as is. In the receiving process to_calculation
+    rebuilds the calculation with arrays which are zero-copy views of the shared blocks.
+    """
+
+    def __init__(self, calculation: Calculation):
+        """Copies array fields of the calculation into new shared memory blocks."""
+        self.__blocks = dict()
+        self.__values = dict()
+        self.__shared_memory = []
+        for calculation_field in fields(calculation):
+            value = getattr(calculation, calculation_field.name)
+            if isinstance(value, np.ndarray) and value.dtype != object and value.nbytes:
+                shared_memory = SharedMemory(create=True, size=value.nbytes)
+                shared_array = np.ndarray(value.shape, dtype=value.dtype, buffer=shared_memory.buf)
+                shared_array[...] = value
+                del shared_array
+                # ownership of the block is passed to the receiving process, which unlinks it after attaching
+                resource_tracker.unregister(shared_memory._name, "shared_memory")
+                self.__shared_memory.append(shared_memory)
+                self.__blocks[calculation_field.name] = (shared_memory.name, value.shape, value.dtype.str)
+            else:
+                self.__values[calculation_field.name] = value
+
+    def __getstate__(self) -> dict:
+        """Excludes shared memory handles of the creating process from pickling."""
+        state = self.__dict__.copy()
+        state["_SharedCalculation__shared_memory"] = []
+        return state
+
+    def get_blocks(self) -> dict:
+        """Returns shared memory blocks description: field name -> (block name, shape, dtype)."""
+        return self.__blocks
+
+    def to_calculation(self) -> Calculation:
+        """
+        Attaches shared memory blocks and rebuilds the calculation with zero-copy arrays.
+
+        Blocks are unlinked right after attaching, so the memory is released as soon as the
+        calculation is deleted. Handles of the blocks are kept in calculation.extra['shared_memory'].
+
+        Returns:
+            Calculation: rebuilt calculation.
+        """
+        values = dict(self.__values)
+        shared_memory_list = []
+        for name, (shared_memory_name, shape, dtype) in self.__blocks.items():
+            shared_memory = SharedMemory(name=shared_memory_name)
+            shared_memory_list.append(shared_memory)
+            values[name] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf)
+            shared_memory.unlink()
+        calculation = Calculation(**values)
+        if calculation.extra is None:
+            calculation.extra = dict()
+        if isinstance(calculation.extra, dict):
+            calculation.extra['shared_memory'] = shared_memory_list
+        logger.info(f"Calculation {calculation.name} attached from {len(shared_memory_list)} shared memory blocks")
+        return calculation
+
+    def close(self) -> None:
+        """Closes shared memory handles of the creating process."""
+        for shared_memory in self.__shared_memory:
+            shared_memory.close()
+        self.__shared_memory.clear()
+
+
+def read_to_shared_memory(parser: AbstractParser, connection) -> None:
+    """
+    Reads calculation and sends it to the parent process through shared memory.
+
+    Is used as a target of multiprocessing.Process. The SharedCalculation object is sent through
+    the connection, then the process waits for the acknowledgement of the parent before closing
+    its handles, so the blocks survive on platforms without named shared memory persistence.
+
+    Args:
+        parser: parser object with read and get_calculation methods.
+        connection: child end of multiprocessing.Pipe.
+
+    Returns:
+        None
+    """
+    try:
+        parser.read()
+    except Exception:
+        parser.get_calculation().errors.exist = True
+        parser.get_calculation().errors.message = f"Exception occurred during parsing.\n{traceback.format_exc()}"
+        logger.error(parser.get_calculation().errors.message)
+    shared_calculation = SharedCalculation(parser.get_calculation())
+    connection.send(shared_calculation)
+    connection.recv()
+    shared_calculation.close()
+    connection.close()
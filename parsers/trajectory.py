@@ -0,0 +1,274 @@
+"""Lazy frame-indexed access to trajectories stored in calculation files."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import re
+import numpy as np
+import logging
+from typing import Optional
+from threading import Lock, Thread
+from collections import OrderedDict
+from parsers.jit_functions import decode_floats
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["TrajectoryIndex", "LazyTrajectory"]
+
+
+class TrajectoryIndex:
+    """
+    Byte-offset index of varray blocks of one kind with a bounded LRU cache of decoded frames.
+
+    The index is built by a single scan of the file which only searches for block tags, frames are decoded
+    on demand with decode_floats. Frames are stored in the cache with the shift already applied, so views
+    of the same index (e.g. direct and cartesian positions) share decoded frames. Frames following the viewed
+    one are decoded in background by a single worker per index.
+    """
+    __chunk_size = 64 * 1024 ** 2  # bytes scanned at once while building the index
+    __varray_end = b"</varray>"
+
+    def __init__(self, file_path: str, offsets: np.ndarray, atoms_number: int, shift: float = 0.0, cache_size: int = 256):
+        """
+        Index initialization function.
+
+        Args:
+            file_path (str): path to the indexed file.
+            offsets (np.ndarray): int64 array of shape (frames, 2) with the first byte of every block body and
+                the byte of its closing tag.
+            atoms_number (int): number of rows in every block.
+            shift (float): value added to every decoded frame.
+            cache_size (int): maximal number of decoded frames kept in memory.
+        """
+        self.file_path = file_path
+        self.offsets = offsets
+        self.atoms_number = atoms_number
+        self.shift = shift
+        self.cache_size = cache_size
+        self.__cache = OrderedDict()
+        self.__locker = Lock()
+        self.__target = (0, 0)
+        self.__worker = None
+
+    def __getstate__(self) -> dict:
+        """Excludes the frame cache, the lock and the prefetch worker from pickling."""
+        state = self.__dict__.copy()
+        state["_TrajectoryIndex__cache"] = OrderedDict()
+        state["_TrajectoryIndex__worker"] = None
+        del state["_TrajectoryIndex__locker"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restores the index with an empty frame cache."""
+        self.__dict__.update(state)
+        self.__locker = Lock()
+
+    def __len__(self) -> int:
+        """Returns number of indexed frames."""
+        return self.offsets.shape[0]
+
+    @classmethod
+    def build(cls, file_path: str, names: tuple[str, ...], atoms_number: int, start: int = 0,
+              skips: Optional[dict] = None, shifts: Optional[dict] = None, cache_size: int = 256,
+              rows: Optional[dict] = None) -> dict:
+        """
+        Builds indexes of <varray name="..." > blocks with one scan of the file in chunks.
+
+        Args:
+            file_path (str): path to the file.
+            names (tuple[str, ...]): names of the varray blocks to index.
+            atoms_number (int): number of rows in every block if it is not given in rows.
+            start (int): byte to start scanning from.
+            skips (dict, optional): number of first met blocks which are not indexed for every name.
+            shifts (dict, optional): shift of decoded frames for every name.
+            cache_size (int): maximal number of decoded frames kept in memory by every index.
+            rows (dict, optional): number of rows in blocks for names which blocks are not of atoms_number rows
+                (e.g. 3 for basis).
+
+        Returns:
+            dict: name -> TrajectoryIndex.
+        """
+        pattern = re.compile(rb'<varray name="(' + "|".join(names).encode() + rb')" >')
+        skips = {name: (skips or dict()).get(name, 0) for name in names}
+        offsets, data, data_start = {name: [] for name in names}, b"", start
+        with open(file_path, "rb") as file:
+            file.seek(start)
+            while True:
+                chunk = file.read(cls.__chunk_size)
+                data = data + chunk if data else chunk
+                position = 0
+                while True:
+                    match = pattern.search(data, position)
+                    if match is None:
+                        position = max(position, len(data) - 32)
+                        break
+                    end = data.find(cls.__varray_end, match.end())
+                    if end == -1:
+                        position = match.start()
+                        break
+                    name = match.group(1).decode()
+                    if skips[name]:
+                        skips[name] -= 1
+                    else:
+                        offsets[name].append((data_start + match.end(), data_start + end))
+                    position = end + len(cls.__varray_end)
+                data, data_start = data[position:], data_start + position
+                if not chunk:
+                    break
+        indexes = dict()
+        for name in names:
+            name_offsets = np.array(offsets[name], dtype=np.int64).reshape((-1, 2))
+            indexes[name] = cls(file_path, name_offsets, (rows or dict()).get(name, atoms_number),
+                                (shifts or dict()).get(name, 0.0), cache_size)
+            logger.info(f"{name_offsets.shape[0]} {name} blocks indexed in {file_path}")
+        return indexes
+
+    def decode(self, frame: int) -> np.ndarray:
+        """Reads and decodes one frame from the file bypassing the cache."""
+        start, end = self.offsets[frame]
+        with open(self.file_path, "rb") as file:
+            file.seek(start)
+            buffer = np.frombuffer(file.read(end - start), dtype=np.uint8)
+        out = np.empty((self.atoms_number, 3), dtype=np.float32)
+        if decode_floats(buffer, 0, buffer.size, out) != out.size:
+            raise ValueError(f"Varray block at byte {start} of {self.file_path} contains less than {out.size} values.")
+        if self.shift:
+            out += self.shift
+        return out
+
+    def decode_all(self) -> np.ndarray:
+        """Decodes all frames with one pass over the file bypassing the cache, intended for small blocks like basis."""
+        out = np.empty((len(self), self.atoms_number, 3), dtype=np.float32)
+        with open(self.file_path, "rb") as file:
+            for frame, (start, end) in enumerate(self.offsets):
+                file.seek(start)
+                buffer = np.frombuffer(file.read(end - start), dtype=np.uint8)
+                if decode_floats(buffer, 0, buffer.size, out[frame]) != out[frame].size:
+                    raise ValueError(f"Varray block at byte {start} of {self.file_path} contains less than {out[frame].size} values.")
+        if self.shift:
+            out += self.shift
+        return out
+
+    def frame(self, frame: int) -> np.ndarray:
+        """Returns the frame from the cache decoding it if needed. Returned array must not be modified."""
+        with self.__locker:
+            if frame in self.__cache:
+                self.__cache.move_to_end(frame)
+                return self.__cache[frame]
+        out = self.decode(frame)
+        out.flags.writeable = False
+        with self.__locker:
+            self.__cache[frame] = out
+            while len(self.__cache) > self.cache_size:
+                self.__cache.popitem(last=False)
+        return out
+
+    def prefetch(self, frames) -> None:
+        """Decodes given frames into the cache. Frames out of range are ignored."""
+        for frame in frames:
+            if 0 <= frame < len(self):
+                self.frame(frame)
+
+    def prefetch_async(self, start: int, count: int) -> None:
+        """
+        Decodes count frames from start into the cache on the worker thread of the index.
+
+        Only the latest target is kept, so frequent calls, e.g. on every slider event, neither start new threads nor
+        decode frames of outdated targets.
+        """
+        with self.__locker:
+            self.__target = (start, min(count, self.cache_size))
+            if self.__worker is not None:
+                return
+            worker = self.__worker = Thread(target=self.__prefetch_run, daemon=True)
+        worker.start()
+
+    def __prefetch_run(self) -> None:
+        """Decodes frames until all frames of the target are in the cache."""
+        while True:
+            with self.__locker:
+                start, count = self.__target
+                missing = [frame for frame in range(max(start, 0), min(start + count, len(self))) if frame not in self.__cache]
+                if not missing:
+                    self.__worker = None
+                    return
+            self.frame(missing[0])
+
+
+class LazyTrajectory:
+    """
+    Array-like (steps, atoms, 3) trajectory decoding frames on demand.
+
+    Integer indexing returns one frame, slices and index arrays return stacked frames, further indexes
+    are applied to the result, e.g. trajectory[10, :5] or trajectory[::100]. If cell is given, frames are
+    converted to cartesian coordinates, cell of shape (steps, 3, 3) gives a separate cell for every frame. np.asarray materializes the whole trajectory.
+    """
+    dtype = np.dtype(np.float32)
+    ndim = 3
+
+    def __init__(self, index: TrajectoryIndex, cell: Optional[np.ndarray] = None):
+        """
+        Trajectory initialization function.
+
+        Args:
+            index (TrajectoryIndex): index of the frames.
+            cell (np.ndarray, optional): cell vectors of shape (3, 3) or (steps, 3, 3) used to convert frames
+                to cartesian coordinates.
+        """
+        self.index = index
+        self.cell = cell
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        """Returns shape of the trajectory."""
+        return len(self.index), self.index.atoms_number, 3
+
+    @property
+    def nbytes(self) -> int:
+        """Returns size of the materialized trajectory in bytes."""
+        return int(np.prod(self.shape)) * self.dtype.itemsize
+
+    def __len__(self) -> int:
+        """Returns number of frames."""
+        return len(self.index)
+
+    def frame(self, frame: int) -> np.ndarray:
+        """Returns one frame of the trajectory."""
+        if frame < 0:
+            frame += len(self)
+        if not 0 <= frame < len(self):
+            raise IndexError(f"Frame {frame} is out of range for trajectory with {len(self)} frames.")
+        out = self.index.frame(frame)
+        if self.cell is None:
+            return out
+        return out @ (self.cell if self.cell.ndim == 2 else self.cell[frame])
+
+    def __getitem__(self, key):
+        """Returns frames of the trajectory, see the class description."""
+        rest = ()
+        if isinstance(key, tuple):
+            key, rest = key[0], key[1:]
+        if isinstance(key, (int, np.integer)):
+            out = self.frame(int(key))
+        else:
+            frames = np.arange(len(self))[key]
+            out = np.empty((frames.size, *self.shape[1:]), dtype=self.dtype)
+            for num, frame in enumerate(frames):
+                out[num] = self.frame(frame)
+            rest = (slice(None), *rest) if rest else rest
+        return out[rest] if rest else out
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """Materializes the whole trajectory."""
+        logger.info(f"Materializing trajectory of {self.nbytes / 1024 ** 2:.1f} MB from {self.index.file_path}")
+        out = self[:]
+        return out if dtype is None else out.astype(dtype)
+
+    def prefetch(self, frames) -> None:
+        """Decodes given frames into the cache of the index."""
+        self.index.prefetch(frames)
+
+    def prefetch_async(self, start: int, count: int) -> None:
+        """Decodes count frames from start into the cache of the index in background."""
+        self.index.prefetch_async(start, count)
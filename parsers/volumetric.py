@@ -0,0 +1,192 @@
+"""Volumetric data of CHGCAR/CHG files stored in memory-mapped grids."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import os
+import re
+import hashlib
+import numpy as np
+import logging
+from typing import Optional
+from parsers.jit_functions import decode_floats, decode_floats_until
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["VolumetricData"]
+
+
+class VolumetricData:
+    """
+    Volumetric grids of CHGCAR/CHG file.
+
+    The total density grid is decoded in chunks of fixed size straight into a memory-mapped float32 .npy file,
+    so the grid is never held as Python objects or fully in memory. Grids are indexed as [x, y, z] and contain
+    values as they are written by VASP (density multiplied by the cell volume). The spin (magnetization) grid and
+    augmentation occupancies are located and decoded lazily on the first request. Decoded .npy files are reused
+    while they are newer than the source file.
+    """
+    __chunk_size = 16 * 1024 ** 2  # bytes decoded at once
+    __augmentation_tag = b"augmentation occupancies"
+
+    def __init__(self, file_path: str, grid_offset: int, shape: tuple[int, int, int], grid_directory: str):
+        """
+        Volumetric data initialization function.
+
+        Args:
+            file_path (str): path to CHGCAR/CHG file.
+            grid_offset (int): byte offset of the first value of the total density grid.
+            shape (tuple[int, int, int]): numbers of grid points along the cell vectors.
+            grid_directory (str): directory for decoded .npy grids.
+        """
+        self.file_path = file_path
+        self.shape = shape
+        self.__grid_directory = grid_directory
+        self.__offsets = {"density": grid_offset}
+        self.__ends = dict()
+        self.__grids = dict()
+        self.__augmentation = None
+
+    def __getstate__(self) -> dict:
+        """Excludes memory-mapped grids from pickling, they are reopened from .npy files."""
+        state = self.__dict__.copy()
+        state["_VolumetricData__grids"] = dict()
+        return state
+
+    def get_grid_path(self, name: str) -> str:
+        """Returns path to the .npy file of the grid."""
+        path_hash = hashlib.sha1(os.path.abspath(self.file_path).encode()).hexdigest()
+        return os.path.join(self.__grid_directory, f"{path_hash}.{name}.npy")
+
+    def get_density(self) -> np.ndarray:
+        """Returns the total density grid of shape (nx, ny, nz), decoding it on the first call."""
+        return self.get_grid("density")
+
+    def get_spin_density(self) -> Optional[np.ndarray]:
+        """Returns the magnetization grid of shape (nx, ny, nz) or None if the calculation is not spin-polarized."""
+        self.index()
+        return self.get_grid("magnetization") if "magnetization" in self.__offsets else None
+
+    def get_augmentation(self, atom: int) -> Optional[np.ndarray]:
+        """
+        Returns augmentation occupancies of the total density for the atom.
+
+        Args:
+            atom (int): zero-based atom index.
+
+        Returns:
+            np.ndarray: float32 occupancies or None if the file has no augmentation block for the atom (e.g. CHG).
+        """
+        self.index()
+        if atom not in self.__augmentation:
+            return None
+        offset = self.__augmentation[atom]
+        with open(self.file_path, "rb") as volumetric:
+            volumetric.seek(offset)
+            count = int(volumetric.readline().split()[3])
+            out = np.empty(count, dtype=np.float32)
+            buffer = np.frombuffer(volumetric.read(count * 32 + 1024), dtype=np.uint8)
+        if decode_floats(buffer, 0, buffer.size, out) != count:
+            raise ValueError(f"Augmentation block of atom {atom + 1} in {self.file_path} contains less than {count} values.")
+        return out
+
+    def get_grid(self, name: str) -> np.ndarray:
+        """Returns the grid decoding it into .npy file if there is no actual one."""
+        if name not in self.__grids:
+            path = self.get_grid_path(name)
+            if os.path.isfile(path) and os.path.getmtime(path) >= os.path.getmtime(self.file_path):
+                grid = np.load(path, mmap_mode="r")
+                if grid.shape != self.shape[::-1]:
+                    grid = self.decode_grid(name)
+            else:
+                grid = self.decode_grid(name)
+            self.__grids[name] = grid.transpose(2, 1, 0)
+        return self.__grids[name]
+
+    def decode_grid(self, name: str) -> np.ndarray:
+        """
+        Decodes the grid from the source file into a memory-mapped float32 .npy file in chunks.
+
+        Args:
+            name (str): grid name, 'density' or 'magnetization'.
+
+        Returns:
+            np.ndarray: memory-mapped grid of shape (nz, ny, nx), x is the fastest index as in the file.
+        """
+        os.makedirs(self.__grid_directory, exist_ok=True)
+        path = self.get_grid_path(name)
+        grid = np.lib.format.open_memmap(path, mode="w+", dtype=np.float32, shape=self.shape[::-1])
+        flat = np.asarray(grid).reshape(-1)
+        filled, data, data_start = 0, b"", self.__offsets[name]
+        with open(self.file_path, "rb") as volumetric:
+            volumetric.seek(data_start)
+            while filled < flat.size:
+                chunk = volumetric.read(self.__chunk_size)
+                data = data + chunk if data else chunk
+                limit = data.rfind(b"\n") + 1 if chunk else len(data)
+                count, index = decode_floats_until(np.frombuffer(data, dtype=np.uint8), 0, limit, flat[filled:])
+                filled += count
+                data, data_start = data[index:], data_start + index
+                if not chunk:
+                    break
+        grid.flush()
+        if filled != flat.size:
+            raise ValueError(f"Grid {name} in {self.file_path} contains {filled} values instead of {flat.size}.")
+        self.__ends[name] = data_start
+        logger.info(f"Grid {name} of {self.file_path} decoded into {path}")
+        return grid
+
+    def index(self) -> None:
+        """
+        Locates augmentation occupancies of the total density and the magnetization grid.
+
+        The file is scanned from the end of the total density grid up to the header of the magnetization grid,
+        which repeats the grid dimensions line, so the magnetization grid itself is not read.
+        """
+        if self.__augmentation is not None:
+            return
+        if "density" not in self.__ends:
+            self.__ends["density"] = self.find_grid_end("density")
+        dimensions = re.compile(rb"\n\s*" + rb"\s+".join(str(size).encode() for size in self.shape) + rb"\s*\n")
+        self.__augmentation = dict()
+        data, data_start = b"", self.__ends["density"]
+        with open(self.file_path, "rb") as volumetric:
+            volumetric.seek(data_start)
+            while True:
+                chunk = volumetric.read(self.__chunk_size)
+                data = data + chunk if data else chunk
+                match = dimensions.search(data)
+                limit = match.start() if match is not None else max(len(data) - 64, 0) if chunk else len(data)
+                position = data.find(self.__augmentation_tag, 0, limit)
+                while position != -1:
+                    self.__augmentation[int(data[position:data.find(b"\n", position)].split()[2]) - 1] = data_start + position
+                    position = data.find(self.__augmentation_tag, position + 1, limit)
+                if match is not None:
+                    self.__offsets["magnetization"] = data_start + match.end()
+                    break
+                if not chunk:
+                    break
+                data, data_start = data[limit:], data_start + limit
+
+    def find_grid_end(self, name: str) -> int:
+        """Returns byte offset after the last value of the grid skipping its values without storing them."""
+        size, filled, data, data_start = int(np.prod(self.shape)), 0, b"", self.__offsets[name]
+        out = np.empty(min(size, self.__chunk_size // 8), dtype=np.float32)
+        with open(self.file_path, "rb") as volumetric:
+            volumetric.seek(data_start)
+            while filled < size:
+                chunk = volumetric.read(self.__chunk_size)
+                data = data + chunk if data else chunk
+                buffer = np.frombuffer(data, dtype=np.uint8)
+                limit = data.rfind(b"\n") + 1 if chunk else len(data)
+                index = 0
+                while filled < size:
+                    count, index = decode_floats_until(buffer, index, limit, out[:size - filled])
+                    filled += count
+                    if not count:
+                        break
+                data, data_start = data[index:], data_start + index
+                if not chunk:
+                    break
+        return data_start
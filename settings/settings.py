@@ -47,6 +47,7 @@ class Settings:
     - set_control_params: Sets control parameters.
     - get_processing_params: Retrieves processing parameters from the internal settings.
     - set_processing_params: Sets processing parameters within the internal dictionary.
+    - get_atoms_params: Retrieves atoms parameters, e.g. colors and scales of species.
     - save_settings: Saves the current settings to a JSON file.
     """
     _instance = None
@@ -114,10 +115,12 @@ class Settings:
             for various windows (print, control, visual, processing, graph,
             file_sharing, console, chgcar, form_poscar, oszicar, bonds).
           __scene_params (dict): A dictionary containing parameters related to
-            the scene, including lighting, view, background, fog, and bond
-            appearance.
+            the scene, including lighting, view, background, fog, bond
+            appearance, the skin distance of the bonds Verlet list and the
+            video memory budget in MB of trajectories kept on the GPU.
           __control_params (dict): A dictionary storing parameters controlling
-            user interaction and control.
+            user interaction and control, including whether parsed calculations
+            are stored in the on-disk cache next to their files.
           __processing_params (dict): A dictionary storing parameters related
             to data processing.
           __atoms_params (dict): A dictionary storing parameters related to
@@ -187,13 +190,20 @@ class Settings:
             },
             'bond': {
                 'length': 1.8,
-                'radius': 0.2
+                'radius': 0.2,
+                'skin': 0.3
+            },
+            'trajectory': {
+                'gpu_memory_budget': 512
             }
         }
         self.__control_params = {
             'only_keyboard_selection': True,
             'slider_speed': 1,
             'browse_folder_path': None,
+            'follow_calculations': False,
+            'follow_interval': 1.0,
+            'calculation_cache': False,
         }
         self.__processing_params = {
             'delete_coordinates_after_leave_cell': True
@@ -704,6 +714,18 @@ class Settings:
         """
         Settings.__set_dict_value(self.__processing_params, value, *keys)
 
+    def get_atoms_params(self, *keys) -> Any:
+        """
+        Retrieves atoms parameters, e.g. colors and scales of species.
+        
+        Args:
+            *keys: A variable number of keys to access nested values within the atoms parameters.
+        
+        Returns:
+            The value associated with the given keys, or None if the keys are invalid.
+        """
+        return Settings.__get_dict_value(self.__atoms_params, *keys)
+
     def save_settings(self) -> Self:
         """
         Saves the current settings to a JSON file.
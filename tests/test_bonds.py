@@ -0,0 +1,52 @@
+"""Tests of the periodic bond search against the brute-force minimum-image search."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import pytest
+from visual.jit_functions.bonds import bond_pairs, neighbour_list
+
+CUTOFFS = np.array([[1.8, 2.2], [2.2, 1.5]])
+
+
+def brute_force_pairs(direct, cell, types, cutoffs, valid):
+    """Returns the set of bonded pairs (first, second) with first < second and their distances."""
+    difference = direct[np.newaxis, :, :] - direct[:, np.newaxis, :]
+    difference -= np.floor(difference + 0.5)
+    distances = np.linalg.norm(difference @ cell, axis=-1)
+    first, second = np.nonzero(np.triu(distances <= cutoffs[types][:, types], k=1) & valid[:, np.newaxis] & valid)
+    return {(int(i), int(j)): distances[i, j] for i, j in zip(first, second)}
+
+
+def random_frame(atoms, cell, seed):
+    """Returns direct coordinates outside of the unit cube, types and the valid mask of a random frame."""
+    rng = np.random.default_rng(seed)
+    direct = rng.random((atoms, 3)) * 3 - 1
+    types = rng.integers(0, 2, atoms)
+    valid = rng.random(atoms) > 0.05
+    return np.where(valid[:, np.newaxis], direct, 0.0), types, valid
+
+
+@pytest.mark.parametrize("atoms, length", [(300, 12.0), (200, 5.0), (400, 20.0)])
+def test_bond_pairs_match_brute_force_in_skewed_cell(atoms, length):
+    cell = np.array([[length, 0.0, 0.0], [0.3 * length, length, 0.0], [0.1, 0.2, 0.9 * length]])
+    direct, types, valid = random_frame(atoms, cell, seed=atoms)
+    first, second, distances = bond_pairs(direct, cell, types, CUTOFFS, valid)
+    expected = brute_force_pairs(direct, cell, types, CUTOFFS, valid)
+    assert np.all(first < second)
+    assert set(zip(first.tolist(), second.tolist())) == set(expected)
+    assert np.allclose(distances, [expected[pair] for pair in zip(first.tolist(), second.tolist())])
+
+
+def test_neighbour_list_is_symmetric_csr_of_bond_pairs():
+    cell = np.array([[10.0, 0.0, 0.0], [4.0, 9.0, 0.0], [1.0, 2.0, 11.0]])
+    direct, types, valid = random_frame(250, cell, seed=0)
+    offsets, neighbours, distances = neighbour_list(direct, cell, types, CUTOFFS, valid)
+    expected = brute_force_pairs(direct, cell, types, CUTOFFS, valid)
+    assert offsets[-1] == 2 * len(expected)
+    for atom in range(direct.shape[0]):
+        for index in range(offsets[atom], offsets[atom + 1]):
+            pair = (min(atom, int(neighbours[index])), max(atom, int(neighbours[index])))
+            assert np.isclose(distances[index], expected[pair])
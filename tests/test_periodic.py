@@ -0,0 +1,52 @@
+"""Tests of the vectorized periodic unwrapping against the step-by-step rule."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import logging
+import numpy as np
+import pytest
+from analysis.periodic import unwrap_direct
+
+
+def unwrap_step_by_step(direct):
+    """Unwraps every column with unwrapped[t] = direct[t] + round(unwrapped[t - 1] - direct[t]), NaN keeps the shift."""
+    flat_direct = direct.reshape((direct.shape[0], -1))
+    unwrapped = flat_direct.copy()
+    for column in range(flat_direct.shape[1]):
+        shift = 0.0
+        for step in range(1, flat_direct.shape[0]):
+            factor = np.round(unwrapped[step - 1, column] - flat_direct[step, column])
+            if not np.isnan(factor):
+                shift = factor
+            unwrapped[step, column] = flat_direct[step, column] + shift
+    return unwrapped.reshape(direct.shape)
+
+
+@pytest.mark.parametrize("steps, atoms, seed", [(500, 20, 0), (2000, 5, 1)])
+def test_unwrap_direct_matches_step_by_step_rule(steps, atoms, seed):
+    rng = np.random.default_rng(seed)
+    direct = np.cumsum(rng.normal(0.0, 0.2, (steps, atoms, 3)), axis=0) % 1.0
+    assert np.array_equal(unwrap_direct(direct), unwrap_step_by_step(direct))
+
+
+def test_unwrap_direct_half_integer_differences(caplog):
+    direct = np.zeros((8, 2, 3))
+    direct[:, 0, 0] = [0.875, 0.125, 0.625, 0.125, 0.625, 0.875, 0.125, 0.625]
+    direct[:, 1, 1] = [0.125, 0.875, 0.375, 0.875, 0.375, 0.125, 0.875, 0.375]
+    with caplog.at_level(logging.DEBUG, logger="analysis.periodic"):
+        unwrapped = unwrap_direct(direct)
+    assert "unwrapped sequentially" in caplog.text
+    assert np.array_equal(unwrapped, unwrap_step_by_step(direct))
+
+
+def test_unwrap_direct_nan_gap_keeps_shift():
+    rng = np.random.default_rng(2)
+    direct = np.cumsum(rng.normal(0.0, 0.2, (300, 4, 3)), axis=0) % 1.0
+    direct[100:140, 1] = np.nan
+    direct[250:, 2, 0] = np.nan
+    unwrapped = unwrap_direct(direct)
+    expected = unwrap_step_by_step(direct)
+    assert np.array_equal(np.isnan(unwrapped), np.isnan(direct))
+    assert np.array_equal(unwrapped, expected, equal_nan=True)
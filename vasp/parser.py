@@ -5,11 +5,13 @@
 # See LICENSE.txt for details.
 
 import os
-import copy
 import random
 import traceback
 import numpy as np
 import logging
+from itertools import repeat
+from multiprocessing import cpu_count
+from concurrent.futures import ProcessPoolExecutor
 logger = logging.getLogger(__name__)
 
 __all__ = ["Parser"]
@@ -26,11 +28,7 @@ def deleted_positions_to_none(direct_positions_array, positions_array):
     Returns:
         None
     """
-    for arr_step in direct_positions_array:
-        for atom in arr_step:
-            for indx, proj in enumerate(atom):
-                if proj == 10.:
-                    atom[indx] = None
+    direct_positions_array[direct_positions_array == 10.] = None
 
 
 def atoms_info_filling(dictionary):
@@ -142,6 +140,91 @@ def form_atoms_with_nums_dict(parser_parameters):
         parser_parameters['ATOM-NUMBERS'][key] = np.array(parser_parameters['ATOM-NUMBERS'][key])
 
 
+def read_vasprun_segment(directory, xml):
+    """
+    Reads a single vasprun file of a segmented calculation.
+    
+    Is executed in worker processes of read_vasprun_segments, so it works only with its arguments and returns
+    plain picklable data.
+    
+    Args:
+        directory (str): The directory containing the VASP XML files.
+        xml (str): The name of the vasprun file.
+    
+    Returns:
+        dict: A dictionary with 'ATOMNAMES', 'ATOMNUMBER', 'POMASS', 'POSITIONS' (np.ndarray of shape (steps, atoms, 3)),
+        'POTIM', 'TYPE', 'BASIS', 'VASPLEN' and 'MESSAGE' (empty string if the file was read without mistakes) keys.
+    """
+    segment = {'ATOMNAMES': [], 'ATOMNUMBER': 0, 'POMASS': [], 'POSITIONS': [], 'POTIM': 0., 'TYPE': [], 'MESSAGE': ''}
+    potim_read, basis_read = True, True
+    first_read_check, first_coord_read = True, True
+    with open(os.path.join(directory, xml), 'r') as vasp:
+        while True:
+            line = vasp.readline()
+            if not line:
+                break
+            if '<atoms>' in line:
+                segment['ATOMNUMBER'] = int(line.split()[1])
+            if '<field type="int">atomtype</field>' in line:
+                vasp.readline()
+                for index in range(segment['ATOMNUMBER']):
+                    atomtype = vasp.readline()
+                    segment['ATOMNAMES'].append((atomtype.split('>')[2]).split('<')[0])
+                    segment['TYPE'].append(int(atomtype.split('<')[4].split('>')[1]))
+            if potim_read and 'name="POTIM">' in line:
+                segment['POTIM'] = float(line.split()[2].split('<')[0])
+                potim_read = False
+            if 'name="POMASS">' in line:
+                for mass in line.split()[2:-1]:
+                    segment['POMASS'].append(float(mass))
+                segment['POMASS'].append(float((line.split()[-1]).split('<')[0]))
+            if '<varray name="positions" >' in line:  # <varray name="positions" >
+                try:
+                    if first_read_check:
+                        first_read_check = False
+                    else:
+                        array = [list(map(float, vasp.readline().split()[1:4])) for _ in range(segment['ATOMNUMBER'])]
+                        if first_coord_read:
+                            segment['POSITIONS'].append(array)
+                            first_coord_read = False
+                        if array != segment['POSITIONS'][-1]:
+                            segment['POSITIONS'].append(array)
+                except Exception as err:
+                    segment['MESSAGE'] = 'There are mistakes with reading positions.\n' + traceback.format_exc()
+            if basis_read and '<varray name="basis" >' in line:
+                basis_str = [vasp.readline() for _ in range(3)]
+                basis = [list(map(float, basis_line.split()[1:4])) for basis_line in basis_str]
+                segment['BASIS'] = basis
+                basis_read = False
+    segment['VASPLEN'] = len(segment['POSITIONS'])
+    segment['POSITIONS'] = np.array(segment['POSITIONS'], dtype=np.float64).reshape((segment['VASPLEN'], segment['ATOMNUMBER'], 3))
+    return segment
+
+
+def read_vasprun_segments(directory, xmllist, max_workers=None):
+    """
+    Reads vasprun files of a segmented (restarted) calculation concurrently.
+    
+    Segments are distributed over a process pool, so the load time scales with the number of cores rather than
+    with the number of segments. The order of the returned segments matches the order of xmllist.
+    
+    Args:
+        directory (str): The directory containing the VASP XML files.
+        xmllist (list): Sorted names of the vasprun files.
+        max_workers (int, optional): The number of worker processes. Defaults to the number of cores.
+    
+    Returns:
+        list: A list of segment dictionaries returned by read_vasprun_segment.
+    """
+    max_workers = min(max_workers or cpu_count(), len(xmllist))
+    if max_workers <= 1:
+        return [read_vasprun_segment(directory, xml) for xml in xmllist]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        segments = list(executor.map(read_vasprun_segment, repeat(directory), xmllist))
+    logger.info(f"{len(xmllist)} vasprun files read with {max_workers} processes")
+    return segments
+
+
 class Parser:
     """
     Parses VASP XML files to extract and process atomic position data.
@@ -188,49 +271,13 @@ class Parser:
             self._parser_parameters['BREAKER'] = True
             self._parser_parameters['MESSAGE'] = 'There are no Vasprun files in the directory.'
         elif vaspnum != 0:
-            for xml in self.xmllist:
-                potim_read, basis_read = True, True
-                first_read_check, first_coord_read = True, True
-                with open(os.path.join(directory, xml), 'r') as vasp:
-                    while True:
-                        line = vasp.readline()
-                        if not line:
-                            break
-                        if '<atoms>' in line:
-                            self._parser_parameters[xml]['ATOMNUMBER'] = int(line.split()[1])
-                        if '<field type="int">atomtype</field>' in line:
-                            vasp.readline()
-                            for index in range(self._parser_parameters[xml]['ATOMNUMBER']):
-                                atomtype = vasp.readline()
-                                self._parser_parameters[xml]['ATOMNAMES'].append((atomtype.split('>')[2]).split('<')[0])
-                                self._parser_parameters[xml]['TYPE'].append(int(atomtype.split('<')[4].split('>')[1]))
-                        if potim_read and 'name="POTIM">' in line:
-                            self._parser_parameters[xml]['POTIM'] = float(line.split()[2].split('<')[0])
-                            potim_read = False
-                        if 'name="POMASS">' in line:
-                            for mass in line.split()[2:-1]:
-                                self._parser_parameters[xml]['POMASS'].append(float(mass))
-                            self._parser_parameters[xml]['POMASS'].append(float((line.split()[-1]).split('<')[0]))
-                        if '<varray name="positions" >' in line:  # <varray name="positions" >
-                            try:
-                                if first_read_check:
-                                    first_read_check = False
-                                else:
-                                    array = [list(map(float, vasp.readline().split()[1:4])) for _ in range(self._parser_parameters[xml]['ATOMNUMBER'])]
-                                    if first_coord_read:
-                                        self._parser_parameters[xml]['POSITIONS'].append(array)
-                                        first_coord_read = False
-                                    if array != self._parser_parameters[xml]['POSITIONS'][-1]:
-                                        self._parser_parameters[xml]['POSITIONS'].append(array)
-                            except Exception as err:
-                                self._parser_parameters['BREAKER'] = True
-                                self._parser_parameters['MESSAGE'] = 'There are mistakes with reading positions.\n' + traceback.format_exc()
-                        if basis_read and '<varray name="basis" >' in line:
-                            basis_str = [vasp.readline() for _ in range(3)]
-                            basis = [list(map(float, basis_line.split()[1:4])) for basis_line in basis_str]
-                            self._parser_parameters[xml]['BASIS'] = basis
-                            basis_read = False
-                self._parser_parameters[xml]['VASPLEN'] = len(self._parser_parameters[xml]['POSITIONS'])
+            segments = read_vasprun_segments(directory, self.xmllist)
+            for xml, segment in zip(self.xmllist, segments):
+                message = segment.pop('MESSAGE')
+                if message:
+                    self._parser_parameters['BREAKER'] = True
+                    self._parser_parameters['MESSAGE'] = message
+                self._parser_parameters[xml].update(segment)
             self._parser_parameters['MASSES'] = [self._parser_parameters[self.xmllist[0]]['POMASS'][index - 1] for index in self._parser_parameters[self.xmllist[0]]['TYPE']]
             self._parser_parameters['STEPS_LIST'] = [self._parser_parameters[self.xmllist[0]]['VASPLEN']]
             for xml in self.xmllist[1:]:
@@ -239,7 +286,13 @@ class Parser:
             self._parser_parameters['ATOMNAMES'] = self._parser_parameters[self.xmllist[0]]['ATOMNAMES']
             form_atoms_with_nums_dict(self._parser_parameters)
             self.removed_atoms_find(self._parser_parameters)
-            self.position_array_form(self._parser_parameters)
+            if not self.breaker:
+                try:
+                    self.position_array_form(self._parser_parameters)
+                except ValueError as err:
+                    self.breaker = True
+                    self._parser_parameters['BREAKER'] = True
+                    self._parser_parameters['MESSAGE'] = str(err)
             self._parser_parameters['POTIM'] = [self._parser_parameters[xml_file]['POTIM'] for xml_file in self._parser_parameters['XMLLIST']]
             if not self.breaker:
                 try:
@@ -256,10 +309,8 @@ class Parser:
                     # Создание вершин границы ячейки
                     self._parser_parameters['BASIS_VERT'] = np.dot(np.asarray(cube_vert), self._parser_parameters['BASIS'])
                     self._parser_parameters['DIRECT'] = np.copy(self._parser_parameters['POSITIONS'])
-                    self._parser_parameters['POSITIONS'] = self._parser_parameters['POSITIONS'] - 0.5
                     # Преобразование координат из дискретных в декартовы в соответствии с базисом
-                    for m in range(self._parser_parameters['STEPS']):
-                        self._parser_parameters['POSITIONS'][m] = np.dot(self._parser_parameters['POSITIONS'][m], self._parser_parameters['BASIS'])
+                    self._parser_parameters['POSITIONS'] = (self._parser_parameters['POSITIONS'] - 0.5) @ self._parser_parameters['BASIS']
                     deleted_positions_to_none(self._parser_parameters['DIRECT'], self._parser_parameters['POSITIONS'])
                     self._parser_parameters = atoms_info_filling(self._parser_parameters)
                     self._parser_parameters['ID'] = [self._parser_parameters['ATOMNAMES'][ind] + "_" + str(ind + 1) for ind in range(self._parser_parameters['ATOMNUMBER'])]
@@ -285,12 +336,14 @@ class Parser:
         """
         Finds atoms removed between consecutive XML files in a dictionary.
         
-        This method compares the positions of atoms in consecutive XML files
-        (identified by keys in the input dictionary) to determine which atoms
-        have been removed. It updates the dictionary with a 'REMOVED' key
-        for each XML file, indicating which atoms are no longer present
-        compared to the previous file. It also checks for inconsistencies
-        in atom counts between files and sets a 'BREAKER' flag if found.
+        This method compares the last positions of atoms in each XML file with
+        the first positions in the next one (identified by keys in the input
+        dictionary) to determine which atoms have been removed. Rows are compared
+        as whole byte records, so each comparison is a single vectorized lookup.
+        It updates the dictionary with a 'REMOVED' key (boolean np.ndarray over
+        the atoms of the first file) for each XML file, indicating which atoms
+        are no longer present. It also checks for inconsistencies in atom counts
+        between files and sets a 'BREAKER' flag if found.
         
         Args:
           self:  The instance of the class.
@@ -308,22 +361,25 @@ class Parser:
         xml = dictionary.get('XMLLIST')
         self.breaker = False
         if len(xml) > 1:
+            removed = np.zeros(dictionary[xml[0]]['ATOMNUMBER'], dtype=bool)
             for file in range(len(xml) - 1):
-                index_f2, differ = 0, []
-                for f1_element in dictionary[xml[file]]['POSITIONS'][-1]:
-                    if f1_element == dictionary[xml[file + 1]]['POSITIONS'][0][index_f2]:
-                        index_f2 += 1 if index_f2 < len(dictionary[xml[file + 1]]['POSITIONS'][0]) - 1 else 0
-                        differ.append(False)
-                    else:
-                        differ.append(True)
-                dictionary[xml[file + 1]]['REMOVED'] = differ
-                if file != 0:
-                    for index in range(len(dictionary[xml[file]]['REMOVED'])):
-                        if dictionary[xml[file]]['REMOVED'][index]:
-                            dictionary[xml[file + 1]]['REMOVED'].insert(index, True)
-                if sum(differ) != dictionary[xml[0]]['ATOMNUMBER'] - dictionary[xml[file + 1]]['ATOMNUMBER']:
+                previous_last = np.ascontiguousarray(dictionary[xml[file]]['POSITIONS'][-1])
+                next_first = np.ascontiguousarray(dictionary[xml[file + 1]]['POSITIONS'][0])
+                row_type = np.dtype((np.void, previous_last.dtype.itemsize * 3))
+                differ = ~np.isin(previous_last.view(row_type).ravel(), next_first.view(row_type).ravel())
+                if differ.size != np.count_nonzero(~removed):
+                    self.breaker = True
                     self._parser_parameters['BREAKER'] = True
                     self._parser_parameters['MESSAGE'] = 'Vasprun files present different calculations.'
+                    return
+                removed = removed.copy()
+                removed[~removed] = differ
+                dictionary[xml[file + 1]]['REMOVED'] = removed
+                if removed.sum() != dictionary[xml[0]]['ATOMNUMBER'] - dictionary[xml[file + 1]]['ATOMNUMBER']:
+                    self.breaker = True
+                    self._parser_parameters['BREAKER'] = True
+                    self._parser_parameters['MESSAGE'] = 'Vasprun files present different calculations.'
+                    return
 
     @staticmethod
     def position_array_form(dictionary):
@@ -331,10 +387,10 @@ class Parser:
         Creates a position array from a dictionary of XML data.
         
         This method processes a dictionary containing XML data to construct a 'POSITIONS' array.
-        It initializes the 'POSITIONS' array with the 'POSITIONS' data from the first XML entry,
-        then iterates through the remaining XML entries, adding their 'POSITIONS' data to the
-        'POSITIONS' array, while inserting placeholder values at specified indices based on
-        the 'REMOVED' flags.
+        The array is preallocated for all steps with placeholder values, then the 'POSITIONS' data
+        of every XML entry is written into its steps (the first step of every next entry repeats
+        the last step of the previous one and is skipped) and into the columns of atoms which are
+        not marked by the 'REMOVED' flags.
         
         Args:
             dictionary: A dictionary containing XML data, including 'XMLLIST', 'POSITIONS',
@@ -343,12 +399,20 @@ class Parser:
         Returns:
             None. The method modifies the input dictionary in place by adding or updating
             the 'POSITIONS' key.
+
+        Raises:
+            ValueError: If the atoms number of an XML entry differs from the number of atoms
+                which are not marked by its 'REMOVED' flags.
         """
         xml = dictionary['XMLLIST']
-        dictionary['POSITIONS'] = copy.deepcopy(dictionary[xml[0]]['POSITIONS'])
-        for positions in range(1, len(xml)):
-            for different_pos in range(len(dictionary[xml[positions]]['REMOVED'])):
-                if dictionary[xml[positions]]['REMOVED'][different_pos]:
-                    for array_value in range(len(dictionary[xml[positions]]['POSITIONS'])):
-                        dictionary[xml[positions]]['POSITIONS'][array_value].insert(different_pos, [10., 10., 10.])
-            dictionary['POSITIONS'] += dictionary[xml[positions]]['POSITIONS'][1:]
+        first = dictionary[xml[0]]['POSITIONS']
+        steps = first.shape[0] + sum(max(dictionary[xml_file]['POSITIONS'].shape[0] - 1, 0) for xml_file in xml[1:])
+        dictionary['POSITIONS'] = np.full((steps, first.shape[1], 3), 10.)
+        dictionary['POSITIONS'][:first.shape[0]] = first
+        step = first.shape[0]
+        for xml_file in xml[1:]:
+            positions = dictionary[xml_file]['POSITIONS'][1:]
+            if positions.shape[1] != np.count_nonzero(~dictionary[xml_file]['REMOVED']):
+                raise ValueError(f'Atoms number of {xml_file} does not match the atoms left after the previous files.')
+            dictionary['POSITIONS'][step:step + positions.shape[0], ~dictionary[xml_file]['REMOVED']] = positions
+            step += positions.shape[0]
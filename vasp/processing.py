@@ -6,6 +6,14 @@ import logging
 from gui.processing_dev import Ui_VRProcessing, QMainWindow
 from vasp.oszicar import VROszicarProcessing, VRPdModel
 from graph.graph import VRGraph
+from analysis.periodic import unwrap_direct
+from analysis.columns import ColumnStore
+from analysis.rdf import radial_distribution
+from analysis.msd import mean_squared_displacement
+from analysis.vacf import velocity_autocorrelation
+from analysis.rigid import rigid_body_energies
+from analysis.fragments import detect_fragments, whole_positions, fragment_centers
+from analysis.geometry import select_pairs, select_triples, pair_distances, triple_angles
 from PySide6.QtCore import QItemSelectionModel
 from PySide6.QtWidgets import QFileDialog, QAbstractItemView
 from PySide6.QtGui import QCloseEvent
@@ -48,12 +56,14 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
          self._selected_atoms: A list of selected atom names from the calculation data.
          self.__graph:  Initialized to None, likely intended for graph-related functionality.
          self._selected_columns: An empty list to store selected columns.
+         self.fragmentCols: An empty list for names of automatically detected fragments.
          self._masses:  Masses data obtained from the calculation data using the 'MASSES' key.
          self._selectedNames: Selected names obtained from the calculation data using the 'ID' key.
+         self._atomNums: Numbers of all atoms by their column names, e.g. 'O1'.
          self.columnsNames: A list of column names derived from self._selectedNames.
          self.coordColumns: A list of coordinate column names.
          self.directColumns: A list of direct column names.
-         self.baseDf: A Pandas DataFrame representing the base data.
+         self.baseData: A ColumnStore with all calculated columns.
          self.vColumns: A list of velocity columns.
          self.eColumns: A list of energy columns.
          self.distanceCols: An empty list for distance columns.
@@ -62,7 +72,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
          self.sumCols: An empty list for sum columns.
          self.differenceCols: An empty list for difference columns.
          self.divideCols: An empty list for division columns.
-         self.mainDf: A Pandas DataFrame representing the main data, initialized based on the presence of selected names.
+         self.mainColumns: Names of columns of baseData displayed in the table.
+         self.mainDf: A Pandas DataFrame materialized from baseData for display and export.
          self._model: An instance of VRPdModel, initialized with self.mainDf.
          self._selectionModel: A QItemSelectionModel associated with the model.
         
@@ -86,32 +97,34 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
 
         self.__graph = None
         self._selected_columns = []
+        self.fragmentCols = []
         self._masses = self.selectedDataForm('MASSES')
         self._selectedNames = self.selectedDataForm('ID')
+        self._atomNums = dict(zip(self.removeSubscriptInNames(self.__calculation['ID']), range(self.__calculation['ATOMNUMBER'])))
 
         if self._selectedNames:
             self.columnsNames = self.removeSubscriptInNames(self._selectedNames)
             self.coordColumns = [name + self.coordProjection[j] for name in self.columnsNames for j in range(3)]
             self.directColumns = [name + self.directProjection[j] for name in self.columnsNames for j in range(3)]
-            self.baseDf = self.formBasePandasDf()
+            self.baseData = self.formBaseData()
             self.vColumns, self.eColumns = self.velocitiesAndEnergiesCalc()
             self.distanceCols, self.angleCols, self.weightmassCols, self.sumCols, self.differenceCols, self.divideCols = [], [], [], [], [], []
-            self.baseDf.drop(self.baseDf.index[-1], inplace=True)
-            self.mainDf = pd.DataFrame(self.baseDf)
-            for v in self.vColumns:
-                del self.mainDf[v]
-            for d in self.directColumns:
-                del self.mainDf[d]
+            self.baseData.slice_rows(stop=-1)
+            self.mainColumns = [column for column in self.baseData.columns if column not in self.vColumns and column not in self.directColumns]
             self.coordinatesDelete()
+            self.mainDf = self.baseData.to_frame(self.mainColumns)
             self.refreshLists()
             self.oszicarCheckboxUnlock()
         else:
-            self.mainDf = pd.DataFrame()
             timeArr = np.arange(0, float(self.__calculation['POTIM'][0]) * self.__calculation['STEPS_LIST'][0], float(self.__calculation['POTIM'][0]))
             for index, steps in enumerate(self.__calculation['STEPS_LIST'][1:], start=1):
                 addTimeArr = np.arange(timeArr[-1] + float(self.__calculation['POTIM'][index]), timeArr[-1] + float(self.__calculation['POTIM'][index]) * steps, float(self.__calculation['POTIM'][index]))
                 timeArr = np.concatenate([timeArr, addTimeArr])
-            self.mainDf.insert(0, 'Time, fs', timeArr[:self.__calculation['STEPS']])
+            timeArr = timeArr[:self.__calculation['STEPS']]
+            self.baseData = ColumnStore(timeArr.shape[0])
+            self.baseData.add('Time, fs', timeArr, group='time')
+            self.mainColumns = ['Time, fs']
+            self.mainDf = self.baseData.to_frame(self.mainColumns)
         self._model = VRPdModel(self.mainDf)
         self.ViewTable.setModel(self._model)
         self._selectionModel = QItemSelectionModel(self._model)
@@ -174,6 +187,12 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         self.AExit.triggered.connect(lambda: self.closeAll(QCloseEvent()))
         self._selectionModel.selectionChanged.connect(self.columnSelected)
         self.PlotGraphButton.clicked.connect(self.plotGraph)
+        self.ARDF.triggered.connect(self.rdfCalculate)
+        self.AMSD.triggered.connect(self.msdCalculate)
+        self.AVDOS.triggered.connect(self.vdosCalculate)
+        self.AFragments.triggered.connect(self.fragmentsCalculate)
+        self.ASpeciesDistances.triggered.connect(self.speciesDistancesCalculate)
+        self.ASpeciesAngles.triggered.connect(self.speciesAnglesCalculate)
 
     def closeAll(self, event):
         """
@@ -227,10 +246,10 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         self.DivideList.clear()
         self.RenameSelect.clear()
         self.DCList.addItems(self.columnsNames)
-        self.PMList.addItems(self.mainDf.columns[1:].tolist())
+        self.PMList.addItems(self.mainColumns[1:])
         self.AngleList.addItems(self.columnsNames)
         self.DivideList.addItems(self.columnsNames)
-        self.RenameSelect.addItems(self.mainDf.columns[1:].tolist())
+        self.RenameSelect.addItems(self.mainColumns[1:])
 
     def selectedDataForm(self, dict_name):
         """
@@ -269,15 +288,19 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             renamed.append(''.join(name.split('_')))
         return renamed
 
-    def formBasePandasDf(self):
+    def formBaseData(self):
         """
-        Forms a base Pandas DataFrame from calculation data.
+        Forms a base columnar store from calculation data.
+        
+        Direct coordinates of the selected atoms are unwrapped for all steps at once with unwrap_direct, every
+        step is shifted by whole cells to the minimum image of the previous one. Cartesian coordinates of all atoms
+        are calculated with one vectorized expression.
         
         Args:
             self: The instance of the class.
         
         Returns:
-            pd.DataFrame: A Pandas DataFrame containing the processed calculation data.
+            ColumnStore: A store containing time, direct and cartesian coordinates columns.
         
         Class Fields Initialized:
             _selected_atoms: A list of selected atoms.
@@ -285,63 +308,36 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             columnsNames: A list of names for the coordinate components.
             coordProjection: A list of coordinate projection values.
         """
-        data = []
         selectedColumnsNums = [num for num, column in enumerate(self._selected_atoms) if 'Sel' in column]
-        for step in range(self.__calculation['STEPS']):
-            temp, counter = [], 0
-            for atom_num in selectedColumnsNums:
-                if step > 0:
-                    temp.append(self.atomAwayProcessing(self.__calculation['DIRECT'][step][atom_num], data[step - 1][counter]))
-                else:
-                    temp.append(self.__calculation['DIRECT'][step][atom_num])
-                counter += 1
-            data.append(temp.copy())
-        data = np.asarray(data)
-        data = data.reshape((-1, 3 * len(self._selectedNames)))
-        baseDf = pd.DataFrame(data, columns=self.directColumns)
+        direct = np.asarray(self.__calculation['DIRECT'])[:self.__calculation['STEPS'], selectedColumnsNums]
+        direct = unwrap_direct(direct).astype(np.float64)
         if self._deleteAfterLeave:
-            baseDf.mask(baseDf >= 1, inplace=True)
-            baseDf.mask(baseDf <= 0, inplace=True)
+            direct[(direct >= 1) | (direct <= 0)] = np.nan
         timeArr = np.arange(0, float(self.__calculation['POTIM'][0]) * self.__calculation['STEPS_LIST'][0], float(self.__calculation['POTIM'][0]))
         for index, _ in enumerate(self.__calculation['STEPS_LIST'][1:], start=1):
             addTimeArr = np.arange(timeArr[-1] + float(self.__calculation['POTIM'][index]), timeArr[-1] + float(self.__calculation['POTIM'][index]) * (self.__calculation['STEPS_LIST'][index] - self.__calculation['STEPS_LIST'][index - 1] + 1), float(self.__calculation['POTIM'][index]))
             timeArr = np.concatenate([timeArr, addTimeArr])
-        baseDf.insert(0, 'Time, fs', timeArr[:self.__calculation['STEPS']])
-        for name in self.columnsNames:
-            for num, proj in enumerate(self.coordProjection):
-               baseDf[f'{name}{proj}'] = self.__calculation['BASIS'][0][num] * baseDf[f'{name}_dir_1'] + self.__calculation['BASIS'][1][num] * baseDf[f'{name}_dir_2'] + self.__calculation['BASIS'][2][num] * baseDf[f'{name}_dir_3']
-        return baseDf
-
-    @staticmethod
-    def atomAwayProcessing(direct, data):
-        """
-        Processes data relative to a direct input, adjusting a column based on differences.
-        
-        Args:
-         direct: The original data column.
-         data: The data to compare against the direct column.
-        
-        Returns:
-         list: A new list representing the adjusted column.
-        """
-        column = direct.copy()
-        for num, _ in enumerate(direct):
-            exprFactor = round(data[num] - direct[num])
-            if exprFactor:
-                column[num] = column[num] + exprFactor
-        return column
+        basis = np.asarray(self.__calculation['BASIS'])
+        coordinates = direct[:, :, 0:1] * basis[0][np.newaxis, np.newaxis] + direct[:, :, 1:2] * basis[1][np.newaxis, np.newaxis] + direct[:, :, 2:3] * basis[2][np.newaxis, np.newaxis]
+        baseData = ColumnStore(direct.shape[0])
+        baseData.add('Time, fs', timeArr[:self.__calculation['STEPS']], group='time')
+        baseData.add(self.directColumns, direct.reshape((direct.shape[0], -1)).T, group='positions')
+        baseData.add(self.coordColumns, coordinates.reshape((direct.shape[0], -1)).T, group='positions')
+        return baseData
 
     def velocitiesAndEnergiesCalc(self):
         """
-        Calculates velocities and energies for each column in the base DataFrame.
+        Calculates velocities and energies for all selected atoms at once.
         
-        This method computes the velocity and energy for each column based on the differences in x, y, and z coordinates, and then stores these values in new columns of the DataFrame. It also drops the first row and resets the index.
+        This method computes the velocity and energy of every atom based on the differences in x, y, and z coordinates
+        of the whole coordinates block, and then stores these values in the velocities and energies groups of the base
+        store. It also drops the first row.
         
         Args:
             self: The instance of the class.
         
         Initializes:
-            baseDf: The DataFrame containing the calculated velocities and energies. New columns 'V_' + column and 'E_' + column are added for each column in columnsNames.
+            baseData: The store containing the calculated velocities and energies. New columns 'V_' + column and 'E_' + column are added for each column in columnsNames.
             vColumns: A list of column names for velocities.
             eColumns: A list of column names for energies.
         
@@ -352,64 +348,104 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         """
         vColumns = ['V_' + column for column in self.columnsNames]
         eColumns = ['E_' + column for column in self.columnsNames]
-        for num, column in enumerate(vColumns):
-            self.baseDf[column] = (self.baseDf[self.columnsNames[num] + '_x'].diff() ** 2 + self.baseDf[self.columnsNames[num] + '_y'].diff() ** 2 + self.baseDf[self.columnsNames[num] + '_z'].diff() ** 2) ** (1 / 2) * 1000
-            self.divineOnPOTIM(column)
-        for num, column in enumerate(eColumns):
-            self.baseDf[column] = (self.baseDf[vColumns[num]]) ** 2 * self._masses[num] / self.calc_const
-        self.baseDf.drop(self.baseDf.index[0], inplace=True)
-        self.baseDf.reset_index(drop=True, inplace=True)
+        differences = self.columnDiff(self.baseData.get(self.coordColumns)).reshape((len(self.columnsNames), 3, -1))
+        velocities = (differences[:, 0] ** 2 + differences[:, 1] ** 2 + differences[:, 2] ** 2) ** (1 / 2) * 1000
+        self.divineOnPOTIM(velocities)
+        energies = velocities ** 2 * np.asarray(self._masses, dtype=np.float64)[:, np.newaxis] / self.calc_const
+        self.baseData.add(vColumns, velocities, group='velocities')
+        self.baseData.add(eColumns, energies, group='energies')
+        self.baseData.slice_rows(start=1)
         return vColumns, eColumns
 
     def coordinatesDelete(self):
         """
-        Deletes coordinate columns from the main DataFrame.
+        Deletes coordinate columns from the displayed columns.
         
         Args:
             self: The instance of the class.
         
         The following class fields are initialized:
-            - mainDf: The main DataFrame used for data manipulation.
+            - mainColumns: Names of displayed columns.
             - coordColumns: A list of column names representing coordinates to be deleted.
         
         Returns:
             None
         """
-        for coord in self.coordColumns:
-            del self.mainDf[coord]
+        self.removeMainColumns(self.coordColumns)
 
-    def directCurveChoose(self, first, second):
+    def removeMainColumns(self, columns):
         """
-        Calculates a weighted sum of differences between directional coefficients.
+        Removes columns from the displayed columns, columns which are not displayed are ignored.
         
-        This method computes the difference between directional coefficients for two
-        input strings ('first' and 'second') across three directions ('_dir_1',
-        '_dir_2', '_dir_3'). It then calculates a weighted sum of these differences
-        using a predefined basis.
+        Args:
+            columns: Names of columns to remove.
+        
+        Returns:
+            None
+        """
+        columns = set(columns)
+        self.mainColumns = [column for column in self.mainColumns if column not in columns]
+
+    def refreshTable(self):
+        """
+        Materializes displayed columns of the base store as mainDf and refreshes the table model.
+        
+        Returns:
+            None
+        """
+        self.mainDf = self.baseData.to_frame(self.mainColumns)
+        self._model.refreshTable(self.mainDf)
+
+    @staticmethod
+    def columnDiff(values):
+        """
+        Calculates differences of neighbour rows along the last axis the same way as pandas Series.diff does.
+        
+        Args:
+            values: Array of columns of shape (..., steps).
+        
+        Returns:
+            np.ndarray: Differences with NaN in the first row.
+        """
+        return np.diff(values, axis=-1, prepend=np.nan)
+
+    def geometryDirect(self, names):
+        """
+        Returns direct coordinates of atoms and centers of mass for the rows of the base store.
+        
+        Coordinates of atoms are taken from the calculation, coordinates of atoms which have left the cell are NaN if
+        atoms are deleted after leaving, the same way as in formBaseData. Coordinates of centers of mass are taken from
+        the base store.
         
         Args:
-         first: The first string identifier.
-         second: The second string identifier.
+            names: Names of atoms, e.g. 'O1', or of centers of mass.
         
         Returns:
-         float: The weighted sum of the differences, representing the calculated
-         value.
+            np.ndarray: Direct coordinates of shape (rows, len(names), 3).
         """
-        periodical_coefficients = []
-        for proj in ['_dir_1', '_dir_2', '_dir_3']:
-            periodical_coefficients.append(round(self.baseDf[second + proj][0] - self.baseDf[first + proj][0]))
-        return np.dot(np.asarray(periodical_coefficients), self.__calculation['BASIS'])
+        isAtom = np.array([name in self._atomNums for name in names], dtype=bool)
+        direct = np.asarray(self.__calculation['DIRECT'])[:self.__calculation['STEPS'], [self._atomNums[name] for name in names if name in self._atomNums]].astype(np.float64)
+        if self._deleteAfterLeave:
+            unwrapped = unwrap_direct(direct)
+            direct[(unwrapped >= 1) | (unwrapped <= 0)] = np.nan
+        rows = slice(1, 1 + self.baseData.length) if self._selectedNames else slice(0, self.baseData.length)
+        frames = np.empty((self.baseData.length, len(names), 3), dtype=np.float64)
+        frames[:, isAtom] = direct[rows]
+        for num in np.flatnonzero(~isAtom):
+            frames[:, num] = self.baseData.get([f'{names[num]}{proj}' for proj in self.directProjection]).T
+        return frames
 
-    def divineOnPOTIM(self, column, isCOM=False):
+    def divineOnPOTIM(self, values, isCOM=False):
         """
-        Divines values in the base DataFrame based on POTIM values and a specified column.
+        Divines values based on POTIM values of calculation parts in place.
+        
+        Ranges of steps are inclusive at both ends the same way as label-based DataFrame.loc slicing is.
         
         Args:
-            column: The name of the column in the base DataFrame to modify.
+            values: Array of columns of shape (..., steps) to modify.
             isCOM: A boolean flag indicating whether to apply a specific calculation for COM scenarios.
         
         Initializes:
-            self.baseDf: The DataFrame being modified. This method updates values within this DataFrame based on the provided calculations.
             self.__calculation: A dictionary containing calculation parameters, including 'POTIM' and 'STEPS_LIST', used to determine the ranges and divisors for the calculation.
         
         Returns:
@@ -419,12 +455,12 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         for index, POTIM in enumerate(self.__calculation['POTIM']):
             if isCOM:
                 if index != len(self.__calculation['POTIM']) - 1:
-                    self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index] - 1, column] = self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index] - 1, column] / POTIM
+                    values[..., prev_index:self.__calculation['STEPS_LIST'][index]] = values[..., prev_index:self.__calculation['STEPS_LIST'][index]] / POTIM
                     prev_index = self.__calculation['STEPS_LIST'][index] - 1
                 else:
-                    self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index], column] = self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index], column] / POTIM
+                    values[..., prev_index:self.__calculation['STEPS_LIST'][index] + 1] = values[..., prev_index:self.__calculation['STEPS_LIST'][index] + 1] / POTIM
             else:
-                self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index], column] = self.baseDf.loc[prev_index:self.__calculation['STEPS_LIST'][index], column] / POTIM
+                values[..., prev_index:self.__calculation['STEPS_LIST'][index] + 1] = values[..., prev_index:self.__calculation['STEPS_LIST'][index] + 1] / POTIM
                 prev_index = self.__calculation['STEPS_LIST'][index]
 
     def removeColumns(self, addedColsElement, removeElement):
@@ -435,7 +471,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
          addedColsElement: The combo box element representing the added columns.
          removeElement: The button element used to remove columns.
         
-        This method removes columns from both the base DataFrame (self.baseDf) and the main DataFrame (self.mainDf),
+        This method removes columns from both the base store (self.baseData) and the displayed columns (self.mainColumns),
         depending on the selected column and the state of certain checkboxes. It also updates the corresponding lists
         (distanceCols, weightmassCols, sumCols, differenceCols, angleCols, divideCols, vColumns, eColumns, columnsNames)
         and refreshes the UI elements (combo boxes, table).
@@ -452,43 +488,27 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             colsList = self.divideCols
 
         if colsList == self.distanceCols or colsList == self.angleCols:
-            self.baseDf.drop(columns=toDelete, inplace=True)
-            self.mainDf.drop(columns=toDelete, inplace=True)
+            self.baseData.remove(toDelete)
+            self.removeMainColumns([toDelete])
             colsList.remove(toDelete)
             self.addMessage(f'Column {toDelete} has been removed.')
         elif colsList == self.sumCols or colsList == self.differenceCols:
-            self.baseDf.drop(columns=toDelete, inplace=True)
-            if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf.drop(columns=toDelete, inplace=True)
+            self.baseData.remove(toDelete)
+            self.removeMainColumns([toDelete])
             colsList.remove(toDelete)
             self.eColumns.remove(toDelete)
             self.addMessage(f'Column {toDelete} has been removed.')
         elif colsList == self.divideCols:
-            elements = toDelete.split('_')
-            atoms = []
-            for num, element in enumerate(elements):
-                if num % 2 == 0:
-                    atoms.append(element)
-                else:
-                    atoms[-1] = atoms[-1] + '_' + element
-            toDeleteCols = [f'Evib_{toDelete}', f'Erot_{toDelete}']
-            for atom in atoms:
-                toDeleteCols.extend([f'Evib_{toDelete}({atom})', f'Erot_{toDelete}({atom})'])
-            self.baseDf.drop(columns=toDeleteCols, inplace=True)
-            if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf.drop(columns=toDeleteCols, inplace=True)
+            toDeleteCols = [f'Etr_{toDelete}', f'Erot_{toDelete}', f'Evib_{toDelete}']
+            self.baseData.remove(toDeleteCols)
+            self.removeMainColumns(toDeleteCols)
             colsList.remove(toDelete)
             [self.eColumns.remove(value) for value in toDeleteCols]
-            self.addMessage(f'Columns divided to vibrational and rotational energy {toDelete} have been removed.')
+            self.addMessage(f'Columns divided to translational, rotational and vibrational energy {toDelete} have been removed.')
         else:
-            toDeleteList = [f'{toDelete}_x', f'{toDelete}_y', f'{toDelete}_z', f'V{toDelete}', f'E{toDelete}']
-            self.baseDf.drop(columns=toDeleteList, inplace=True)
-            toDeleteList.remove(f'V{toDelete}')
-            if not self.ADel_coords_of_sel_atoms.isChecked():
-                self.mainDf.drop(columns=toDeleteList, inplace=True) if not self.ADel_energy_of_sel_atoms.isChecked() else self.mainDf.drop(columns=toDeleteList[:3], inplace=True)
-            else:
-                if not self.ADel_energy_of_sel_atoms.isChecked():
-                    self.mainDf.drop(columns=toDeleteList[-1], inplace=True)
+            toDeleteList = [f'{toDelete}{proj}' for proj in self.directProjection + self.coordProjection] + [f'V{toDelete}', f'E{toDelete}']
+            self.baseData.remove(toDeleteList)
+            self.removeMainColumns(toDeleteList)
             self.vColumns.remove(f'V{toDelete}')
             self.addMessage(f'Column {self.eColumns[-1]} and linked columns have been removed.')
             self.eColumns.remove(f'E{toDelete}')
@@ -499,7 +519,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             addedColsElement.setDisabled(True)
             removeElement.setDisabled(True)
         self.refreshLists()
-        self._model.refreshTable(self.mainDf)
+        self.refreshTable()
 
     def DCListAction(self, element):
         """
@@ -578,32 +598,75 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         
         Returns:
             None
-        
-        Fields Initialized:
-            baseDf: DataFrame to store the calculated distance.
-            mainDf: DataFrame to store the calculated distance.
-            distanceCols: List to store the names of the added distance columns.
         """
         first, second = sorted([item.text() for item in self.DCList.selectedItems()])
-        if f'{first}--{second}' in self.baseDf:
+        if f'{first}--{second}' in self.baseData:
             self.addMessage('Column has already been added!', result='FAILED', cause='Column has already been added')
             self.DCListClear()
         else:
-            coefficients = self.directCurveChoose(first, second)
-            self.baseDf[f'{first}--{second}'] = ((self.baseDf[second + '_x'] - self.baseDf[first + '_x'] - coefficients[0]) ** 2 + (self.baseDf[second + '_y'] - self.baseDf[first + '_y'] - coefficients[1]) ** 2 + (self.baseDf[second + '_z'] - self.baseDf[first + '_z'] - coefficients[2]) ** 2) ** (1 / 2)
-            self.mainDf[f'{first}--{second}'] = self.baseDf[f'{first}--{second}']
-
-            self.distanceCols.append(f'{first}--{second}')
-            if not self.DCAdded.isEnabled():
-                self.DCAdded.setEnabled(True)
-            self.DCAdded.addItem(f'{first}--{second}')
-            if not self.DCRemoveCol.isEnabled():
-                self.DCRemoveCol.setEnabled(True)
+            self.distanceColumnsAdd([(first, second)])
             self.refreshLists()
             self.DCListClear()
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage(f'Column {first}--{second} has been added.')
 
+    def speciesDistancesCalculate(self):
+        """
+        Calculates distances of all pairs of atoms of species of two atoms selected in the DCList, e.g. all O--H
+        distances, and adds them as new columns to the DataFrames.
+        
+        Args:
+            self: The instance of the class.
+        
+        Returns:
+            None
+        """
+        selected = [item.text() for item in self.DCList.selectedItems()]
+        if len(selected) != 2 or not all(name in self._atomNums for name in selected):
+            self.addMessage('Select two atoms in the distance list to choose species of pairs.')
+            return
+        species = np.array([name.split('_')[0] for name in self.__calculation['ATOMNAMES']])
+        first, second = (species[self._atomNums[name]] for name in selected)
+        names = list(self._atomNums)
+        columns = self.distanceColumnsAdd([(names[i], names[j]) for i, j in select_pairs(species, first, second)])
+        self.refreshLists()
+        self.DCListClear()
+        self.refreshTable()
+        self.addMessage(f'{len(columns)} columns of {first}--{second} distances have been added.')
+
+    def distanceColumnsAdd(self, pairs):
+        """
+        Calculates minimum-image distances of pairs of atoms or centers of mass for all steps at once and adds them as
+        new columns, pairs which have already been added are skipped.
+        
+        Args:
+            pairs: Pairs of names of atoms or centers of mass.
+        
+        Initializes:
+            baseData: Store of the calculated distances.
+            mainColumns: Displayed columns, the calculated distances are appended.
+            distanceCols: List to store the names of the added distance columns.
+        
+        Returns:
+            list: Names of the added columns.
+        """
+        pairs = [pair for pair in dict.fromkeys(tuple(sorted(pair)) for pair in pairs) if f'{pair[0]}--{pair[1]}' not in self.baseData]
+        if not pairs:
+            return []
+        names = list(dict.fromkeys(name for pair in pairs for name in pair))
+        indexes = {name: num for num, name in enumerate(names)}
+        distances = pair_distances(self.geometryDirect(names), np.asarray(self.__calculation['BASIS'], dtype=np.float64), [[indexes[first], indexes[second]] for first, second in pairs])
+        columns = [f'{first}--{second}' for first, second in pairs]
+        self.baseData.add(columns, distances.T)
+        self.mainColumns.extend(columns)
+        self.distanceCols.extend(columns)
+        if not self.DCAdded.isEnabled():
+            self.DCAdded.setEnabled(True)
+        self.DCAdded.addItems(columns)
+        if not self.DCRemoveCol.isEnabled():
+            self.DCRemoveCol.setEnabled(True)
+        return columns
+
     def COMCalculate(self, atomsList=None):
         """
         Calculates the center of mass (COM) for selected atoms and adds the resulting data to the DataFrame.
@@ -612,7 +675,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             atomsList: An optional list of atom names. If None, the method uses the selected items from the DCList.
         
         Initializes the following class fields:
-            baseDf: The base DataFrame used for calculations.
+            baseData: The base store used for calculations.
             vColumns: A list of velocity column names.
             eColumns: A list of energy column names.
             columnsNames: A list of column names.
@@ -634,27 +697,25 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 if rname in weightmasses:
                     weightMassesDict[rname] = self.__calculation['MASSES'][self.__calculation['ID-TO-NUM'][name]]
             summaryMass = sum([weightMassesDict[name] for name in weightmasses])
-            directCols = ['_dir_1', '_dir_2', '_dir_3']
-            for index, proj in enumerate(['_x', '_y', '_z']):
-                self.baseDf[f"{columnName}{directCols[index]}"] = np.zeros(self.__calculation['STEPS'] - 2)
-                self.baseDf[f"{columnName}{proj}"] = np.zeros(self.__calculation['STEPS'] - 2)
-                for atom in weightmasses:
-                    self.baseDf[f"{columnName}{proj}"] += self.baseDf[f"{atom}{proj}"] * weightMassesDict[atom] / summaryMass
-                    self.baseDf[f"{columnName}{directCols[index]}"] += self.baseDf[f"{atom}{directCols[index]}"] * weightMassesDict[atom] / summaryMass
+            directCoordinates = np.zeros((3, self.baseData.length))
+            coordinates = np.zeros((3, self.baseData.length))
+            for atom in weightmasses:
+                coordinates += self.baseData.get([f"{atom}{proj}" for proj in self.coordProjection]) * weightMassesDict[atom] / summaryMass
+                directCoordinates += self.baseData.get([f"{atom}{proj}" for proj in self.directProjection]) * weightMassesDict[atom] / summaryMass
+            self.baseData.add([f"{columnName}{proj}" for proj in self.directProjection], directCoordinates, group='positions')
+            self.baseData.add([f"{columnName}{proj}" for proj in self.coordProjection], coordinates, group='positions')
             self.vColumns.append(f'V{columnName}')
             self.eColumns.append(f'E{columnName}')
-            self.baseDf[self.vColumns[-1]] = np.sqrt(self.baseDf[f'{columnName}_x'].diff() ** 2 + self.baseDf[f'{columnName}_y'].diff() ** 2 + self.baseDf[f'{columnName}_z'].diff() ** 2) * 1000
-            self.divineOnPOTIM(self.vColumns[-1], True)
-            self.baseDf[self.eColumns[-1]] = (self.baseDf[self.vColumns[-1]]) ** 2 * summaryMass / self.calc_const
+            differences = self.columnDiff(coordinates)
+            velocities = np.sqrt(differences[0] ** 2 + differences[1] ** 2 + differences[2] ** 2) * 1000
+            self.divineOnPOTIM(velocities, True)
+            self.baseData.add(self.vColumns[-1], velocities, group='velocities')
+            self.baseData.add(self.eColumns[-1], velocities ** 2 * summaryMass / self.calc_const, group='energies')
             if not self.ADel_coords_of_sel_atoms.isChecked():
-                self.mainDf.insert(len(self.columnsNames) * 3 + 1, columnName + '_dir_1', self.baseDf[columnName + '_dir_1'])
-                self.mainDf.insert(len(self.columnsNames) * 3 + 2, columnName + '_dir_2', self.baseDf[columnName + '_dir_2'])
-                self.mainDf.insert(len(self.columnsNames) * 3 + 3, columnName + '_dir_3', self.baseDf[columnName + '_dir_3'])
-                self.mainDf.insert(len(self.columnsNames) * 3 + 4, columnName + '_x', self.baseDf[columnName + '_x'])
-                self.mainDf.insert(len(self.columnsNames) * 3 + 5, columnName + '_y', self.baseDf[columnName + '_y'])
-                self.mainDf.insert(len(self.columnsNames) * 3 + 6, columnName + '_z', self.baseDf[columnName + '_z'])
+                position = len(self.columnsNames) * 3 + 1
+                self.mainColumns[position:position] = [f"{columnName}{proj}" for proj in self.directProjection + self.coordProjection]
             if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf.insert(len(self.mainDf.columns), self.eColumns[-1], self.baseDf[self.eColumns[-1]])
+                self.mainColumns.append(self.eColumns[-1])
             self.columnsNames.append(columnName)
             self.refreshLists()
             self.DCListClear()
@@ -665,7 +726,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 self.DCAdded.setEnabled(True)
             if not self.DCRemoveCol.isEnabled():
                 self.DCRemoveCol.setEnabled(True)
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage(f'Column {self.eColumns[-1]} has been added.')
         else:
             self.addMessage('Column has already been added!', result='FAILED', cause='Column has already been added')
@@ -755,8 +816,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         
         Initializes:
             self.sumCols: A list to store the names of the calculated sum columns.
-            self.baseDf: The base DataFrame where the sum column is initially created.
-            self.mainDf: The main DataFrame where the sum column is copied if ADel_energy_of_sel_atoms is not checked.
+            self.baseData: The base store where the sum column is created.
+            self.mainColumns: Displayed columns, the sum column is appended if ADel_energy_of_sel_atoms is not checked.
             self.PMAdded: A list widget to display the added columns.
             self.eColumns: A list to store the names of energy columns.
         
@@ -767,11 +828,12 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         sumStr = 'Sm_' + '_'.join(sumNames)
         if sumStr not in self.sumCols:
             dfColumns = [f'{name}' for name in sumNames]
-            self.baseDf[sumStr] = self.baseDf[dfColumns[0]]
+            summary = self.baseData[dfColumns[0]].copy()
             for col in dfColumns[1:]:
-                self.baseDf[sumStr] += self.baseDf[col]
+                summary += self.baseData[col]
+            self.baseData.add(sumStr, summary, group='energies')
             if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf[sumStr] = self.baseDf[sumStr]
+                self.mainColumns.append(sumStr)
             self.sumCols.append(sumStr)
             self.PMAdded.addItem(sumStr)
             self.refreshLists()
@@ -781,7 +843,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             if not self.PMRemoveCol.isEnabled():
                 self.PMRemoveCol.setEnabled(True)
             self.eColumns.append(sumStr)
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage(f'Column {sumStr} has been added.')
         else:
             self.addMessage('Column has already been added!')
@@ -794,8 +856,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             self: The instance of the class.
         
         Initializes:
-            baseDf: DataFrame to store the base calculations.
-            mainDf: DataFrame to display the results.
+            baseData: Store of the base calculations.
+            mainColumns: Displayed columns.
             differenceCols: List to store the names of the difference columns.
             eColumns: List to store the names of the energy columns.
         
@@ -805,9 +867,9 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         first, second = [item.text() for item in self.PMList.selectedItems()]
         differenceStr = 'Df_' + '-'.join([first, second])
         if differenceStr not in self.differenceCols:
-            self.baseDf[differenceStr] = self.baseDf[first] - self.baseDf[second]
+            self.baseData.add(differenceStr, self.baseData[first] - self.baseData[second], group='energies')
             if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf[differenceStr] = self.baseDf[differenceStr]
+                self.mainColumns.append(differenceStr)
             self.differenceCols.append(differenceStr)
             self.PMAdded.addItem(differenceStr)
             self.refreshLists()
@@ -816,7 +878,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 self.PMAdded.setEnabled(True)
             if not self.PMRemoveCol.isEnabled():
                 self.PMRemoveCol.setEnabled(True)
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.eColumns.append(differenceStr)
             self.addMessage(f'Column {differenceStr} has been added.')
         else:
@@ -924,8 +986,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         
         Initializes:
             self.angleCols: A list to store the names of added angle columns.
-            self.baseDf: The base DataFrame used for calculations.
-            self.mainDf: The main DataFrame to which the angle column is added.
+            self.baseData: The base store used for calculations.
+            self.mainColumns: Displayed columns, the angle column is appended.
             self.AngleAdded: A combo box displaying added angle columns.
             self.AngleRemoveCol: A button to remove added columns.
         
@@ -941,8 +1003,9 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         else:
             plane = 'zx'
         if f'{atom}_{plane}' not in self.angleCols:
-            self.baseDf[f'{atom}_{plane}'] = np.degrees(np.arccos(np.sqrt(self.baseDf[f'{atom}_{plane[0]}'].diff() ** 2 + self.baseDf[f'{atom}_{plane[1]}'].diff() ** 2) / np.sqrt(self.baseDf[f'{atom}_x'].diff() ** 2 + self.baseDf[f'{atom}_y'].diff() ** 2 + self.baseDf[f'{atom}_z'].diff() ** 2)))
-            self.mainDf.insert(len(self.mainDf.columns), f'{atom}_{plane}', self.baseDf[f'{atom}_{plane}'])
+            differences = dict(zip('xyz', self.columnDiff(self.baseData.get([f'{atom}{proj}' for proj in self.coordProjection]))))
+            self.baseData[f'{atom}_{plane}'] = np.degrees(np.arccos(np.sqrt(differences[plane[0]] ** 2 + differences[plane[1]] ** 2) / np.sqrt(differences['x'] ** 2 + differences['y'] ** 2 + differences['z'] ** 2)))
+            self.mainColumns.append(f'{atom}_{plane}')
             self.angleCols.append(f'{atom}_{plane}')
             self.AngleAdded.addItem(f'{atom}_{plane}')
             if not self.AngleAdded.isEnabled():
@@ -951,7 +1014,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 self.AngleRemoveCol.setEnabled(True)
             self.refreshLists()
             self.AngleListClear()
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage(f"Column {atom}_{plane} has been added.")
         else:
             self.addMessage('Column already exists.')
@@ -963,47 +1026,83 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         Args:
             self: The instance of the class.
         
-        Initializes the following class fields:
-            baseDf: DataFrame used for intermediate calculations.
-            mainDf: DataFrame that stores the final results.
-            angleCols: List to keep track of added angle columns.
-            AngleAdded: A QComboBox widget to display added angles.
-            AngleRemoveCol: A button to remove added columns.
-            AnglePlaneXY: A button to set the angle plane to XY.
-            AnglePlaneYZ: A button to set the angle plane to YZ.
-            AnglePlaneZX: A button to set the angle plane to ZX.
-        
         Returns:
             None
         """
         atoms = [item.text() for item in self.AngleList.selectedItems()]
         if f'{atoms[0]}-{atoms[1]}-{atoms[2]}' not in self.angleCols:
-            self.baseDf[f'{atoms[0]}--{atoms[2]}'] = sum([(self.baseDf[f'{atoms[0]}{proj}'] - self.baseDf[f'{atoms[2]}{proj}']) ** 2 for proj in ['_x', '_y', '_z']])
-            self.baseDf[f'{atoms[0]}--{atoms[1]}'] = sum([(self.baseDf[f'{atoms[0]}{proj}'] - self.baseDf[f'{atoms[1]}{proj}']) ** 2 for proj in ['_x', '_y', '_z']])
-            self.baseDf[f'{atoms[1]}--{atoms[2]}'] = sum([(self.baseDf[f'{atoms[1]}{proj}'] - self.baseDf[f'{atoms[2]}{proj}']) ** 2 for proj in ['_x', '_y', '_z']])
-
-            self.baseDf[f'{atoms[0]}-{atoms[1]}-{atoms[2]}'] = np.round(np.degrees(np.arccos((self.baseDf[f'{atoms[0]}--{atoms[1]}'] + self.baseDf[f'{atoms[1]}--{atoms[2]}'] - self.baseDf[f'{atoms[0]}--{atoms[2]}']) / (2 * self.baseDf[f'{atoms[0]}--{atoms[1]}'] ** 0.5 * self.baseDf[f'{atoms[1]}--{atoms[2]}'] ** 0.5))), 2)
-
-            self.baseDf.drop(columns=[f'{atoms[0]}--{atoms[2]}', f'{atoms[0]}--{atoms[1]}', f'{atoms[1]}--{atoms[2]}'], inplace=True)
-
-            self.mainDf.insert(len(self.mainDf.columns), f'{atoms[0]}-{atoms[1]}-{atoms[2]}', self.baseDf[f'{atoms[0]}-{atoms[1]}-{atoms[2]}'])
-            self.angleCols.append(f'{atoms[0]}-{atoms[1]}-{atoms[2]}')
-            self.AngleAdded.addItem(f'{atoms[0]}-{atoms[1]}-{atoms[2]}')
-            if not self.AngleAdded.isEnabled():
-                self.AngleAdded.setEnabled(True)
-            if not self.AngleRemoveCol.isEnabled():
-                self.AngleRemoveCol.setEnabled(True)
+            self.angleColumnsAdd([tuple(atoms)])
             self.refreshLists()
             self.AngleListClear()
-            if not self.AnglePlaneXY.isEnabled():
-                self.AnglePlaneXY.setEnabled(True)
-                self.AnglePlaneYZ.setEnabled(True)
-                self.AnglePlaneZX.setEnabled(True)
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage(f"Column {atoms[0]}-{atoms[1]}-{atoms[2]} has been added.")
         else:
             self.addMessage('Column already exists.')
 
+    def speciesAnglesCalculate(self):
+        """
+        Calculates valence angles of all triples of atoms of species of three atoms selected in the AngleList, e.g. all
+        Mo-S-Mo angles, and adds them as new columns to the DataFrame. The second selected atom is the central one.
+        
+        Args:
+            self: The instance of the class.
+        
+        Returns:
+            None
+        """
+        selected = [item.text() for item in self.AngleList.selectedItems()]
+        if len(selected) != 3 or not all(name in self._atomNums for name in selected):
+            self.addMessage('Select three atoms in the angle list to choose species of triples.')
+            return
+        species = np.array([name.split('_')[0] for name in self.__calculation['ATOMNAMES']])
+        first, center, last = (species[self._atomNums[name]] for name in selected)
+        names = list(self._atomNums)
+        columns = self.angleColumnsAdd([(names[i], names[j], names[k]) for i, j, k in select_triples(species, first, center, last)])
+        self.refreshLists()
+        self.AngleListClear()
+        self.refreshTable()
+        self.addMessage(f'{len(columns)} columns of {first}-{center}-{last} angles have been added.')
+
+    def angleColumnsAdd(self, triples):
+        """
+        Calculates minimum-image valence angles of triples of atoms or centers of mass for all steps at once and adds
+        them as new columns, triples which have already been added are skipped.
+        
+        Args:
+            triples: Triples of names of atoms or centers of mass with the central one in the middle.
+        
+        Initializes:
+            baseData: Store of the calculated angles.
+            mainColumns: Displayed columns, the angle columns are appended.
+            angleCols: List to keep track of added angle columns.
+            AngleAdded: A QComboBox widget to display added angles.
+            AngleRemoveCol: A button to remove added columns.
+            AnglePlaneXY, AnglePlaneYZ, AnglePlaneZX: Buttons to set the angle plane, they are enabled.
+        
+        Returns:
+            list: Names of the added columns.
+        """
+        triples = [triple for triple in dict.fromkeys(triples) if '-'.join(triple) not in self.angleCols]
+        if not triples:
+            return []
+        names = list(dict.fromkeys(name for triple in triples for name in triple))
+        indexes = {name: num for num, name in enumerate(names)}
+        angles = triple_angles(self.geometryDirect(names), np.asarray(self.__calculation['BASIS'], dtype=np.float64), [[indexes[name] for name in triple] for triple in triples])
+        columns = ['-'.join(triple) for triple in triples]
+        self.baseData.add(columns, np.round(angles, 2).T)
+        self.mainColumns.extend(columns)
+        self.angleCols.extend(columns)
+        self.AngleAdded.addItems(columns)
+        if not self.AngleAdded.isEnabled():
+            self.AngleAdded.setEnabled(True)
+        if not self.AngleRemoveCol.isEnabled():
+            self.AngleRemoveCol.setEnabled(True)
+        if not self.AnglePlaneXY.isEnabled():
+            self.AnglePlaneXY.setEnabled(True)
+            self.AnglePlaneYZ.setEnabled(True)
+            self.AnglePlaneZX.setEnabled(True)
+        return columns
+
     def AngleChooseToRemove(self, *args):
         """
         Enables the AngleRemoveCol widget.
@@ -1081,52 +1180,40 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
 
     def DivideCalculate(self):
         """
-        Calculates vibrational and rotational energies based on selected atoms and adds them as new columns to the DataFrame.
+        Splits kinetic energy of the fragment of selected atoms into translational, rotational and vibrational parts and
+        adds them as new columns to the DataFrame.
+        
+        Velocity vectors of all atoms of the fragment are calculated at once from the coordinates block and the
+        decomposition is made by rigid_body_energies for all steps in one pass, so only the three final energy columns
+        are added.
         
         Parameters:
         self - The instance of the class.
         
         Initializes the following class fields:
-        - `baseDf`: DataFrame used for calculations.
-        - `columnsNames`: List of column names.
-        - `divideCols`: List to store names of divided columns.
+        - `baseData`: Store to which energies are added.
+        - `divideCols`: List to store names of divided fragments.
         - `eColumns`: List to store names of energy columns.
-        - `mainDf`: Main DataFrame to which results are added.
-        - `_masses`: List of masses used in calculations.
-        - `calc_const`: Constant used in calculations.
+        - `mainColumns`: Displayed columns to which results are added.
         
         Returns:
         None
         """
-        temporaryCols = []
         atoms = sorted([item.text() for item in self.DivideList.selectedItems()])
         colName = '_'.join(atoms)
         if colName not in self.divideCols:
-            self.COMCalculate(atoms)
-            for atom in atoms:
-                self.baseDf[f'cm_{colName}--{atom}'] = np.sqrt((self.baseDf[f'cm_{colName}_x'] - self.baseDf[f'{atom}_x']) ** 2 + (self.baseDf[f'cm_{colName}_y'] - self.baseDf[f'{atom}_y']) ** 2 + (self.baseDf[f'cm_{colName}_z'] - self.baseDf[f'{atom}_z']) ** 2)
-                temporaryCols.append(f'cm_{colName}--{atom}')
-            for atom in atoms:
-                self.baseDf[f'Vvib_{colName}({atom})'] = self.baseDf[f'cm_{colName}--{atom}'].diff() * 1000
-                self.divineOnPOTIM(f'Vvib_{colName}({atom})', True)
-                self.baseDf[f'Evib_{colName}({atom})'] = self.baseDf[f'Vvib_{colName}({atom})'] ** 2 * self._masses[self.columnsNames.index(atom)] / self.calc_const
-                self.baseDf[f'Vsum_{colName}({atom})'] = np.sqrt((self.baseDf[f'{atom}_x'].diff() - self.baseDf[f'cm_{colName}_x'].diff()) ** 2 + (self.baseDf[f'{atom}_y'].diff() - self.baseDf[f'cm_{colName}_y'].diff()) ** 2 + (self.baseDf[f'{atom}_z'].diff() - self.baseDf[f'cm_{colName}_z'].diff()) ** 2) * 1000
-                self.divineOnPOTIM(f'Vsum_{colName}({atom})', True)
-                self.baseDf[f'Vrot_{colName}({atom})'] = np.sqrt((self.baseDf[f'Vsum_{colName}({atom})'] ** 2 - self.baseDf[f'Vvib_{colName}({atom})'] ** 2).clip(lower=0))
-                self.baseDf[f'Erot_{colName}({atom})'] = self.baseDf[f'Vrot_{colName}({atom})'] ** 2 * self._masses[self.columnsNames.index(atom)] / self.calc_const
-                self.eColumns.extend([f'Evib_{colName}({atom})', f'Erot_{colName}({atom})'])
-                temporaryCols.extend([f'Vvib_{colName}({atom})', f'Vsum_{colName}({atom})', f'Vrot_{colName}({atom})'])
-                if not self.ADel_energy_of_sel_atoms.isChecked():
-                    self.mainDf.insert(len(self.mainDf.columns), f'Evib_{colName}({atom})', self.baseDf[f'Evib_{colName}({atom})'])
-                    self.mainDf.insert(len(self.mainDf.columns), f'Erot_{colName}({atom})', self.baseDf[f'Erot_{colName}({atom})'])
-            self.baseDf[f'Evib_{colName}'] = sum(self.baseDf[f'Evib_{colName}({atom})'] for atom in atoms)
-            self.baseDf[f'Erot_{colName}'] = sum(self.baseDf[f'Erot_{colName}({atom})'] for atom in atoms)
-            self.baseDf.drop(columns=temporaryCols, inplace=True)
-            temporaryCols.clear()
-            self.eColumns.extend([f'Evib_{colName}', f'Erot_{colName}'])
+            coordinates = self.baseData.get([f'{atom}{proj}' for atom in atoms for proj in self.coordProjection])
+            velocities = self.columnDiff(coordinates)
+            self.divineOnPOTIM(velocities, True)
+            positions = coordinates.reshape((len(atoms), 3, -1)).transpose((2, 0, 1))
+            velocities = velocities.reshape((len(atoms), 3, -1)).transpose((2, 0, 1))
+            masses = np.asarray([self._masses[self.columnsNames.index(atom)] for atom in atoms], dtype=np.float64)
+            energies = rigid_body_energies(positions, velocities, masses, [range(len(atoms))])
+            columns = [f'Etr_{colName}', f'Erot_{colName}', f'Evib_{colName}']
+            self.baseData.add(columns, [energy[:, 0] for energy in energies], group='energies')
+            self.eColumns.extend(columns)
             if not self.ADel_energy_of_sel_atoms.isChecked():
-                self.mainDf.insert(len(self.mainDf.columns), f'Evib_{colName}', self.baseDf[f'Evib_{colName}'])
-                self.mainDf.insert(len(self.mainDf.columns), f'Erot_{colName}', self.baseDf[f'Erot_{colName}'])
+                self.mainColumns.extend(columns)
 
             self.divideCols.append(colName)
             self.DivideAdded.addItem(colName)
@@ -1136,8 +1223,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 self.DivideRemoveCol.setEnabled(True)
             self.refreshLists()
             self.DivideListClear()
-            self._model.refreshTable(self.mainDf)
-            self.addMessage(f'Columns divided to vibrational and rotational energy {colName} have been added.')
+            self.refreshTable()
+            self.addMessage(f'Columns divided to translational, rotational and vibrational energy {colName} have been added.')
         else:
             self.addMessage('Column already exists.')
 
@@ -1205,8 +1292,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             angleCols: List of column names for angle calculations.
             sumCols: List of column names for sum calculations.
             differenceCols: List of column names for difference calculations.
-            baseDf: The base DataFrame.
-            mainDf: The main DataFrame displayed in the UI.
+            baseData: The base store.
+            mainColumns: Columns displayed in the UI.
             _model: The underlying data model.
         
         Returns:
@@ -1218,10 +1305,10 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             for column in array.copy():
                 if column == oldName:
                     array[array.index(column)] = newName
-        self.baseDf.rename(columns={oldName: newName}, inplace=True)
-        self.mainDf.rename(columns={oldName: newName}, inplace=True)
+        self.baseData.rename(oldName, newName)
+        self.mainColumns = [newName if column == oldName else column for column in self.mainColumns]
         self.refreshLists()
-        self._model.refreshTable(self.mainDf)
+        self.refreshTable()
         self.addMessage(f'Column {oldName} has been renamed. New name is {newName}.')
 
     def delCoordsAction(self, state):
@@ -1233,25 +1320,21 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                    If True, coordinate columns are deleted; otherwise, they are added.
         
         Initializes:
-            self.mainDf: The main DataFrame used in the application. Modified to remove or add coordinate columns.
+            self.mainColumns: Displayed columns. Modified to remove or add coordinate columns.
             self.columnsNames: A list of column names. Updated after refreshing the lists.
         
         Returns:
             None
         """
         if state:
-            for name in self.columnsNames:
-                for proj in ['_x', '_y', '_z']:
-                    self.mainDf.drop(columns=f'{name}{proj}', inplace=True)
+            self.removeMainColumns([f'{name}{proj}' for name in self.columnsNames for proj in ['_x', '_y', '_z']])
             self.refreshLists()
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage('Columns with coordinates of atoms have been removed.')
         else:
-            for name in reversed(self.columnsNames):
-                for proj in reversed(['_x', '_y', '_z']):
-                    self.mainDf.insert(1, name + proj, self.baseDf[name + proj])
+            self.mainColumns[1:1] = [name + proj for name in self.columnsNames for proj in ['_x', '_y', '_z']]
             self.refreshLists()
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
             self.addMessage('Columns with coordinates of atoms have been added.')
 
     def delEnergyAction(self, state):
@@ -1259,8 +1342,8 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
         Deletes or adds energy-related columns to the main DataFrame.
         
          This method either removes the columns specified in `self.eColumns` from
-         `self.mainDf` if `state` is True, or re-inserts those columns from
-         `self.baseDf` into `self.mainDf` if `state` is False. It then refreshes
+         `self.mainColumns` if `state` is True, or appends those columns to
+         `self.mainColumns` if `state` is False. It then refreshes
          the table displayed by the model and adds a message to inform the user
          about the action taken.
         
@@ -1272,13 +1355,12 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
            None
         """
         if state:
-            self.mainDf.drop(columns=self.eColumns, inplace=True)
-            self._model.refreshTable(self.mainDf)
+            self.removeMainColumns(self.eColumns)
+            self.refreshTable()
             self.addMessage('Columns with energy have been removed.')
         else:
-            for column in self.eColumns:
-                self.mainDf.insert(len(self.mainDf.columns), column, self.baseDf[column])
-            self._model.refreshTable(self.mainDf)
+            self.mainColumns.extend(self.eColumns)
+            self.refreshTable()
             self.addMessage('Columns with energy have been added.')
 
     def columnSelected(self, selected, deselected):
@@ -1329,13 +1411,157 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
             None
         """
         columns_indexes = [column.column() for column in self._selectionModel.selectedColumns()]
-        df = pd.DataFrame(self.mainDf[self.mainDf.columns[0]])
-        for index in columns_indexes:
-            df[self.mainDf.columns[index]] = self.mainDf[self.mainDf.columns[index]]
+        df = self.baseData.to_frame([self.mainColumns[0]] + [self.mainColumns[index] for index in columns_indexes])
         self.__graph = VRGraph(df)
         self.PlotGraphButton.setDisabled(True)
         self._selectionModel.clearSelection()
 
+    def rdfCalculate(self):
+        """
+        Calculates total and partial radial distribution functions of all atoms over the whole trajectory and plots them.
+
+        The distribution is a separate derived dataset indexed by distance, so it is stored apart from the per-step
+        table and can be exported or plotted again.
+
+        Args:
+            self: The instance of the class.
+
+        Initializes:
+            self.rdfDf: A DataFrame with the distance column followed by total and partial g(r) columns.
+            self.__graph: A VRGraph object representing the plotted distribution.
+
+        Returns:
+            None
+        """
+        species = np.array([name.split('_')[0] for name in self.__calculation['ATOMNAMES']])
+        direct = np.asarray(self.__calculation['DIRECT'])[:self.__calculation['STEPS']]
+        try:
+            result = radial_distribution(direct, np.asarray(self.__calculation['BASIS'], dtype=np.float64), species, direct=True)
+        except ValueError as error:
+            self.addMessage(str(error))
+            return
+        self.rdfDf = result.to_frame()
+        self.__graph = VRGraph(self.rdfDf)
+        self.addMessage(f'Radial distribution function over {result.frames} steps has been calculated.')
+
+    def msdCalculate(self):
+        """
+        Calculates mean squared displacement of selected atoms from the unwrapped coordinates of the base store, fits
+        diffusion coefficients and plots species-averaged and per-atom MSD.
+
+        Args:
+            self: The instance of the class.
+
+        Initializes:
+            self.msdDf: A DataFrame with the lag time column followed by species-averaged and per-atom MSD columns.
+            self.__graph: A VRGraph object representing the plotted MSD.
+
+        Returns:
+            None
+        """
+        if not self._selectedNames:
+            self.addMessage('There are no selected atoms to calculate mean squared displacement.')
+            return
+        if len(set(float(potim) for potim in self.__calculation['POTIM'])) > 1:
+            self.addMessage(f"Steps with different POTIM are treated as equally spaced with POTIM {self.__calculation['POTIM'][0]}.")
+        positions = self.baseData.get(self.coordColumns).reshape((len(self.columnsNames), 3, -1)).transpose((2, 0, 1))
+        species = np.array([name.split('_')[0] for name in self._selectedNames])
+        try:
+            result = mean_squared_displacement(positions, species, float(self.__calculation['POTIM'][0]))
+            diffusion = result.species_diffusion()
+        except ValueError as error:
+            self.addMessage(str(error))
+            return
+        self.msdDf = result.to_frame(self.columnsNames)
+        self.__graph = VRGraph(self.msdDf)
+        self.addMessage('Diffusion coefficients, cm^2/s: ' + ', '.join(f'{name} {value:.3e}' for name, value in diffusion.items()))
+
+    def vdosCalculate(self):
+        """
+        Calculates mass-weighted velocity autocorrelation of selected atoms from the unwrapped coordinates of the base
+        store and plots the vibrational density of states.
+
+        Velocities are calculated with the time step of every part of the calculation from the time column, so parts with
+        different POTIM are handled the same way as in divineOnPOTIM.
+
+        Args:
+            self: The instance of the class.
+
+        Initializes:
+            self.vacfDf: A DataFrame with the lag time column followed by total and partial autocorrelation columns.
+            self.vdosDf: A DataFrame with frequency columns followed by total and partial VDOS columns.
+            self.__graph: A VRGraph object representing the plotted VDOS.
+
+        Returns:
+            None
+        """
+        if not self._selectedNames:
+            self.addMessage('There are no selected atoms to calculate vibrational density of states.')
+            return
+        positions = self.baseData.get(self.coordColumns).reshape((len(self.columnsNames), 3, -1)).transpose((2, 0, 1))
+        species = np.array([name.split('_')[0] for name in self._selectedNames])
+        try:
+            result = velocity_autocorrelation(positions, self.baseData['Time, fs'], species, np.asarray(self._masses, dtype=np.float64))
+        except ValueError as error:
+            self.addMessage(str(error))
+            return
+        self.vacfDf = result.to_frame()
+        self.vdosDf = result.density_of_states()
+        self.__graph = VRGraph(self.vdosDf.drop(columns='Wavenumber, cm^-1'))
+        self.addMessage(f'Vibrational density of states over {len(self.vacfDf)} lags has been calculated.')
+
+    def fragmentsCalculate(self):
+        """
+        Detects molecules of the whole calculation by the bond graph and adds centers of mass and translational,
+        rotational and vibrational energies of every molecule to the DataFrame without selecting atoms by hand.
+        
+        Only fragments of two and more atoms which exist in all steps are used. Fragments are made whole across periodic
+        boundaries along their bonds, so centers of mass and energies are continuous.
+        
+        Args:
+            self: The instance of the class.
+        
+        Initializes:
+            self.fragmentCols: Names of the detected fragments, e.g. 'F3_H2O'.
+            self.baseData: Centers of mass are added to the fragments group and energies to the energies group.
+            self.eColumns: Energy columns of fragments are appended.
+            self.mainColumns: Energy columns are displayed unless energies are deleted.
+        
+        Returns:
+            None
+        """
+        if self.fragmentCols:
+            self.addMessage('Fragments have already been detected.')
+            return
+        species = np.array([name.split('_')[0] for name in self.__calculation['ATOMNAMES']])
+        direct = np.asarray(self.__calculation['DIRECT'], dtype=np.float64)[:self.__calculation['STEPS']]
+        basis = np.asarray(self.__calculation['BASIS'], dtype=np.float64)
+        trajectory = detect_fragments(direct, basis, species, self.__settings.get_scene_params('bond', 'skin'),
+                                      self.__settings.get_scene_params('bond', 'length'))
+        ids = trajectory.stable()
+        if not ids:
+            self.addMessage('There are no molecules existing during the whole calculation.')
+            return
+        fragments = [trajectory.fragments[index] for index in ids]
+        masses = np.asarray(self.__calculation['MASSES'], dtype=np.float64)
+        positions = whole_positions(unwrap_direct(direct), basis, trajectory, ids)
+        velocities = self.columnDiff(positions.transpose((1, 2, 0)))
+        self.divineOnPOTIM(velocities, True)
+        energies = rigid_body_energies(positions, velocities.transpose((2, 0, 1)), masses, fragments)
+        centers = fragment_centers(positions, masses, fragments)
+        rows = slice(1, 1 + self.baseData.length) if self._selectedNames else slice(0, self.baseData.length)
+        self.fragmentCols = [f'F{index}_{trajectory.names[index]}' for index in ids]
+        for num, name in enumerate(self.fragmentCols):
+            self.baseData.add([f'cm_{name}{proj}' for proj in self.coordProjection], centers[rows, num].T, group='fragments')
+            columns = [f'Etr_{name}', f'Erot_{name}', f'Evib_{name}']
+            self.baseData.add(columns, [energy[rows, num] for energy in energies], group='energies')
+            if self._selectedNames:
+                self.eColumns.extend(columns)
+            if not self.ADel_energy_of_sel_atoms.isChecked():
+                self.mainColumns.extend(columns)
+        self.refreshTable()
+        self.addMessage(f'{len(ids)} molecules have been detected: ' + ', '.join(self.fragmentCols[:10]) + (', ...' if len(ids) > 10 else '') + '.')
+
     def oszicarCheckboxUnlock(self):
         """
         Enables the AInclude_OSZICAR checkbox if an OSZICAR file is found in the specified directory.
@@ -1357,7 +1583,7 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
 
     def oszicarAction(self, state):
         """
-        Adds or removes the OSZICAR dataframe to/from the main dataframe based on the provided state.
+        Adds or removes the OSZICAR columns to/from the base store and displayed columns based on the provided state.
         
         Args:
             state: A boolean indicating whether to add or remove the OSZICAR dataframe.
@@ -1365,20 +1591,25 @@ class VRProcessing(Ui_VRProcessing, QMainWindow):
                 If False, the specified columns are removed from the main dataframe.
         
         Initializes:
-            mainDf: The main dataframe, updated with or without the OSZICAR data.
+            mainColumns: Displayed columns, updated with or without the OSZICAR columns.
             
         Returns:
             None
         """
         if state:
             oszicarDataframe = VROszicarProcessing(self.__calculation['DIRECTORY'], self.getLogger(), self.__calculation['STEPS_LIST'], self.__calculation['POTIM']).oszicarDf
-            self.mainDf = pd.concat([self.mainDf, oszicarDataframe[oszicarDataframe.columns[1:]]], axis=1)
+            oszicarColumns = oszicarDataframe.columns[1:].tolist()
+            oszicarData = np.full((len(oszicarColumns), self.baseData.length), np.nan)
+            rows = min(self.baseData.length, len(oszicarDataframe))
+            oszicarData[:, :rows] = oszicarDataframe[oszicarColumns].to_numpy(dtype=np.float64)[:rows].T
+            self.baseData.add(oszicarColumns, oszicarData, group='oszicar')
+            self.mainColumns.extend(oszicarColumns)
             self.addMessage('OSZICAR dataframe has been added.')
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
         else:
-            self.mainDf.drop(columns=['T', 'E', 'F', 'E0', 'EK', 'SP', 'SK', 'mag'], inplace=True)
+            self.removeMainColumns(['T', 'E', 'F', 'E0', 'EK', 'SP', 'SK', 'mag'])
             self.addMessage('OSZICAR dataframe has been removed.')
-            self._model.refreshTable(self.mainDf)
+            self.refreshTable()
 
     def saveTable(self):
         """
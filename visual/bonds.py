@@ -0,0 +1,76 @@
+"""Bonds of trajectory frames with the Verlet neighbour list reused between frames."""
+
+# This file is part of ProChem.
+# ProChem Copyright (C) 2021-2025 A.A.Solovykh - https://github.com/asolovykh
+# See LICENSE.txt for details.
+
+import numpy as np
+import logging
+from visual.jit_functions.bonds import bond_pairs, filter_pairs, max_displacement
+
+logger = logging.getLogger(__name__)
+
+__all__ = ["VerletList"]
+
+
+class VerletList:
+    """
+    Verlet neighbour list of bonds.
+
+    The list holds all pairs closer than cutoffs plus the skin distance. While no atom has moved by more than half of
+    the skin since the list was built, every bonded pair of the current frame is in the list, so bonds of a frame are
+    found by a filtered pass over the cached pairs instead of the linked-cell search. The list is rebuilt if the
+    displacement exceeds half of the skin or if the cell or the set of atoms with known coordinates changes, e.g.
+    after a jump to a distant step.
+    """
+
+    def __init__(self, types: np.ndarray, cutoffs: np.ndarray, skin: float):
+        """
+        VerletList class initialization function.
+
+        Args:
+            types (np.ndarray): int type of every atom.
+            cutoffs (np.ndarray): maximal bond lengths of shape (types, types).
+            skin (float): skin distance in A, settings.get_scene_params('bond', 'skin').
+        """
+        self.__types = np.asarray(types, dtype=np.int64)
+        self.__cutoffs = np.asarray(cutoffs, dtype=np.float64)
+        self.__skin = float(skin)
+        self.__reference = None
+        self.__cell = None
+        self.__valid = None
+        self.__first = self.__second = None
+        self.rebuilds = 0
+
+    def reset(self) -> None:
+        """Drops the cached list, so it is rebuilt for the next frame."""
+        self.__reference = None
+
+    def needs_rebuild(self, direct: np.ndarray, cell: np.ndarray, valid: np.ndarray) -> bool:
+        """Returns whether the cached list may miss bonds of the frame."""
+        if self.__reference is None or not np.array_equal(cell, self.__cell) or not np.array_equal(valid, self.__valid):
+            return True
+        return max_displacement(direct, self.__reference, cell, valid) > self.__skin / 2
+
+    def bonds(self, direct: np.ndarray, cell: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns bonds of the frame, the list is rebuilt only if needed.
+
+        Args:
+            direct (np.ndarray): direct coordinates of shape (atoms, 3), atoms with NaN coordinates have no bonds.
+            cell (np.ndarray): cell of shape (3, 3).
+
+        Returns:
+            tuple[np.ndarray, np.ndarray, np.ndarray]: first and second atoms of bonds with first < second and their
+            lengths.
+        """
+        direct = np.asarray(direct, dtype=np.float64)
+        cell = np.asarray(cell, dtype=np.float64)
+        valid = np.isfinite(direct).all(axis=1)
+        direct = np.where(valid[:, np.newaxis], direct, 0.0)
+        if self.needs_rebuild(direct, cell, valid):
+            self.__first, self.__second, _ = bond_pairs(direct, cell, self.__types, self.__cutoffs + self.__skin, valid)
+            self.__reference, self.__cell, self.__valid = direct, cell, valid
+            self.rebuilds += 1
+            logger.debug(f"Verlet list rebuilt with {self.__first.size} pairs.")
+        return filter_pairs(direct, cell, self.__types, self.__cutoffs, self.__first, self.__second)
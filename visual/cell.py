@@ -17,10 +17,30 @@ class Cell:
     def __init__(self, vec_x, vec_y, vec_z, settings):
         """Cell class initialization function."""
         self.__settings = settings
+        self.__vectors = None
+        self.__cell_primitive = None
+        self.update(np.array([vec_x, vec_y, vec_z], dtype=np.float32))
+
+    def update(self, cell: np.ndarray, step: int = 0) -> bool:
+        """
+        Rebuilds the cell primitive if the cell of the step differs from the drawn one.
+
+        Args:
+            cell (np.ndarray): cell vectors of shape (3, 3) or per-frame cells of shape (steps, 3, 3).
+            step (int): displayed step, used for per-frame cells only.
+
+        Returns:
+            bool: True if the primitive was rebuilt.
+        """
+        vectors = np.asarray(cell[step] if cell.ndim == 3 else cell, dtype=np.float32)
+        if self.__vectors is not None and np.array_equal(vectors, self.__vectors):
+            return False
+        self.__vectors = vectors.copy()
         self.__cell_primitive = Primitive(
-            *Parallelepiped(vec_x, vec_y, vec_z, draw_type="LINES"), [1.0, 0.0, 0.0]
+            *Parallelepiped(*self.__vectors, draw_type="LINES"), [1.0, 0.0, 0.0]
         )
         self.__cell_primitive.scale(3)
+        return True
 
     def draw(self, uniform_variables) -> None:
         """Draws cell."""
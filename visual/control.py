@@ -8,13 +8,17 @@ import os
 import codecs
 import time
 import logging
-from multiprocessing import Process, Lock as MLock, cpu_count, Manager
+from multiprocessing import Process, Pipe, Lock as MLock, cpu_count, Manager
 from threading import Thread, Lock as TLock
-from parsers.vasp import Parser as VASPparser
+from parsers.vasp import Parser as VASPparser, VASPreadMode
+from parsers.cache import CalculationCache
+from parsers.trajectory import LazyTrajectory
+from parsers.shared import read_to_shared_memory
 from vasp.processing import VRProcessing
 from vasp.oszicar import VROszicar
 from gui.control import Ui_Control, QMainWindow
 from PySide6.QtGui import QCloseEvent
+from PySide6.QtCore import Signal
 from PySide6.QtWidgets import QColorDialog, QFileDialog
 
 logger = logging.getLogger(__name__)
@@ -31,11 +35,19 @@ class ControlWindow(Ui_Control, QMainWindow):
     
     Class Attributes:
     - __cpu_count
+    - lazy_read_size: vasprun.xml files larger than this number of bytes are indexed and read frame by frame.
+    - prefetch_steps: number of steps decoded in background after the chosen one for lazy trajectories.
+    - follow_ready: signal with the parser of a followed calculation which got its first steps or an error.
+    - follow_steps_appended: signal with the last step of a followed calculation which got new steps.
     
     Class Methods:
     - __init__:
     """
     __cpu_count = cpu_count()
+    lazy_read_size = 2 * 1024 ** 3
+    prefetch_steps = 32
+    follow_ready = Signal(object)
+    follow_steps_appended = Signal(int)
     
     def __init__(self, settings, print_window_object):
         """
@@ -56,6 +68,9 @@ class ControlWindow(Ui_Control, QMainWindow):
             self.__parser_threads: A list to store parser threads.
             self.__parser_processes: A list to store parser processes.
             self.__parser_objs: A list to store parser objects.
+            self.__parser_connections: A list to store pipe connections to parser processes.
+            self.__followed_parsers: A list to store parsers of running calculations which are followed.
+            self.__waiting_parsers: A list to store parsers of followed calculations without written steps yet.
             self.__threads_locker: A TLock object for synchronizing access to parser threads.
             self.__processes_locker: An MLock object for synchronizing access to parser processes.
             self.__is_threading_mode: A boolean flag indicating whether threading mode is enabled. Initialized to True.
@@ -87,6 +102,7 @@ class ControlWindow(Ui_Control, QMainWindow):
         self.__calculations = dict()
         
         self.__parser_threads, self.__parser_processes, self.__parser_objs = [], [], []
+        self.__parser_connections, self.__followed_parsers, self.__waiting_parsers = [], [], []
         self.__threads_locker, self.__processes_locker = TLock(), MLock()
         self.__is_threading_mode = True
         if self.__cpu_count > 4:
@@ -161,6 +177,8 @@ class ControlWindow(Ui_Control, QMainWindow):
         self.VASP_Processing.triggered.connect(self.processing_start)
         self.VASP_OSZICAR.triggered.connect(self.oszicar_window)
         self.AThreading.toggled.connect(self.set_threading)
+        self.follow_ready.connect(self.follow_add)
+        self.follow_steps_appended.connect(self.follow_steps_update)
         self.AMultiprocessing.toggled.connect(self.set_multiprocessing)
         logger.info(f"Control window elements linked with functions")
 
@@ -416,7 +434,7 @@ class ControlWindow(Ui_Control, QMainWindow):
         if file_names:
             self.__settings.set_control_params(os.path.dirname(file_names[0]), 'browse_folder_path')
             for file_name in file_names:
-                self.add_calculation(file_name)
+                self.add_calculation(file_name, self.__settings.get_control_params('follow_calculations'))
 
         #logger.info(f"Calculation directory chosen")
 
@@ -558,7 +576,10 @@ class ControlWindow(Ui_Control, QMainWindow):
         
         This method stops any ongoing step changing process, updates the internal step
         value with the current slider position, and then updates the label displaying
-        the current step and maximum step values.
+        the current step and maximum step values. The step is passed to the scene, so
+        trajectories kept on the GPU are scrubbed by one uniform update. Frames of lazy
+        trajectories of visible calculations starting from the chosen step are decoded
+        in background by one worker per trajectory, which always takes the latest step.
         
         Args:
             self: The instance of the class.
@@ -568,7 +589,13 @@ class ControlWindow(Ui_Control, QMainWindow):
         """
         self.stop_step_changing()
         self.__visual_window._step = self.StepSlider.sliderPosition()
+        self.__visual_window.openGLWidget.set_step(self.__visual_window._step)
         self.StepLabel.setText(f'Step:\t{self.__visual_window._step}\tfrom\t{self.StepSlider.maximum()}')
+        for calc_id in self.__calculations:
+            if self.__calculations[calc_id]['visible']:
+                for calc in self.__calculations[calc_id]['calculations']:
+                    if isinstance(calc.positions, LazyTrajectory):
+                        calc.positions.prefetch_async(self.__visual_window._step, self.prefetch_steps)
 
     def speed_change(self):
         """
@@ -586,16 +613,20 @@ class ControlWindow(Ui_Control, QMainWindow):
         """
         self.__settings.set_visual_params(self.SpeedSlider.sliderPosition(), 'slider_speed')
 
-    def add_calculation(self, file_path: str):
+    def add_calculation(self, file_path: str, follow: bool = False):
         """
         Adds a calculation to be parsed.
         
         This method checks if the calculation has already been added, then parses the calculation file
-        using either threading or multiprocessing, depending on the configured mode.
+        using either threading or multiprocessing, depending on the configured mode. In multiprocessing mode
+        the parsed calculation is returned through shared memory (see parsers.shared). Followed calculations
+        are always parsed in a thread and then updated with appended steps by check_parsers. Parsed calculations are
+        stored in the on-disk cache only if the 'calculation_cache' control setting is on.
         
         Args:
             self: The instance of the class.
             file_path (str): The path to the VASP calculation file.
+            follow (bool): Whether the file belongs to a running calculation and must be followed.
         
         Returns:
             None
@@ -607,14 +638,22 @@ class ControlWindow(Ui_Control, QMainWindow):
                     logger.info(f"Calculation {file_path} already added")
                     return
 
-        parser = VASPparser(file_path)
+        if follow:
+            Thread(target=self.follow_start, args=(VASPparser(file_path, cache=None),), daemon=True).start()
+            logger.info(f"Calculation {file_path} parsing in follow mode")
+            return
+        read_mode = VASPreadMode.LAZY if os.path.getsize(file_path) > self.lazy_read_size else VASPreadMode.BULK
+        cache = CalculationCache() if self.__settings.get_control_params('calculation_cache') else None
+        parser = VASPparser(file_path, read_mode=read_mode, cache=cache)
         if self.__is_threading_mode:
             self.__parser_objs.append(parser)
             self.__parser_threads.append(Thread(target=parser.read, args=(), daemon=True))
             self.__parser_threads[-1].start()
         else:
+            parent_connection, child_connection = Pipe()
             self.__parser_objs.append(parser)
-            self.__parser_processes.append(Process(target=parser.read, args=(), daemon=True))
+            self.__parser_connections.append(parent_connection)
+            self.__parser_processes.append(Process(target=read_to_shared_memory, args=(parser, child_connection), daemon=True))
             self.__parser_processes[-1].start()
         self.block_parser_mode_changing()
         logger.info(f"Calculation {file_path} parsing in " + "threading" if self.__is_threading_mode else "multiprocessing" + " mode")
@@ -625,7 +664,10 @@ class ControlWindow(Ui_Control, QMainWindow):
         
         This method continuously monitors parser threads or processes to determine if they have finished.
         When a thread or process completes, its associated parsing result is processed and added to the action queue.
+        Parser processes send a SharedCalculation object through the pipe, the calculation is rebuilt on top of
+        shared memory blocks without copying and the process is acknowledged to release its handles.
         The method handles both threading and multiprocessing modes. It also enables parser mode changing when all parsers are finished.
+        Followed calculations are updated every 'follow_interval' seconds.
         
         Args:
             self: The instance of the class.
@@ -635,13 +677,18 @@ class ControlWindow(Ui_Control, QMainWindow):
             __parser_threads: A list of parser threads.
             __parser_processes: A list of parser processes.
             __parser_objs: A list of parser objects (results).
+            __parser_connections: A list of pipe connections to parser processes.
             __threads_locker: A lock for synchronizing access to parser threads.
             __processes_locker: A lock for synchronizing access to parser processes.
         
         Returns:
             None
         """
+        follow_time = time.monotonic()
         while True:
+            if (self.__followed_parsers or self.__waiting_parsers) and time.monotonic() - follow_time > self.__settings.get_control_params('follow_interval'):
+                self.follow_calculations()
+                follow_time = time.monotonic()
             if self.__is_threading_mode and self.__parser_threads:
                 for num, thread in enumerate(self.__parser_threads.copy()):
                     if not thread.is_alive():
@@ -651,19 +698,128 @@ class ControlWindow(Ui_Control, QMainWindow):
                 if not self.__parser_threads:
                     self.enable_parser_mode_changing()
             elif not self.__is_threading_mode and self.__parser_processes:
-                for num, process in enumerate(self.__parser_processes.copy()):
-                    if not process.is_alive():
+                for num in reversed(range(len(self.__parser_processes))):
+                    process, connection = self.__parser_processes[num], self.__parser_connections[num]
+                    if connection.poll():
+                        with self.__processes_locker:
+                            calculation = connection.recv().to_calculation()
+                            connection.send(True)
+                            self.__parser_objs.pop(num)
+                            self.__parser_processes.pop(num)
+                            self.__parser_connections.pop(num).close()
+                        self.process_add_action(VASPparser(calculation=calculation))
+                    elif not process.is_alive():
                         with self.__processes_locker:
-                            self.process_add_action(dict(self.__parser_objs.pop(num)))
+                            parser = self.__parser_objs.pop(num)
                             self.__parser_processes.pop(num)
+                            self.__parser_connections.pop(num).close()
+                        parser.get_calculation().errors.exist = True
+                        parser.get_calculation().errors.message = f"Parser process exited with code {process.exitcode} without result.\n"
+                        self.process_add_action(parser)
                 if not self.__parser_processes:
                     self.enable_parser_mode_changing()
             time.sleep(0.2)
 
+    @staticmethod
+    def follow_is_ready(parser) -> bool:
+        """
+        Returns whether the followed calculation has written steps or got a parsing error.
+        
+        Args:
+            parser: The parser of the followed calculation.
+        
+        Returns:
+            bool: True if the calculation can be added to the calculations list.
+        """
+        calculation = parser.get_calculation()
+        return calculation.errors.exist or (calculation.positions is not None and calculation.positions.shape[0] > 0)
+
+    def follow_start(self, parser):
+        """
+        Parses the running calculation and starts following it.
+        
+        A job which has not written its header or first step yet waits in check_parsers until it has.
+        
+        Args:
+            self: The instance of the class.
+            parser: The parser of the followed calculation.
+        
+        Returns:
+            None
+        """
+        parser.follow()
+        if self.follow_is_ready(parser):
+            self.follow_ready.emit(parser)
+        else:
+            self.__waiting_parsers.append(parser)
+
+    def follow_add(self, parser):
+        """
+        Adds the followed calculation to the calculations list in the GUI thread.
+        
+        Args:
+            self: The instance of the class.
+            parser: The parser of the followed calculation.
+        
+        Returns:
+            None
+        """
+        self.process_add_action(parser)
+        if not parser.get_calculation().errors.exist:
+            self.__followed_parsers.append(parser)
+
+    def follow_steps_update(self, last_step):
+        """
+        Grows the step slider maximum up to the last step of a followed calculation in the GUI thread.
+        
+        Args:
+            self: The instance of the class.
+            last_step: The last step of the followed calculation.
+        
+        Returns:
+            None
+        """
+        self.StepSlider.setMaximum(max(self.StepSlider.maximum(), last_step))
+        self.StepLabel.setText(f'Step:\t{self.__visual_window._step}\tfrom\t{self.StepSlider.maximum()}')
+
+    def follow_calculations(self):
+        """
+        Parses steps appended to the followed calculations and requests the step slider update.
+        
+        Calculations which were deleted or got parsing errors are no longer followed. Waiting calculations are added
+        once their first steps are written. Widgets are updated through signals, since the method runs in the
+        check_parsers thread.
+        
+        Args:
+            self: The instance of the class.
+        
+        Returns:
+            None
+        """
+        for parser in self.__waiting_parsers.copy():
+            parser.follow()
+            if self.follow_is_ready(parser):
+                self.__waiting_parsers.remove(parser)
+                self.follow_ready.emit(parser)
+        calculations = [calc for calc_id in self.__calculations for calc in self.__calculations[calc_id]['calculations']]
+        for parser in self.__followed_parsers.copy():
+            calculation = parser.get_calculation()
+            if not any(calc is calculation for calc in calculations):
+                self.__followed_parsers.remove(parser)
+                continue
+            new_steps = parser.follow()
+            if calculation.errors.exist:
+                self.__followed_parsers.remove(parser)
+                self.get_print_window().add_message(calculation.errors.message)
+            elif new_steps:
+                self.follow_steps_appended.emit(calculation.positions.shape[0] - 1)
+
     def process_add_action(self, parser):
         """
         Processes an add action by parsing a calculation and adding it to the calculations list.
         
+        The trajectory of the added calculation is played by the OpenGL widget of the visual window.
+        
         Args:
             self: The instance of the class.
             parser: The parser object containing the calculation to be added.
@@ -699,6 +855,8 @@ class ControlWindow(Ui_Control, QMainWindow):
             self.StepSlider.setMaximum(self.__calculations[id]['calculations'][-1].positions.shape[0] - 1)
             self.StepSlider.setValue(0)
             self.__visual_window._step = 0
+            self.__visual_window.openGLWidget.set_step(0)
+            self.__visual_window.openGLWidget.set_calculation(parser.get_calculation())
             self.StepLabel.setText(f'Step:\t{self.__visual_window._step}\tfrom\t{self.StepSlider.maximum()}')
             logger.info(f"Calculation {parser.get_calculation().name} parsed")
 
@@ -718,14 +876,16 @@ class ControlWindow(Ui_Control, QMainWindow):
             __parser_processes: A list of parser processes. Processes are removed from this list when stopped.
             __parser_threads: A list of parser threads. Threads are removed from this list when stopped.
             __parser_objs: A list of parser objects associated with each process/thread. Objects are removed when the corresponding process/thread is stopped.
+            __parser_connections: A list of pipe connections to parser processes. Connections are closed when the corresponding process is stopped.
         
         Returns:
             None
         """
-        for num, process in enumerate(self.__parser_processes.copy()):
+        for process in self.__parser_processes.copy():
             with self.__processes_locker:
-                self.__parser_processes.pop(num)
-                self.__parser_objs.pop(num)
+                self.__parser_processes.pop(0)
+                self.__parser_objs.pop(0)
+                self.__parser_connections.pop(0).close()
                 process.terminate()
             self.enable_parser_mode_changing()
         for num, thread in enumerate(self.__parser_threads.copy()):
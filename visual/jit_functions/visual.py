@@ -15,6 +15,7 @@ __all__ = [
     "perspective",
     "ortho",
     "look_at",
+    "projected_radii",
     "perspective_choose",
     "orthographic_choose"
 ]
@@ -98,6 +99,36 @@ def look_at(eye, center, up) -> np.ndarray:
     return m @ trans
 
 
+@jit(fastmath=True, nopython=True, cache=True)
+def projected_radii(instances, model_view, projection, height) -> np.ndarray:
+    """
+    Returns radii in pixels of unit spheres of instances on the screen.
+
+    Instances are rows (x, y, z, scale, ...) transformed as in the vertex shader, where the homogeneous coordinate
+    1 / scale scales the object, so the radius in the view space is 1 / w. Spheres behind the camera get zero radius.
+
+    Args:
+        instances: instances of shape (instances, 7).
+        model_view: product of view and scene matrices of shape (4, 4).
+        projection: projection matrix of shape (4, 4).
+        height: viewport height in pixels.
+    """
+    radii = np.empty(instances.shape[0])
+    is_perspective = projection[3, 3] == 0.0
+    factor = projection[1, 1] * height / 2
+    for i in range(instances.shape[0]):
+        x, y, z, w_in = instances[i, 0], instances[i, 1], instances[i, 2], 1.0 / instances[i, 3]
+        w = model_view[3, 0] * x + model_view[3, 1] * y + model_view[3, 2] * z + model_view[3, 3] * w_in
+        depth = -(model_view[2, 0] * x + model_view[2, 1] * y + model_view[2, 2] * z + model_view[2, 3] * w_in) / w
+        if not is_perspective:
+            radii[i] = factor / w
+        elif depth > 0.0:
+            radii[i] = factor / (w * depth)
+        else:
+            radii[i] = 0.0
+    return radii
+
+
 @jit(fastmath=True, nopython=True)
 def perspective_choose(prj_mat, mpos, ll, dis, parameter) -> list[int]:
     """Option of choosing object on the screen with perspective view.
@@ -5,10 +5,13 @@
 # See LICENSE.txt for details.
 
 import numpy as np
-from visual.vao import VAO
+from typing import Optional
+from visual.vao import VAO, InstanceBuffer
+from visual.jit_functions.primitives import Sphere
+from visual.jit_functions.visual import projected_radii
 from OpenGL.GL import *
 
-__all__ = ["Primitive"]
+__all__ = ["Primitive", "SphereLOD"]
 
 
 class Primitive:
@@ -41,6 +44,8 @@ class Primitive:
         self.__texture = texture
         self.__transformation_matrix = np.identity(4, dtype=np.float32)
         self.__vao_buffer = VAO((self.__vertex, self.__normal, self.__texture_indexes), self.__indexes, usage, target).create()
+        self.__instances = None
+        self.__streamed = False
 
     def set_transformation_matrix(self, transformation_matrix) -> None:
         """Sets transformation matrix."""
@@ -94,3 +99,94 @@ class Primitive:
         self.__vao_buffer.get_indexes().unbind()
         glBindVertexArray(0)
 
+
+    def set_instances(self, instances: np.ndarray) -> None:
+        """Uploads per-instance positions, scales and colors of shape (instances, 7) for instanced draws."""
+        if self.__instances is None:
+            self.__instances = InstanceBuffer()
+            self.__instances.update(instances)
+            self.__instances.attach(self.__vao_buffer.vao)
+        else:
+            self.__instances.update(instances)
+
+    def get_instances(self) -> Optional[InstanceBuffer]:
+        """Returns the instance buffer of primitive."""
+        return self.__instances
+
+    def share_instances(self, instances: InstanceBuffer) -> None:
+        """Draws instances of another primitive, e.g. atoms of the sphere mesh by impostor quads."""
+        self.__instances = instances
+        instances.attach(self.__vao_buffer.vao)
+        self.__streamed = False
+
+    def draw_instanced(self, stream=None) -> None:
+        """
+        Draws all uploaded instances of primitive by one draw call, positions are taken from stream if given.
+
+        The first draw without stream after streamed ones points the positions back to the instance buffer.
+        """
+        if self.__instances is None or not self.__instances.count:
+            return
+        if stream is not None:
+            stream.attach(self.__vao_buffer.vao)
+            self.__streamed = True
+        elif self.__streamed:
+            self.__instances.attach(self.__vao_buffer.vao)
+            self.__streamed = False
+        glBindVertexArray(self.__vao_buffer.vao)
+        self.__vao_buffer.get_indexes().bind()
+        glDrawElementsInstanced(self.__draw_type, self.__indexes.shape[0], GL_UNSIGNED_INT, None, self.__instances.count)
+        self.__vao_buffer.get_indexes().unbind()
+        glBindVertexArray(0)
+
+
+class SphereLOD:
+    """
+    Sphere meshes of several tessellation levels chosen for every instance by its size on the screen.
+
+    Instances are bucketed by projected radius in pixels, spheres larger than thresholds[0] are drawn by the finest
+    mesh, smaller ones by coarser meshes, every level by one instanced draw. Buckets are rebuilt only if instances,
+    camera, scene matrices or viewport have changed.
+    """
+    levels = ((32, 32), (16, 12), (8, 6))  # slices and stacks of meshes
+    thresholds = (16.0, 4.0)  # minimal projected radii in pixels of the finest levels
+
+    def __init__(self, radius=1.0):
+        """SphereLOD class initialization function."""
+        meshes = [Sphere(radius, slices, stacks) for slices, stacks in self.levels]
+        self.__triangles = np.array([mesh[3].shape[0] // 3 for mesh in meshes])
+        self.__meshes = [Primitive(*mesh) for mesh in meshes]
+        self.__instances = np.empty((0, 7), dtype=np.float32)
+        self.__state = None
+        self.counts = np.zeros(len(self.levels), dtype=np.int64)
+
+    def set_instances(self, instances: np.ndarray) -> None:
+        """Sets instances of shape (instances, 7), they are bucketed by the next update."""
+        self.__instances = instances
+        self.__state = None
+
+    def update(self, model_view: np.ndarray, projection: np.ndarray, height: int) -> None:
+        """Buckets instances by projected radii and uploads them into meshes of levels if the view has changed."""
+        state = (model_view.tobytes(), projection.tobytes(), int(height))
+        if state == self.__state:
+            return
+        self.__state = state
+        radii = projected_radii(self.__instances, model_view.astype(np.float64), projection.astype(np.float64), float(height))
+        levels = np.zeros(radii.shape[0], dtype=np.int64)
+        for threshold in self.thresholds:
+            levels += radii < threshold
+        order = np.argsort(levels, kind='stable')
+        self.counts = np.bincount(levels, minlength=len(self.levels))
+        bounds = np.concatenate(([0], np.cumsum(self.counts)))
+        instances = self.__instances[order]
+        for level, mesh in enumerate(self.__meshes):
+            mesh.set_instances(instances[bounds[level]:bounds[level + 1]])
+
+    def triangles(self) -> int:
+        """Returns number of triangles drawn for all instances."""
+        return int(self.counts @ self.__triangles)
+
+    def draw_instanced(self) -> None:
+        """Draws instances of all levels."""
+        for mesh in self.__meshes:
+            mesh.draw_instanced()
@@ -5,21 +5,28 @@
 # See LICENSE.txt for details.
 
 import numpy as np
+import time
+import logging
 from OpenGL.GL import *
 from PySide6.QtGui import QImage
 from PIL import Image, ImageQt
 from visual.camera import Camera
 from visual.light import SceneLight
 from visual.axes import Axes
-from visual.primitives import Primitive
+from visual.primitives import Primitive, SphereLOD
+from visual.vao import StreamingBuffer, FramePrefetcher, ResidentTrajectory
 from visual.jit_functions.visual import *
 from visual.jit_functions.primitives import *
 
+logger = logging.getLogger(__name__)
+
 __all__ = ["Scene"]
 
 
 class Scene:
     """Scene class."""
+    renderers = ('mesh', 'impostor')
+    trajectory_unit = 1  # texture unit of resident trajectories, unit 0 is used by textureMap
     _instance = None
     _initialized = False
 
@@ -43,10 +50,20 @@ class Scene:
                 'Cube': Primitive(*Cube(1)),
                 'Torus': Primitive(*Torus(1, 1.0, 0.5, 32, 32)),
                 'Tube': Primitive(*Tube(1, 0.5, 32)),
-                'Cone': Primitive(*Cone(1, 0.5, 32))
+                'Cone': Primitive(*Cone(1, 0.5, 32)),
+                'Impostor': Primitive(*Quad(1))
             }
             self.__draw_buffer = dict()
             self.__texture = dict()
+            self.__instanced = True
+            self.__instances_changed = False
+            self.__streams = dict()
+            self.__resident = dict()
+            self.__step = 0
+            self.__renderer = 'mesh'
+            self.__impostor_program = None
+            self.__sphere_lod = SphereLOD(1.0)
+            self.__lod = True
 
             self.__rotation_matrix = np.identity(4, dtype=np.float32)
             self.__translation_matrix = np.identity(4, dtype=np.float32)
@@ -63,6 +80,123 @@ class Scene:
          None
         """
         self.__draw_buffer = draw_buffer
+        self.__instances_changed = True
+
+    def set_instanced(self, instanced: bool) -> None:
+        """Chooses instanced draws (one draw call per primitive type) or one draw call per object."""
+        self.__instanced = instanced
+
+    def set_impostor_program(self, program) -> None:
+        """Sets the shader program ray casting spheres on quads."""
+        self.__impostor_program = program
+
+    def set_renderer(self, renderer: str) -> None:
+        """
+        Chooses how atoms (instances of 'Sphere') are drawn.
+
+        Args:
+         renderer: 'mesh' for instanced sphere meshes or 'impostor' for ray-cast spheres on screen-aligned quads,
+            which cost 2 triangles per atom instead of about 2000 and have exact silhouettes and depth.
+
+        Returns:
+         None
+        """
+        if renderer not in self.renderers:
+            raise ValueError(f"Unknown renderer {renderer}, expected one of {self.renderers}.")
+        if renderer == 'impostor' and self.__impostor_program is None:
+            logger.warning("Impostor shader program is not available, spheres are drawn by meshes.")
+        self.__renderer = renderer
+        logger.info(f"Atoms renderer changed to {renderer}")
+
+    def set_lod(self, lod: bool) -> None:
+        """Chooses whether spheres of the draw buffer are drawn by meshes of levels of detail or by the finest mesh."""
+        self.__lod = lod
+
+    def get_renderer(self) -> str:
+        """Returns the current atoms renderer."""
+        return self.__renderer
+
+    @staticmethod
+    def instance_array(groups: dict) -> np.ndarray:
+        """
+        Packs objects of one primitive type into the array of instances.
+
+        Args:
+         groups: dictionary {(color, scale): [[x, y, z], ...]} of the draw buffer.
+
+        Returns:
+         np.ndarray: float32 array of shape (objects, 7) with positions, scales and colors of objects.
+        """
+        blocks = []
+        for (color, scale), positions in groups.items():
+            positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+            block = np.empty((positions.shape[0], 7), dtype=np.float32)
+            block[:, :3], block[:, 3], block[:, 4:] = positions, scale, color
+            blocks.append(block)
+        return np.concatenate(blocks) if blocks else np.empty((0, 7), dtype=np.float32)
+
+    def upload_instances(self) -> None:
+        """Uploads instances of the draw buffer into instance buffers of primitives."""
+        for key in self.__draw_buffer:
+            if key not in self.__streams and key not in self.__resident:
+                instances = self.instance_array(self.__draw_buffer[key])
+                self.__primitives[key].set_instances(instances)
+                if key == 'Sphere':
+                    self.__sphere_lod.set_instances(instances)
+        self.__instances_changed = False
+
+    def set_trajectory(self, positions, colors, scales, key='Sphere', prefetch_depth=8, resident=None):
+        """
+        Sets the trajectory played by the primitive.
+
+        Colors and scales of atoms are uploaded once. If the trajectory fits the video memory budget
+        scene_params['trajectory']['gpu_memory_budget'], it is uploaded whole into a texture buffer and the step is
+        changed by one uniform update. Otherwise, positions of the current step are written into the ring of
+        streaming buffers straight from the trajectory array and following frames are prepared on a worker thread.
+
+        Args:
+         positions: trajectory of shape (steps, atoms, 3), e.g. Calculation.positions.
+         colors: colors of atoms of shape (atoms, 3).
+         scales: scales of atoms of shape (atoms,).
+         key: primitive drawn for every atom.
+         prefetch_depth: number of frames prepared ahead by streaming.
+         resident: whether to keep the trajectory on the GPU, chosen by the memory budget if None.
+
+        Returns:
+         None
+        """
+        atoms = positions.shape[1]
+        instances = np.zeros((atoms, 7), dtype=np.float32)
+        instances[:, 3], instances[:, 4:] = scales, colors
+        self.__primitives[key].set_instances(instances)
+        self.remove_trajectory(key)
+        if resident is None:
+            budget = self.__settings.get_scene_params('trajectory', 'gpu_memory_budget')
+            resident = ResidentTrajectory.fits(positions, budget)
+            if not resident:
+                logger.info(f"Trajectory does not fit the video memory budget of {budget} MB, frames are streamed.")
+        if resident:
+            self.__resident[key] = ResidentTrajectory(positions)
+        else:
+            self.__streams[key] = [StreamingBuffer(atoms), FramePrefetcher(positions, prefetch_depth), None]
+        self.__draw_buffer.setdefault(key, dict())
+
+    def remove_trajectory(self, key='Sphere'):
+        """Stops playing of the trajectory drawn by the primitive."""
+        if self.__streams.pop(key, None) is not None or self.__resident.pop(key, None) is not None:
+            self.__draw_buffer.pop(key, None)
+            self.__instances_changed = True
+
+    def set_step(self, step):
+        """Sets the step of streamed trajectories."""
+        self.__step = step
+
+    def stream_positions(self) -> None:
+        """Writes positions of the current step into streaming buffers if the step has changed."""
+        for stream in self.__streams.values():
+            if stream[2] != self.__step:
+                stream[0].write(stream[1].get(self.__step))
+                stream[2] = self.__step
 
     def update_camera(self):
         """Updates camera."""
@@ -154,6 +288,7 @@ class Scene:
         glClearColor(*self.__settings.get_scene_params('background', 'color'))
         glUniformMatrix4fv(program.uniform_variables[('Rotation', 'mat4')], 1, GL_TRUE, self.__translation_matrix @ self.__rotation_matrix)
         
+        glUniform1i(program.uniform_variables[('Trajectory', 'samplerBuffer')], self.trajectory_unit)
         self.__camera.send_info_to_shader(program.uniform_variables)
         self.__light.send_light_info(program.uniform_variables)
         
@@ -161,15 +296,112 @@ class Scene:
             # NOTE: draw_buffer structure: {'Sphere': {(color, scale): [[[x, y, z], [x, y, z], ..., [x, y, z]], [[x, y, z], [x, y, z], ..., [x, y, z]]]}}
             if mouse_moving:
                 self.__axes.draw(program.uniform_variables)
-            for key in self.__draw_buffer:
-                for (color, scale) in self.__draw_buffer[key]:
-                    glUniform3f(program.uniform_variables[('ObjColor', 'vec3')], *color)
-                    self.__primitives[key].scale(scale)
-                    for (x, y, z) in self.__draw_buffer[key][(color, scale)]:
-                        self.__primitives[key].translate(x, y, z)
-                        self.__primitives[key].draw(program.uniform_variables)
+            if self.__instanced or self.__streams or self.__resident:
+                self.draw_instances(program)
+            else:
+                self.draw_objects(program)
         else:
             glUniform3f(program.uniform_variables[('ObjColor', 'vec3')], *[0.2, 0.2, 0.2])
             self.__primitives['Logo'].set_texture(self.__texture['default'])
             self.__primitives['Logo'].translate(0, 0, 0)
             self.__primitives['Logo'].draw(program.uniform_variables)
+
+    def draw_objects(self, program):
+        """Draws objects of the draw buffer by one draw call per object."""
+        for key in self.__draw_buffer:
+            for (color, scale) in self.__draw_buffer[key]:
+                glUniform3f(program.uniform_variables[('ObjColor', 'vec3')], *color)
+                self.__primitives[key].scale(scale)
+                for (x, y, z) in self.__draw_buffer[key][(color, scale)]:
+                    self.__primitives[key].translate(x, y, z)
+                    self.__primitives[key].draw(program.uniform_variables)
+
+    def bind_trajectory(self, uniform_variables, key):
+        """Sets trajectory uniforms of the program for the primitive and returns its streaming buffer if any."""
+        resident = self.__resident.get(key)
+        glUniform1i(uniform_variables[('Resident', 'int')], int(resident is not None))
+        if resident is not None:
+            resident.bind(self.trajectory_unit)
+            glUniform1i(uniform_variables[('Step', 'int')], min(self.__step, resident.steps - 1))
+            glUniform1i(uniform_variables[('AtomsNumber', 'int')], resident.atoms)
+        stream = self.__streams.get(key)
+        return None if stream is None else stream[0]
+
+    def draw_instances(self, program):
+        """Draws objects of the draw buffer by one instanced draw call per primitive type."""
+        if self.__instances_changed:
+            self.upload_instances()
+        self.stream_positions()
+        glUniform1i(program.uniform_variables[('Instanced', 'int')], 1)
+        for key in self.__draw_buffer:
+            if key == 'Sphere' and self.__renderer == 'impostor' and self.__impostor_program is not None:
+                self.draw_impostors(program, key)
+            elif key == 'Sphere' and self.__lod and key not in self.__streams and key not in self.__resident:
+                self.draw_lod(program)
+            else:
+                self.__primitives[key].draw_instanced(self.bind_trajectory(program.uniform_variables, key))
+            if key in self.__streams:
+                self.__streams[key][0].fence()
+        glUniform1i(program.uniform_variables[('Instanced', 'int')], 0)
+
+    def draw_lod(self, program):
+        """Draws spheres of the draw buffer by meshes of levels of detail chosen by their size on the screen."""
+        model_view = self.__camera.get_view_matrix() @ self.__translation_matrix @ self.__rotation_matrix
+        self.__sphere_lod.update(model_view, self.__camera.get_projection_matrix(), glGetIntegerv(GL_VIEWPORT)[3])
+        self.bind_trajectory(program.uniform_variables, 'Sphere')
+        self.__sphere_lod.draw_instanced()
+
+    def draw_impostors(self, program, key):
+        """Draws instances of the primitive as ray-cast spheres by the impostor program."""
+        instances = self.__primitives[key].get_instances()
+        if instances is None:
+            return
+        if self.__primitives['Impostor'].get_instances() is not instances:
+            self.__primitives['Impostor'].share_instances(instances)
+        glUseProgram(self.__impostor_program.program)
+        uniform_variables = self.__impostor_program.uniform_variables
+        glUniformMatrix4fv(uniform_variables[('Rotation', 'mat4')], 1, GL_TRUE, self.__translation_matrix @ self.__rotation_matrix)
+        glUniform1i(uniform_variables[('Trajectory', 'samplerBuffer')], self.trajectory_unit)
+        self.__camera.send_info_to_shader(uniform_variables)
+        self.__light.send_light_info(uniform_variables)
+        self.__primitives['Impostor'].draw_instanced(self.bind_trajectory(uniform_variables, key))
+        glUseProgram(program.program)
+
+    def benchmark(self, program, frames=100):
+        """
+        Measures frame time of draw paths of the current draw buffer.
+
+        Played trajectories are drawn only by instances, so the 'objects' path is skipped while a trajectory is set.
+
+        Args:
+         program: The shader program used for drawing.
+         frames: Number of drawn frames of every path.
+
+        Returns:
+         dict: mean frame time in ms of 'objects' (if no trajectory is set), 'instances', 'lod' and, if the impostor
+            program is set, 'impostors' paths.
+        """
+        instanced, renderer, lod, times = self.__instanced, self.__renderer, self.__lod, dict()
+        paths = [('instances', True, 'mesh', False), ('lod', True, 'mesh', True)]
+        if self.__streams or self.__resident:
+            logger.info("Objects path is not measured, played trajectories are drawn only by instances.")
+        else:
+            paths.insert(0, ('objects', False, 'mesh', False))
+        if self.__impostor_program is not None:
+            paths.append(('impostors', True, 'impostor', False))
+        glUseProgram(program.program)
+        for path, path_instanced, path_renderer, path_lod in paths:
+            self.__instanced, self.__renderer, self.__lod = path_instanced, path_renderer, path_lod
+            self.draw(program)
+            glFinish()
+            start = time.perf_counter()
+            for _ in range(frames):
+                self.draw(program)
+            glFinish()
+            times[path] = (time.perf_counter() - start) / frames * 1000
+        glUseProgram(0)
+        self.__instanced, self.__renderer, self.__lod = instanced, renderer, lod
+        objects = sum(len(positions) for groups in self.__draw_buffer.values() for positions in groups.values())
+        logger.info(f"Frame time of {objects} objects: " + ", ".join(f"{path} {value:.2f} ms" for path, value in times.items()) +
+                    f", levels of detail draw {self.__sphere_lod.triangles()} sphere triangles.")
+        return times
@@ -0,0 +1,59 @@
+#version 460
+
+in vec3 QuadPosition;
+flat in vec3 SphereCenter;
+flat in float SphereRadius;
+flat in vec3 Color;
+
+struct Light{
+    vec4 Position;
+    vec3 Intensity;
+    int Enabled;
+};
+uniform Light lights[8];
+
+uniform vec3 Ka;
+uniform vec3 Kd;
+uniform vec3 Ks;
+uniform float Shininess;
+uniform mat4 Projection;
+
+layout (location=0) out vec4 FragColor;
+
+
+vec3 customModel(int lightIndex, vec3 Position, vec3 Normal)
+{
+    if (lights[lightIndex].Enabled == 0)
+        return vec3(0.0);
+    else
+    {
+        vec3 s = normalize(vec3(lights[lightIndex].Position.xyz - Position));
+        float sDotN = max(dot(s, Normal), 0.0);
+        vec3 I = lights[lightIndex].Intensity;
+        return I * Color * (Ka + Kd * sDotN + Ks * pow(sDotN, Shininess));
+    }
+}
+
+
+void main() {
+    // rays start at the eye for the perspective projection and at the quad for the orthographic one
+    bool isPerspective = Projection[3][3] == 0.0;
+    vec3 origin = isPerspective ? vec3(0.0) : vec3(QuadPosition.xy, 0.0);
+    vec3 direction = isPerspective ? normalize(QuadPosition) : vec3(0.0, 0.0, -1.0);
+
+    vec3 oc = origin - SphereCenter;
+    float b = dot(oc, direction);
+    float h = b * b - dot(oc, oc) + SphereRadius * SphereRadius;
+    if (h < 0.0)
+        discard;
+    vec3 Position = origin + (-b - sqrt(h)) * direction;
+    vec3 Normal = (Position - SphereCenter) / SphereRadius;
+
+    vec3 ResColor = vec3(0.0);
+    for (int i = 0; i < 8; i++)
+        ResColor += customModel(i, Position, Normal);
+    FragColor = vec4(ResColor, 1.0);
+
+    vec4 Clip = Projection * vec4(Position, 1.0);
+    gl_FragDepth = 0.5 * (gl_DepthRange.diff * Clip.z / Clip.w + gl_DepthRange.near + gl_DepthRange.far);
+}
@@ -0,0 +1,38 @@
+#version 460
+
+
+layout (location=0) in vec3 PositionIn;
+layout (location=3) in vec3 InstancePositionIn;
+layout (location=4) in float InstanceScaleIn;
+layout (location=5) in vec3 InstanceColorIn;
+
+uniform int Resident;
+uniform int Step;
+uniform int AtomsNumber;
+uniform samplerBuffer Trajectory;
+uniform mat4 Rotation;
+uniform mat4 View;
+uniform mat4 Projection;
+
+out vec3 QuadPosition;
+flat out vec3 SphereCenter;
+flat out float SphereRadius;
+flat out vec3 Color;
+
+
+void main()
+{
+    vec3 InstancePosition = InstancePositionIn;
+    if (Resident != 0)
+        InstancePosition = texelFetch(Trajectory, Step * AtomsNumber + gl_InstanceID).xyz;
+
+    // objects are scaled by the homogeneous coordinate 1 / scale as in the mesh path, so the unit sphere has radius 1 / w
+    vec4 Center = View * Rotation * vec4(InstancePosition, 1.0 / InstanceScaleIn);
+    SphereCenter = Center.xyz / Center.w;
+    SphereRadius = 1.0 / Center.w;
+    Color = InstanceColorIn;
+
+    // the quad is larger than the sphere to cover its silhouette distorted by the perspective
+    QuadPosition = SphereCenter + vec3(PositionIn.xy * SphereRadius * 1.5, 0.0);
+    gl_Position = Projection * vec4(QuadPosition, 1.0);
+}
@@ -4,6 +4,9 @@
 layout (location=0) in vec3 PositionIn;
 layout (location=1) in vec3 NormalIn;
 layout (location=2) in vec2 TexCoordIn;
+layout (location=3) in vec3 InstancePositionIn;
+layout (location=4) in float InstanceScaleIn;
+layout (location=5) in vec3 InstanceColorIn;
 
 
 out vec3 Position;
@@ -11,6 +14,11 @@ out vec3 Normal;
 out vec3 Color;
 out vec2 TexCoord;
 
+uniform int Instanced;
+uniform int Resident;
+uniform int Step;
+uniform int AtomsNumber;
+uniform samplerBuffer Trajectory;
 uniform vec3 ObjColor;
 uniform mat4 Rotation;
 uniform mat4 Translation;
@@ -22,11 +30,22 @@ uniform mat4 Projection;
 void main()
 {
     mat4 Model = Rotation * Translation; 
+    Color = ObjColor;
+    if (Instanced != 0)
+    {
+        // the same matrix as Primitive.translate and Primitive.scale form for one draw call per object
+        vec3 InstancePosition = InstancePositionIn;
+        if (Resident != 0)
+            InstancePosition = texelFetch(Trajectory, Step * AtomsNumber + gl_InstanceID).xyz;
+        mat4 InstanceTranslation = mat4(1.0);
+        InstanceTranslation[3] = vec4(InstancePosition, 1.0 / InstanceScaleIn);
+        Model = Rotation * InstanceTranslation;
+        Color = InstanceColorIn;
+    }
     vec4 Mod_Position = View * Model * vec4(PositionIn, 1.0);
 
     Position = vec3(Mod_Position);
     Normal = normalize(mat3(transpose(inverse(Model))) * NormalIn);
-    Color = ObjColor;
     TexCoord = vec2(TexCoordIn[0], 1 - TexCoordIn[1]);
     
     gl_Position = Projection * Mod_Position;
@@ -5,16 +5,19 @@
 # See LICENSE.txt for details.
 
 import numpy as np
+import ctypes
 import logging
 import OpenGL
 from OpenGL.GL import *
 from OpenGL.arrays import vbo
 from typing import Optional
+from threading import Thread, Lock
+from collections import OrderedDict
 
 OpenGL.ERROR_CHECKING = False
 logger = logging.getLogger(__name__)
 
-__all__ = ["VAO"]
+__all__ = ["VAO", "InstanceBuffer", "StreamingBuffer", "FramePrefetcher", "ResidentTrajectory"]
 
 
 class VAO:
@@ -78,6 +81,251 @@ class VAO:
     #     self.load_uniform_float(uniform_variables[('fog.FogDensity', '1')], fogDensity)
 
 
+class InstanceBuffer:
+    """
+    Vertex buffer of per-instance attributes of instanced draws.
+
+    Every instance has position (3 floats), scale (1 float) and color (3 floats), they are read by the vertex shader
+    from locations 3, 4 and 5 with the attribute divisor 1, so one glDrawElementsInstanced draws all instances.
+    """
+    layout = (3, 1, 3)
+    first_location = 3
+
+    def __init__(self, usage='GL_DYNAMIC_DRAW'):
+        """Initializes empty VBO of instances."""
+        self.buffer = vbo.VBO(np.zeros((1, sum(self.layout)), dtype=np.float32), usage, 'GL_ARRAY_BUFFER')
+        self.count = 0
+
+    def __del__(self) -> None:
+        """A rule for deleting an instance buffer object."""
+        if glDeleteBuffers:
+            self.buffer.delete()
+
+    def update(self, instances: np.ndarray) -> None:
+        """Uploads instances of shape (instances, 7) into the buffer."""
+        instances = np.ascontiguousarray(instances, dtype=np.float32).reshape(-1, sum(self.layout))
+        self.count = instances.shape[0]
+        if self.count:
+            self.buffer.set_array(instances)
+            self.buffer.bind()
+            self.buffer.unbind()
+
+    def attach(self, vao) -> None:
+        """Adds instance attributes to the vertex array object."""
+        glBindVertexArray(vao)
+        self.buffer.bind()
+        stride, offset = sum(self.layout) * 4, 0
+        for index, size in enumerate(self.layout):
+            location = self.first_location + index
+            glVertexAttribPointer(location, size, GL_FLOAT, GL_FALSE, stride, self.buffer + offset * 4)
+            glEnableVertexAttribArray(location)
+            glVertexAttribDivisor(location, 1)
+            offset += size
+        self.buffer.unbind()
+        glBindVertexArray(0)
+
+
+class StreamingBuffer:
+    """
+    Ring of instance position buffers rewritten every frame of trajectory playback.
+
+    If glBufferStorage is supported, buffers are persistently mapped once and every frame is copied straight into
+    the mapped memory of the next buffer of the ring by one np.copyto. A fence is placed after the draw which reads
+    the buffer, so a buffer is rewritten only after the GPU has finished with it. Otherwise, the next buffer is
+    orphaned by glBufferData with GL_STREAM_DRAW and filled by glBufferSubData, so the driver never stalls on it.
+    """
+
+    def __init__(self, atoms: int, ring: int = 3, persistent: bool = True):
+        """
+        Allocates buffers of the ring.
+
+        Args:
+            atoms: number of instances in every frame.
+            ring: number of buffers in the ring.
+            persistent: whether to use persistently mapped buffers if they are supported.
+        """
+        self.atoms = atoms
+        self.ring = ring
+        self.nbytes = atoms * 3 * 4
+        self.persistent = persistent and bool(glBufferStorage)
+        self.buffers = np.atleast_1d(glGenBuffers(ring))
+        self.mapped = []
+        self.fences = [None] * ring
+        self.slot = 0
+        flags = GL_MAP_WRITE_BIT | GL_MAP_PERSISTENT_BIT | GL_MAP_COHERENT_BIT
+        for buffer in self.buffers:
+            glBindBuffer(GL_ARRAY_BUFFER, buffer)
+            if self.persistent:
+                glBufferStorage(GL_ARRAY_BUFFER, self.nbytes, None, flags)
+                address = glMapBufferRange(GL_ARRAY_BUFFER, 0, self.nbytes, flags)
+                address = address if isinstance(address, int) else ctypes.cast(address, ctypes.c_void_p).value
+                self.mapped.append(np.ctypeslib.as_array((ctypes.c_float * (atoms * 3)).from_address(address)).reshape(atoms, 3))
+            else:
+                glBufferData(GL_ARRAY_BUFFER, self.nbytes, None, GL_STREAM_DRAW)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        logger.info(f"Streaming ring of {ring} buffers of {atoms} instances created, persistent mapping: {self.persistent}")
+
+    def __del__(self) -> None:
+        """A rule for deleting a streaming buffer object."""
+        if glDeleteBuffers:
+            self.mapped = []
+            for fence in self.fences:
+                if fence is not None:
+                    glDeleteSync(fence)
+            if self.persistent:
+                for buffer in self.buffers:
+                    glBindBuffer(GL_ARRAY_BUFFER, buffer)
+                    glUnmapBuffer(GL_ARRAY_BUFFER)
+                glBindBuffer(GL_ARRAY_BUFFER, 0)
+            glDeleteBuffers(self.ring, self.buffers)
+
+    def write(self, frame: np.ndarray) -> None:
+        """Writes positions of shape (atoms, 3) into the next buffer of the ring."""
+        self.slot = (self.slot + 1) % self.ring
+        if self.persistent:
+            fence = self.fences[self.slot]
+            if fence is not None:
+                glClientWaitSync(fence, GL_SYNC_FLUSH_COMMANDS_BIT, 1000000000)
+                glDeleteSync(fence)
+                self.fences[self.slot] = None
+            np.copyto(self.mapped[self.slot], frame, casting='same_kind')
+        else:
+            glBindBuffer(GL_ARRAY_BUFFER, self.buffers[self.slot])
+            glBufferData(GL_ARRAY_BUFFER, self.nbytes, None, GL_STREAM_DRAW)
+            glBufferSubData(GL_ARRAY_BUFFER, 0, self.nbytes, np.ascontiguousarray(frame, dtype=np.float32))
+            glBindBuffer(GL_ARRAY_BUFFER, 0)
+
+    def attach(self, vao, location: int = InstanceBuffer.first_location) -> None:
+        """Points the instance position attribute of the vertex array object to the current buffer."""
+        glBindVertexArray(vao)
+        glBindBuffer(GL_ARRAY_BUFFER, self.buffers[self.slot])
+        glVertexAttribPointer(location, 3, GL_FLOAT, GL_FALSE, 3 * 4, ctypes.c_void_p(0))
+        glEnableVertexAttribArray(location)
+        glVertexAttribDivisor(location, 1)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)
+        glBindVertexArray(0)
+
+    def fence(self) -> None:
+        """Marks the end of draws reading the current buffer."""
+        if self.persistent:
+            self.fences[self.slot] = glFenceSync(GL_SYNC_GPU_COMMANDS_COMPLETE, 0)
+
+
+class FramePrefetcher:
+    """
+    Prepares float32 frames of a trajectory for streaming on a worker thread.
+
+    After a frame is taken, the following frames are prepared in background, so playback takes ready frames of
+    lazy trajectories instead of decoding them in the drawing thread. Frames of in-memory float32 trajectories are
+    returned as views of Calculation.positions without copies.
+    """
+
+    def __init__(self, positions, depth: int = 8):
+        """
+        Prefetcher initialization function.
+
+        Args:
+            positions: trajectory of shape (steps, atoms, 3), e.g. Calculation.positions, may be a LazyTrajectory.
+            depth: number of frames prepared ahead.
+        """
+        self.positions = positions
+        self.depth = depth
+        self.__frames = OrderedDict()
+        self.__locker = Lock()
+        self.__target = 0
+        self.__thread = None
+
+    def prepare(self, step: int) -> np.ndarray:
+        """Returns the frame as a contiguous float32 array."""
+        return np.ascontiguousarray(self.positions[step], dtype=np.float32)
+
+    def get(self, step: int) -> np.ndarray:
+        """Returns the frame and starts preparation of the following ones."""
+        with self.__locker:
+            frame = self.__frames.pop(step, None)
+        if frame is None:
+            frame = self.prepare(step)
+        self.prefetch(step + 1)
+        return frame
+
+    def prefetch(self, step: int) -> None:
+        """Prepares frames starting from step in background."""
+        with self.__locker:
+            self.__target = step
+            for old in [frame for frame in self.__frames if not step <= frame < step + self.depth]:
+                del self.__frames[old]
+            thread = None
+            if self.__thread is None:
+                thread = self.__thread = Thread(target=self.__run, daemon=True)
+        if thread is not None:
+            thread.start()
+
+    def __run(self) -> None:
+        """Prepares frames until the window of the target step is filled."""
+        while True:
+            with self.__locker:
+                target = self.__target
+                missing = [step for step in range(target, min(target + self.depth, len(self.positions))) if step not in self.__frames]
+                if not missing:
+                    self.__thread = None
+                    return
+            frame = self.prepare(missing[0])
+            with self.__locker:
+                if self.__target <= missing[0] < self.__target + self.depth:
+                    self.__frames[missing[0]] = frame
+
+
+class ResidentTrajectory:
+    """
+    Whole trajectory uploaded once into a float32 texture buffer.
+
+    Positions of all steps are stored as RGB32F texels in step-major order, the vertex shader fetches the position of
+    an instance by Step * AtomsNumber + gl_InstanceID, so changing the played step costs one uniform update.
+    """
+
+    def __init__(self, positions, chunk: int = 256):
+        """
+        Uploads the trajectory.
+
+        Args:
+            positions: trajectory of shape (steps, atoms, 3), e.g. Calculation.positions, may be a LazyTrajectory.
+            chunk: number of steps converted to float32 and uploaded at once, so the whole trajectory is never
+                copied in the host memory.
+        """
+        self.steps, self.atoms = positions.shape[:2]
+        frame_bytes = self.atoms * 3 * 4
+        self.buffer = glGenBuffers(1)
+        glBindBuffer(GL_TEXTURE_BUFFER, self.buffer)
+        glBufferData(GL_TEXTURE_BUFFER, self.steps * frame_bytes, None, GL_STATIC_DRAW)
+        for start in range(0, self.steps, chunk):
+            frames = np.ascontiguousarray(positions[start:start + chunk], dtype=np.float32)
+            glBufferSubData(GL_TEXTURE_BUFFER, start * frame_bytes, frames.nbytes, frames)
+        self.texture = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+        glTexBuffer(GL_TEXTURE_BUFFER, GL_RGB32F, self.buffer)
+        glBindTexture(GL_TEXTURE_BUFFER, 0)
+        glBindBuffer(GL_TEXTURE_BUFFER, 0)
+        logger.info(f"Trajectory of {self.steps} steps x {self.atoms} atoms uploaded ({self.steps * frame_bytes / 1024 ** 2:.1f} MB)")
+
+    def __del__(self) -> None:
+        """A rule for deleting a resident trajectory object."""
+        if glDeleteBuffers:
+            glDeleteTextures(1, [self.texture])
+            glDeleteBuffers(1, [self.buffer])
+
+    @staticmethod
+    def fits(positions, budget: float) -> bool:
+        """Returns whether the trajectory fits the memory budget in MB and the maximal texture buffer size."""
+        steps, atoms = positions.shape[:2]
+        return steps * atoms * 3 * 4 <= budget * 1024 ** 2 and steps * atoms <= glGetIntegerv(GL_MAX_TEXTURE_BUFFER_SIZE)
+
+    def bind(self, unit: int) -> None:
+        """Binds the texture buffer to the texture unit."""
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_BUFFER, self.texture)
+        glActiveTexture(GL_TEXTURE0)
+
+
 class VAOError(Exception):
     """Class for processing of errors in VAO class."""
     def __init__(self, message):
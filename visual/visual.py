@@ -170,21 +170,6 @@ class VisualWindow(Ui_Visual, QMainWindow):
     #         self.addMessage('This atom was already chose.' if select else 'This atom was already deleted.', self.__class__.__name__)
     #     pygame.time.wait(200)
  
-    # def calculate_bonds(self):  # необходимо отсортировать массив по x, y, z и смотреть начиная с какого то элемента массива расстояние. Если оно больше заданного, то не включаем в рассмотрение, если меньше, то включаем и при этом соответствующим образом сдвигаем далее индекс поиска
-    #     one_step_positions = self.__calculation['POSITIONS'][self._step]
-    #     biggest_dim = self.nonoptimal_dimension_search(self.__calculation['POSITIONS'], 9)
-    #     if self._all_bonds_calculate:
-    #         one_step_positions_tr = one_step_positions.transpose()
-    #         indexes_big = one_step_positions_tr[biggest_dim].argsort()
-    #         neighbours = self.neighbours_search(self.neighbours_search_body, one_step_positions, indexes_big, biggest_dim, self._bond_length)
-    #     else:
-    #         type1, type2 = 'Mo', 'S'
-    #         indexes1, indexes2 = self.__calculation['ATOM-NUMBERS'][type1], self.__calculation['ATOM-NUMBERS'][type2]
-    #         one_step_positions_type2 = one_step_positions[indexes2]
-    #         one_step_positions_tr = one_step_positions_type2.transpose()
-    #         indexes_big = one_step_positions_tr[biggest_dim].argsort() + min(indexes2)
-    #         neighbours = self.neighbours_search_between_types(self.neighbours_search_between_types_body, one_step_positions, indexes1, indexes_big, biggest_dim, self._bond_length)
-
     # def prepare_bond_buffers(self):
     #     atoms = self.__calculation['ATOMNAMES']
     #     if self._bond_radius is None and self._bond_length is None: